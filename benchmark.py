@@ -0,0 +1,256 @@
+# benchmark.py
+"""End-to-end interview benchmark.
+
+Simulates N candidates taking the full five-question interview at the same
+time through interview_engine.InterviewEngine, exactly as eval.py does: first
+question, prefetch of the next one at background priority while the candidate
+answers, evaluation and next-question loading side by side on submit, then the
+final recommendation started in the background and streamed on finalize. All
+candidates share one event loop, like the sessions of one app process.
+With --job-queue the LLM work goes through job_queue.py and is run by
+llm_worker.py threads started in this process.
+Run against the bundled stub (default) or any endpoint via DEEPSEEK_BASE_URL:
+
+    python benchmark.py --candidates 20 --latency 0.8 --jitter 0.3
+    python benchmark.py --candidates 20 --job-queue --worker-threads 16
+    python benchmark.py --candidates 5 --no-stub          # real endpoint - costs tokens
+    python benchmark.py --candidates 20 --compare bench_results/benchmark-20240101-120000.json
+
+CODE_EXECUTION is switched off for the run: sandboxed test runs of coding
+answers would otherwise dominate time_to_next_question, which measures the LLM
+path. Queue wait per scheduler priority is reported next to the latencies.
+
+Results (config, summary percentiles, per-candidate timings) are written to
+bench_results/benchmark-<timestamp>.json. The evaluation database (evaluations,
+test suites, translations), job queue, question bank, dedupe index and
+evaluation cache are all redirected to a temporary directory, so a run neither
+reads nor pollutes the app's own state.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import stub_llm
+
+BENCH_RESULTS_DIR = "bench_results"
+QUESTIONS_PER_INTERVIEW = 5
+
+SAMPLE_ANSWERS = [
+    "It trades memory for speed: results are stored after the first call and reused, so repeated work is avoided.",
+    "I would use a dictionary keyed by id, iterate once and keep the latest record, which is O(n) time and memory.",
+    "Transactions group writes so they either all apply or none do; isolation levels control what concurrent readers see.",
+    "def dedupe(items):\n    seen = set()\n    return [x for x in items if not (x in seen or seen.add(x))]",
+    "An index is a sorted structure over a column so lookups are logarithmic instead of a full scan, at the cost of slower writes.",
+    "I am not sure, but I think it has to do with how objects are cleaned up when nothing references them."
+]
+
+
+def percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        k = (len(ordered) - 1) * p
+        lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+        return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pct(0.5),
+        "p90": pct(0.9),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "max": ordered[-1]
+    }
+
+
+async def run_candidate(engine, idx: int, role: str, skills: List[str], language: str, think_time: float, stream: bool) -> Dict:
+    """One simulated candidate; returns its timings in seconds"""
+    rng = random.Random(idx)
+    timings = {"candidate": idx, "time_to_next_question": [], "evaluation": [], "error": None}
+    think_total = 0.0
+    started = time.perf_counter()
+    interview = None
+    try:
+        interview = await engine.start(f"bench-{idx}", role, skills, language)
+        t = time.perf_counter()
+        await engine.next_question(interview)
+        timings["time_to_first_question"] = time.perf_counter() - t
+        while not interview.finished:
+            if think_time:
+                pause = rng.uniform(0.5, 1.5) * think_time
+                await asyncio.sleep(pause)
+                think_total += pause
+            answer = f"{rng.choice(SAMPLE_ANSWERS)} (candidate {idx}, question {interview.question_num})"
+            t = time.perf_counter()
+            result = await engine.submit_answer(interview, answer)
+            elapsed = time.perf_counter() - t
+            timings["evaluation"].append(elapsed)
+            if not result["complete"]:
+                timings["time_to_next_question"].append(elapsed)
+
+        first_token = []
+        t = time.perf_counter()
+
+        def on_partial(text):
+            if not first_token:
+                first_token.append(time.perf_counter() - t)
+        summary = await engine.finalize(interview, on_partial=on_partial if stream else None)
+        if summary["recommendation"] is None:
+            raise RuntimeError("no recommendation")
+        timings["recommendation"] = time.perf_counter() - t
+        timings["recommendation_first_token"] = first_token[0] if first_token else timings["recommendation"]
+    except Exception as e:
+        timings["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if interview is not None:
+            engine.abandon(interview)
+    timings["interview"] = time.perf_counter() - started - think_total
+    return timings
+
+
+def summarize(results: List[Dict], wall_time: float) -> Dict:
+    ok = [r for r in results if not r["error"]]
+    return {
+        "candidates": len(results),
+        "completed": len(ok),
+        "failed": len(results) - len(ok),
+        "wall_time": wall_time,
+        "throughput_interviews_per_min": len(ok) / wall_time * 60 if wall_time else 0,
+        "interview": percentiles([r["interview"] for r in ok]),
+        "time_to_first_question": percentiles([r["time_to_first_question"] for r in ok]),
+        "time_to_next_question": percentiles([v for r in ok for v in r["time_to_next_question"]]),
+        "evaluation": percentiles([v for r in ok for v in r["evaluation"]]),
+        "recommendation": percentiles([r["recommendation"] for r in ok]),
+        "recommendation_first_token": percentiles([r["recommendation_first_token"] for r in ok]),
+        "queue_wait": queue_waits()
+    }
+
+
+def queue_waits() -> Dict:
+    """Percentiles of the time LLM calls spent in the scheduler queue, per priority class"""
+    import llm_metrics
+    return {labels["priority"]: percentiles(series["samples"])
+            for labels, series in llm_metrics.REGISTRY.histograms("llm_queue_wait_seconds")}
+
+
+def compare(summary: Dict, baseline_path: str):
+    """Print p50/p95 of each latency metric next to a previous run"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)["summary"]
+    print(f"\n{'metric':28s} {'p50':>8s} {'base':>8s} {'p95':>8s} {'base':>8s}")
+    for metric in ("interview", "time_to_first_question", "time_to_next_question", "evaluation",
+                   "recommendation", "recommendation_first_token"):
+        now, before = summary.get(metric, {}), baseline.get(metric, {})
+        if not now.get("count") or not before.get("count"):
+            continue
+        print(f"{metric:28s} {now['p50']:8.3f} {before['p50']:8.3f} {now['p95']:8.3f} {before['p95']:8.3f}")
+    print(f"{'throughput (interviews/min)':28s} {summary['throughput_interviews_per_min']:8.2f} "
+          f"{baseline.get('throughput_interviews_per_min', 0):8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark full interviews under concurrent simulated candidates")
+    parser.add_argument("--candidates", type=int, default=10, help="concurrent simulated candidates (default: %(default)s)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which candidates start (default: all at once)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds a candidate spends per answer (default: %(default)s)")
+    parser.add_argument("--role", default="Python Developer")
+    parser.add_argument("--skills", default="Python, SQL")
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--no-stream", action="store_true", help="don't stream the recommendation")
+    parser.add_argument("--no-stub", action="store_true", help="use DEEPSEEK_BASE_URL instead of starting the stub")
+    parser.add_argument("--job-queue", action="store_true", help="run the LLM work as queued jobs (JOB_QUEUE=1)")
+    parser.add_argument("--worker-threads", type=int, default=8, help="llm_worker threads with --job-queue (default: %(default)s)")
+    parser.add_argument("--output", help="results file (default: bench_results/benchmark-<timestamp>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    stub_llm.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    # Isolate persistent state before the app modules are imported (they read these at import time)
+    workdir = tempfile.mkdtemp(prefix="interview-bench-")
+    os.environ["EVAL_DB"] = os.path.join(workdir, "evaluations.db")
+    os.environ["JOB_QUEUE_DB"] = os.path.join(workdir, "jobs.db")
+    os.environ["QUESTION_BANK_DB"] = os.path.join(workdir, "question_bank.json")
+    os.environ["DEDUPE_INDEX_DB"] = os.path.join(workdir, "question_index.jsonl")
+    os.environ["EVAL_CACHE_DIR"] = os.path.join(workdir, "eval_cache")
+    os.environ["CODE_EXECUTION"] = "0"
+    os.environ["JOB_QUEUE"] = "1" if args.job_queue else "0"
+    stub = None
+    if not args.no_stub:
+        stub = stub_llm.start_in_background(stub_llm.config_from_args(args))
+        os.environ["DEEPSEEK_BASE_URL"] = f"http://127.0.0.1:{stub.server_port}/v1"
+        os.environ.setdefault("DEEPSEEK_API_KEY", "stub")
+
+    import interview_engine
+    import llm_client
+    import llm_metrics
+    import streaming
+    llm_client.get_llm()  # build the LLM client before the clock starts
+    streaming.STREAM_OUTPUT = not args.no_stream
+    skills = [s.strip() for s in args.skills.split(",") if s.strip()]
+    print(f"Running {args.candidates} candidate(s) against {os.environ.get('DEEPSEEK_BASE_URL') or 'the default endpoint'}"
+          f"{' through the job queue' if args.job_queue else ''}")
+    stop_workers = threading.Event()
+    if args.job_queue:
+        import llm_worker
+        llm_worker.start_threads(args.worker_threads, "benchmark", stop_workers)
+
+    results = []
+    engine = interview_engine.InterviewEngine()
+
+    async def candidate(idx: int):
+        if args.ramp_up and args.candidates > 1:
+            await asyncio.sleep(args.ramp_up * idx / (args.candidates - 1))
+        result = await run_candidate(engine, idx, args.role, skills, args.language, args.think_time, not args.no_stream)
+        results.append(result)
+        status = result["error"] or f"{result['interview']:.2f}s"
+        print(f"  candidate {idx}: {status}")
+
+    async def run_all():
+        await asyncio.gather(*(candidate(idx) for idx in range(args.candidates)))
+
+    started = time.perf_counter()
+    asyncio.run(run_all())
+    wall_time = time.perf_counter() - started
+    stop_workers.set()
+
+    summary = summarize(sorted(results, key=lambda r: r["candidate"]), wall_time)
+    summary["llm_calls"] = llm_metrics.call_site_summary()
+    if stub is not None:
+        summary["llm_requests"] = stub.RequestHandlerClass.config.requests
+        stub.shutdown()
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "summary": summary,
+        "candidates": sorted(results, key=lambda r: r["candidate"])
+    }
+    output = args.output or os.path.join(BENCH_RESULTS_DIR, f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    for metric in ("interview", "time_to_first_question", "time_to_next_question", "recommendation_first_token"):
+        stats = summary[metric]
+        if stats.get("count"):
+            print(f"{metric:28s} p50 {stats['p50']:.3f}s  p95 {stats['p95']:.3f}s  max {stats['max']:.3f}s")
+    for priority, stats in sorted(summary["queue_wait"].items()):
+        print(f"{'queue wait ' + priority:28s} p50 {stats['p50']:.3f}s  p95 {stats['p95']:.3f}s  max {stats['max']:.3f}s")
+    print(f"{summary['completed']}/{summary['candidates']} interviews in {wall_time:.1f}s "
+          f"({summary['throughput_interviews_per_min']:.1f}/min); results in {output}")
+    if args.compare:
+        compare(summary, args.compare)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
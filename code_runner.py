@@ -0,0 +1,595 @@
+# code_runner.py
+"""Runs candidates' Python answers to coding questions against hidden tests.
+
+Each coding question gets a hidden test suite, generated once by the LLM and
+stored in the database by question (see test_suite): the function to call,
+test cases (some marked as edge cases), a reference solution and a Python
+expression that builds a large benchmark input. The reference solution is run
+against its own cases before the suite is stored and the cases it fails are
+dropped, so a wrong expected value can't cost a candidate points.
+
+run() executes an answer through CODE_RUN_PREFIX, a sandbox with no network
+and a read-only root (nsjail, bwrap, or a docker/podman container), under
+CPU-time, memory, file-size and wall-clock limits, in an empty temporary
+directory with no API keys in its environment; at most CODE_RUN_WORKERS run
+at once. Inside the sandbox a harness loads the answer in a child interpreter
+and sends it only the arguments of each case; the child sends back the
+return values as JSON and the harness compares them and reports. The answer
+never sees the expected values or the reference solution and can't reach
+the code that scores it. The report has how many normal and edge cases
+passed and how the answer's runtime on the benchmark input compares with
+the reference solution's, which must return the same result.
+measured_points() turns that into the correctness, edge case and efficiency
+points of the coding rubric, leaving QUALITY_POINTS for the LLM.
+
+Code execution is off unless CODE_EXECUTION=1, and even then it stays off
+(and _sandbox refuses to run) when CODE_RUN_PREFIX doesn't name a sandbox
+configured that way - see sandbox_problem.
+"""
+import ast
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import uuid
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+import storage
+
+CODE_RUN_PREFIX = shlex.split(os.environ.get("CODE_RUN_PREFIX", ""))               # sandbox the interpreter runs in
+CODE_RUN_PYTHON = os.environ.get("CODE_RUN_PYTHON", sys.executable)                # interpreter path inside the sandbox
+CODE_RUN_WORKERS = int(os.environ.get("CODE_RUN_WORKERS", str(os.cpu_count() or 2)))  # sandboxes running at once
+CODE_RUN_CPU_SECONDS = int(os.environ.get("CODE_RUN_CPU_SECONDS", "10"))          # CPU time per process
+CODE_RUN_MEMORY_MB = int(os.environ.get("CODE_RUN_MEMORY_MB", "512"))            # address space per process
+CODE_RUN_WALL_SECONDS = float(os.environ.get("CODE_RUN_WALL_SECONDS", "20"))     # wall-clock time per run
+
+CASE_SECONDS = 2        # per test case, so one infinite loop only fails its own case
+BENCHMARK_SECONDS = 5   # per timed call on the benchmark input
+BENCHMARK_REPEAT = 3    # timed calls per solution; the fastest counts
+MIN_CASES = 3           # suites with fewer valid cases aren't used
+
+# Coding rubric (see interview.build_evaluator_prompt): measured here, except code quality
+CORRECTNESS_POINTS = 8
+EDGE_CASE_POINTS = 4
+EFFICIENCY_POINTS = 4
+QUALITY_POINTS = 4
+# (runtime / reference runtime, efficiency points), best first; slower than the last ratio earns 1 point
+EFFICIENCY_RATIOS = ((2, 4), (5, 3), (20, 2))
+
+# Sandboxes CODE_RUN_PREFIX may name, and the options that would give the code network access or a writable root
+SANDBOXES = {
+    "nsjail": ("-N", "--disable_clone_newnet", "--rw", "-B", "--bindmount"),
+    "bwrap": ("--bind", "--bind-try", "--dev-bind", "--dev-bind-try", "--share-net"),
+    "docker": ("-v", "--volume", "--mount", "--privileged"),
+    "podman": ("-v", "--volume", "--mount", "--privileged")
+}
+
+
+def _options(args: List[str], *names: str) -> List[str]:
+    """Values given to any of `names` in `args`, as `--name value` or `--name=value`"""
+    values = []
+    for i, arg in enumerate(args):
+        name, _, value = arg.partition("=")
+        if name in names:
+            values.append(value if value else args[i + 1] if i + 1 < len(args) else "")
+    return values
+
+
+def sandbox_problem(prefix: List[str]) -> Optional[str]:
+    """Why `prefix` can't be trusted to isolate candidate code, or None if it can.
+    This checks the command line, not the sandbox: it catches a missing or misconfigured wrapper."""
+    if not prefix:
+        return "CODE_RUN_PREFIX is not set"
+    tool = os.path.basename(prefix[0])
+    if tool not in SANDBOXES:
+        return f"{prefix[0]} is not a supported sandbox ({', '.join(SANDBOXES)})"
+    if shutil.which(prefix[0]) is None:
+        return f"{prefix[0]} is not installed"
+    args = prefix[1:]
+    unsafe = [arg for arg in args if arg.partition("=")[0] in SANDBOXES[tool]]
+    if unsafe:
+        return f"{tool} is given {unsafe[0]}, which shares the network or a writable path"
+    if tool == "bwrap" and not {"--unshare-net", "--unshare-all"} & set(args):
+        return "bwrap needs --unshare-net (or --unshare-all)"
+    if tool in ("docker", "podman"):
+        if "run" not in args or "-i" not in args and "--interactive" not in args:
+            return f"{tool} needs `run -i` to pass the tests on stdin"
+        if "--read-only" not in args:
+            return f"{tool} needs --read-only"
+        if "--rm" not in args:
+            return f"{tool} needs --rm, so a container stopped after a timeout is removed"
+        if _options(args, "--name"):
+            return f"{tool} is given --name; every run names its own container"
+        if _options(args, "--network", "--net") != ["none"]:
+            return f"{tool} needs --network=none"
+    return None
+
+
+CODE_EXECUTION_PROBLEM = "CODE_EXECUTION is not 1" if os.environ.get("CODE_EXECUTION", "0") != "1" else sandbox_problem(CODE_RUN_PREFIX)
+CODE_EXECUTION = CODE_EXECUTION_PROBLEM is None  # score coding answers by running them
+if os.environ.get("CODE_EXECUTION") == "1" and not CODE_EXECUTION:
+    print(f"code_runner: not running coding answers - {CODE_EXECUTION_PROBLEM}", file=sys.stderr)
+
+# Runs inside the sandbox: reads the spec from stdin, runs each solution in a CHILD interpreter,
+# and writes one line per result prefixed with the spec's token
+HARNESS = r'''
+import json, math, queue, subprocess, sys, threading, time
+
+spec = json.loads(sys.stdin.read())
+out = sys.stdout
+try:
+    import resource
+    limits = ((resource.RLIMIT_CPU, spec["cpu_seconds"]), (resource.RLIMIT_AS, spec["memory_bytes"]),
+              (resource.RLIMIT_FSIZE, 1 << 20), (resource.RLIMIT_CORE, 0))
+    for which, value in limits:
+        resource.setrlimit(which, (value, value))  # per process, inherited by the children
+except ImportError:
+    pass  # no rlimits on this platform - the parent's wall-clock limit still applies
+killed = False
+
+
+class Failed(Exception):
+    pass
+
+
+class Timeout(Failed):
+    pass
+
+
+def report(**fields):
+    out.write(spec["token"] + json.dumps(fields) + "\n")
+    out.flush()
+
+
+class Child:
+    """A solution loaded in its own interpreter. Only JSON crosses the pipe: the child gets
+    arguments and returns values, and never sees the expected results or this process."""
+
+    def __init__(self, code):
+        self.proc = subprocess.Popen([sys.executable, "-I", "-c", spec["child"]], text=True,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.replies = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+        try:
+            self.call({"code": code, "function": spec["function"], "arity": arity}, spec["case_seconds"])
+        except Failed:
+            self.close()
+            raise
+
+    def _read(self):
+        for line in self.proc.stdout:
+            try:
+                self.replies.put(json.loads(line))
+            except ValueError:
+                self.replies.put({"error": "unreadable result"})
+        self.replies.put(None)
+
+    def call(self, request, seconds):
+        """The child's value for a request and the seconds it took. Raises Failed (Timeout after
+        `seconds`) if it errs or doesn't answer; the child is gone after Timeout or a crash."""
+        global killed
+        start = time.perf_counter()
+        try:
+            self.proc.stdin.write(json.dumps(request) + "\n")
+            self.proc.stdin.flush()
+            reply = self.replies.get(timeout=seconds)
+        except queue.Empty:
+            self.close()
+            raise Timeout("Timeout: no result within the time limit")
+        except OSError:
+            reply = None
+        elapsed = time.perf_counter() - start
+        if reply is None:
+            code = self.close()
+            killed = killed or code < 0
+            raise Failed("stopped at the CPU or memory limit" if code < 0 else "exited with status %d" % code)
+        if "error" in reply:
+            raise Failed(reply["error"])
+        return reply.get("value"), elapsed
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def close(self):
+        if self.alive():
+            self.proc.kill()
+        return self.proc.wait()
+
+
+def same(got, expected):
+    if isinstance(got, bool) or isinstance(expected, bool):
+        return isinstance(got, bool) and isinstance(expected, bool) and got == expected
+    if isinstance(got, (int, float)) and isinstance(expected, (int, float)):
+        return math.isclose(got, expected, rel_tol=1e-6, abs_tol=1e-9)
+    if isinstance(got, list) and isinstance(expected, list):
+        return len(got) == len(expected) and all(same(g, e) for g, e in zip(got, expected))
+    if isinstance(got, dict) and isinstance(expected, dict):
+        return got.keys() == expected.keys() and all(same(got[k], expected[k]) for k in got)
+    return got == expected
+
+
+cases = spec["cases"]
+arity = len(cases[0]["args"]) if cases else 0
+try:
+    answer = Child(spec["code"])
+except Failed as e:
+    report(load_error=str(e), killed=killed)
+    sys.exit(0)
+timeouts = 0
+for i, case in enumerate(cases):
+    if timeouts >= 2:
+        report(case=i, ok=False)  # it hangs - don't spend the time limit finding out again
+        continue
+    try:
+        if not answer.alive():
+            answer = Child(spec["code"])  # a fresh one after a timeout or crash
+        report(case=i, ok=same(answer.call({"args": case["args"]}, spec["case_seconds"])[0], case["expected"]))
+    except Failed as e:
+        timeouts += isinstance(e, Timeout)
+        report(case=i, ok=False, error=str(e))
+
+if spec.get("benchmark") and timeouts < 2:
+    timings, outputs = {}, {}
+    for label, code in (("reference", spec["reference"]), ("answer", spec["code"])):
+        timings[label] = None
+        try:
+            child = answer if label == "answer" and answer.alive() else Child(code)
+            for _ in range(spec["benchmark_repeat"]):
+                child.call({"prepare": spec["benchmark"]}, spec["benchmark_seconds"])
+                outputs[label], seconds = child.call({"benchmark": True}, spec["benchmark_seconds"])
+                timings[label] = seconds if timings[label] is None else min(timings[label], seconds)
+                if seconds > 1:
+                    break  # slow enough that one timing is representative
+            child.close()
+        except Failed as e:
+            timings[label] = None
+            timings[label + "_error"] = str(e)
+    timings["same_output"] = len(outputs) == 2 and same(outputs["answer"], outputs["reference"])
+    report(benchmark=timings)
+answer.close()
+report(killed=killed)
+'''
+
+# Runs one solution for HARNESS: loads it, then answers one JSON request per line with its value or error
+CHILD = r'''
+import inspect, json, math, os, random, sys
+
+channel = os.fdopen(os.dup(1), "w")
+requests = os.fdopen(os.dup(0), "r")
+null = os.open(os.devnull, os.O_RDWR)
+for fd in (0, 1, 2):
+    os.dup2(null, fd)  # the solution's own input() and prints go nowhere
+
+
+def reply(**fields):
+    try:
+        text = json.dumps(fields)
+    except (TypeError, ValueError) as e:
+        text = json.dumps({"error": describe(e)})
+    channel.write(text + "\n")
+    channel.flush()
+
+
+def describe(error):
+    return (type(error).__name__ + (": %s" % error if str(error) else ""))[:200]
+
+
+def accepts(fn, arity):
+    try:
+        inspect.signature(fn).bind(*range(arity))
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def load(code, name, arity):
+    namespace = {"__name__": "__answer__"}
+    exec(compile(code, "<answer>", "exec"), namespace)
+    if callable(namespace.get(name)):
+        return namespace[name]
+    for value in list(namespace.values()):
+        if inspect.isclass(value) and callable(getattr(value, name, None)):
+            try:
+                return getattr(value(), name)  # class Solution: def name(self, ...)
+            except Exception:
+                continue
+    # Named differently: the last function defined that takes the right number of arguments
+    functions = [value for value in namespace.values()
+                 if inspect.isfunction(value) and value.__code__.co_filename == "<answer>" and accepts(value, arity)]
+    if not functions:
+        raise LookupError("no function taking %d argument(s) found" % arity)
+    return functions[-1]
+
+
+def plain(value):
+    if isinstance(value, (set, frozenset)):
+        try:
+            return sorted(plain(v) for v in value)
+        except TypeError:
+            return [plain(v) for v in value]
+    if isinstance(value, (list, tuple)):
+        return [plain(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): plain(v) for k, v in value.items()}
+    return value
+
+
+setup = json.loads(requests.readline())
+try:
+    solution = load(setup["code"], setup["function"], setup["arity"])
+except BaseException as e:
+    reply(error=describe(e))
+    sys.exit(0)
+reply(value=None)
+prepared = None
+for line in requests:
+    request = json.loads(line)
+    try:
+        if "prepare" in request:
+            random.seed(0)
+            prepared = list(eval(request["prepare"], {"random": random, "math": math}))
+            reply(value=None)
+        elif request.get("benchmark"):
+            args, prepared = prepared, None
+            reply(value=plain(solution(*args)))
+        else:
+            reply(value=plain(solution(*request["args"])))
+    except BaseException as e:  # including SystemExit from the solution
+        reply(error=describe(e))
+'''
+
+# Only what the interpreter needs - never the app's API keys
+_ENV = {name: os.environ[name] for name in ("PATH", "SYSTEMROOT", "LANG", "LC_ALL") if name in os.environ}
+
+_slots = threading.BoundedSemaphore(CODE_RUN_WORKERS)
+_pending_lock = threading.Lock()
+_pending: Dict[str, Future] = {}
+
+
+def suite_key(question: str) -> str:
+    return hashlib.sha256(" ".join(question.lower().split()).encode()).hexdigest()
+
+
+def extract_code(answer: str) -> str:
+    """The code in an answer: its fenced blocks if it has any, else the whole answer"""
+    blocks = re.findall(r"```[\w+-]*[ \t]*\n(.*?)```", answer or "", re.S)
+    return "\n\n".join(blocks) if blocks else (answer or "")
+
+
+def can_run(suite: Optional[Dict], answer: str) -> bool:
+    """Whether the answer is Python that defines a function the suite can test"""
+    if not suite or not suite.get("runnable"):
+        return False
+    try:
+        tree = ast.parse(extract_code(answer))
+    except (SyntaxError, ValueError):
+        return False
+    return any(isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) for node in ast.walk(tree))
+
+
+def _container_args() -> List[str]:
+    """`--name` for a docker/podman run, so _kill can stop the container and not just the CLI client"""
+    if os.path.basename(CODE_RUN_PREFIX[0]) not in ("docker", "podman"):
+        return []
+    return ["--name", f"code_run_{uuid.uuid4().hex}"]
+
+
+def _kill(proc: subprocess.Popen, container: List[str] = None):
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)  # the whole session, including anything the code started
+        else:
+            proc.kill()
+    except OSError:
+        pass
+    if container:
+        # The container runs under the docker/podman daemon, not in the CLI client's session; --rm removes it
+        try:
+            subprocess.run([CODE_RUN_PREFIX[0], "kill", container[1]], stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=CODE_RUN_WALL_SECONDS)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+
+def _sandbox(code: str, suite: Dict) -> Dict:
+    """Run `code` against the suite in the sandbox; returns the harness's raw results"""
+    if not CODE_EXECUTION:
+        raise RuntimeError(f"Refusing to run code outside a sandbox: {CODE_EXECUTION_PROBLEM}")
+    token = f"#{uuid.uuid4().hex} "
+    spec = {
+        "token": token, "child": CHILD, "code": code, "function": suite["function"], "cases": suite["cases"],
+        "reference": suite.get("reference"), "benchmark": suite.get("benchmark"),
+        "case_seconds": CASE_SECONDS, "benchmark_seconds": BENCHMARK_SECONDS, "benchmark_repeat": BENCHMARK_REPEAT,
+        "cpu_seconds": CODE_RUN_CPU_SECONDS, "memory_bytes": CODE_RUN_MEMORY_MB << 20
+    }
+    container = _container_args()
+    run_at = CODE_RUN_PREFIX.index("run") + 1 if container else 0
+    with _slots, tempfile.TemporaryDirectory(prefix="code_run_") as cwd:
+        proc = subprocess.Popen(
+            CODE_RUN_PREFIX[:run_at] + container + CODE_RUN_PREFIX[run_at:] + [CODE_RUN_PYTHON, "-I", "-c", HARNESS],
+            cwd=cwd, env=_ENV, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        exited = False
+        try:
+            stdout, _ = proc.communicate(json.dumps(spec), timeout=CODE_RUN_WALL_SECONDS)
+            exited = True
+            stopped = "killed" if proc.returncode < 0 else None  # CPU or memory limit
+        except subprocess.TimeoutExpired:
+            stdout, stopped = "", "timeout"
+        finally:
+            # and anything the code started that outlived the harness - and the container, unless it exited
+            _kill(proc, None if exited else container)
+        if stopped == "timeout":
+            stdout, _ = proc.communicate()
+    results = {"cases": {}, "stopped": stopped}
+    for line in stdout.split("\n"):
+        if line.startswith(token):
+            try:
+                fields = json.loads(line[len(token):])
+            except ValueError:
+                continue
+            if "case" in fields:
+                results["cases"][fields["case"]] = fields
+            else:
+                results.update(fields)
+    if results.pop("killed", False) and not stopped:
+        results["stopped"] = "killed"
+    return results
+
+
+def _check_suite(text: str) -> Dict:
+    """Parse a generated suite and keep the cases its reference solution passes.
+    Returns {"runnable": False} if the suite can't be used."""
+    try:
+        suite = json.loads(text[text.find("{"):text.rfind("}") + 1])
+        function = str(suite["function"])
+        reference = str(suite["reference"])
+        cases = [{"args": list(c["args"]), "expected": c["expected"], "edge": bool(c.get("edge"))}
+                 for c in suite["cases"] if isinstance(c, dict) and isinstance(c.get("args"), list) and "expected" in c]
+    except (ValueError, KeyError, TypeError):
+        return {"runnable": False}
+    if not suite.get("runnable", True) or not function.isidentifier() or not cases:
+        return {"runnable": False}
+    benchmark = suite.get("benchmark") if isinstance(suite.get("benchmark"), str) else None
+    checked = dict(function=function, reference=reference, cases=cases, benchmark=benchmark)
+    results = _sandbox(reference, checked)
+    cases = [case for i, case in enumerate(cases) if results["cases"].get(i, {}).get("ok")]
+    if len(cases) < MIN_CASES:
+        return {"runnable": False}
+    timing = results.get("benchmark") or {}
+    if timing.get("reference") is None or timing["reference"] > BENCHMARK_SECONDS / 4:
+        benchmark = None  # broken, or too slow to leave room for slower answers
+    return {"runnable": True, "function": function, "reference": reference, "cases": cases, "benchmark": benchmark}
+
+
+def test_suite(question: str, generate: Callable[[], str]) -> Dict:
+    """The question's stored test suite, generating it with `generate` (LLM text) the first time.
+    Concurrent callers for the same question share one generation."""
+    key = suite_key(question)
+    suite = storage.get_test_suite(key)
+    if suite is not None:
+        return suite
+    with _pending_lock:
+        future = _pending.get(key)
+        owner = future is None
+        if owner:
+            future = _pending[key] = Future()
+    if not owner:
+        return future.result()
+    try:
+        suite = _check_suite(generate())
+        storage.put_test_suite(key, suite)
+        future.set_result(suite)
+        return suite
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
+
+def run(suite: Dict, answer: str) -> Dict:
+    """Test an answer (see can_run) against the suite: pass counts, benchmark runtime ratio and any error"""
+    results = _sandbox(extract_code(answer), suite)
+    outcomes = [(case["edge"], results["cases"].get(i, {})) for i, case in enumerate(suite["cases"])]
+    errors = [outcome["error"] for _, outcome in outcomes if outcome.get("error")]
+    timing = results.get("benchmark")
+    report = {
+        "passed": sum(1 for edge, outcome in outcomes if not edge and outcome.get("ok")),
+        "total": sum(1 for edge, _ in outcomes if not edge),
+        "edge_passed": sum(1 for edge, outcome in outcomes if edge and outcome.get("ok")),
+        "edge_total": sum(1 for edge, _ in outcomes if edge),
+        "benchmarked": bool(suite.get("benchmark")),
+        "runtime_ratio": None,
+        "same_output": None,
+        "error": results.get("load_error") or (errors[0] if errors else None),
+        "stopped": results.get("stopped")
+    }
+    if timing and timing.get("answer") is not None and timing.get("reference"):
+        report["runtime_ratio"] = round(timing["answer"] / timing["reference"], 2)
+        report["same_output"] = bool(timing.get("same_output"))
+    return report
+
+
+def measured_points(report: Dict) -> Dict[str, int]:
+    """Correctness, edge case and efficiency points earned by a run() report.
+    Speed only counts for an answer that passes every normal case and matches the reference on the large input."""
+    cases = report["total"] + report["edge_total"]
+    overall = (report["passed"] + report["edge_passed"]) / cases if cases else 0
+    normal = report["passed"] / report["total"] if report["total"] else overall
+    edge = report["edge_passed"] / report["edge_total"] if report["edge_total"] else overall
+    if normal < 1:
+        speed = 0  # a fast wrong answer (e.g. returning the input) earns nothing for speed
+    elif not report["benchmarked"]:
+        speed = EFFICIENCY_POINTS  # nothing to compare with
+    elif report["runtime_ratio"] is None or not report["same_output"]:
+        speed = 0  # failed, timed out or gave a different result on the large input
+    else:
+        speed = next((points for ratio, points in EFFICIENCY_RATIOS if report["runtime_ratio"] <= ratio), 1)
+    return {
+        "correctness": round(CORRECTNESS_POINTS * normal),
+        "edge_cases": round(EDGE_CASE_POINTS * edge),
+        "efficiency": speed
+    }
+
+
+def describe(report: Dict) -> str:
+    """One-line summary of a run() report, for the feedback and the quality prompt"""
+    text = f"Passed {report['passed']}/{report['total']} hidden tests"
+    if report["edge_total"]:
+        text += f" and {report['edge_passed']}/{report['edge_total']} edge cases"
+    if report["runtime_ratio"] is not None and not report.get("same_output", True):
+        text += "; gave a different result from the reference solution on a large input"
+    elif report["runtime_ratio"] is not None:
+        text += f"; {report['runtime_ratio']:g}x the reference solution's runtime on a large input"
+    elif report["benchmarked"]:
+        text += "; did not finish on a large input"
+    text += "."
+    if report["stopped"] == "timeout":
+        text += " The run was stopped at the time limit."
+    elif report["stopped"]:
+        text += " The run was stopped at the CPU or memory limit."
+    if report["error"]:
+        text += f" First error: {report['error']}."
+    return text
+
+
+def combine(evaluation: Dict, report: Dict) -> Dict:
+    """Merge the LLM's code quality evaluation (scored 0-QUALITY_POINTS) with the measured points.
+    Partial evaluations without a score yet are returned as they are."""
+    if "score" not in evaluation:
+        return evaluation
+    points = measured_points(report)
+    points["quality"] = max(0, min(QUALITY_POINTS, evaluation["score"]))
+    reason = " ".join(part for part in (describe(report), evaluation.get("reason", "")) if part)
+    return dict(evaluation, score=sum(points.values()), reason=reason, tests=dict(report, points=points))
+
+
+if __name__ == "__main__":
+    # python code_runner.py suite.json answer.py - run an answer against a suite and print the report
+    if len(sys.argv) != 3:
+        print("Usage: python code_runner.py <suite.json> <answer.py>")
+        sys.exit(1)
+    if not CODE_EXECUTION:
+        print(f"Not running code: {CODE_EXECUTION_PROBLEM}")
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        suite = _check_suite(f.read())
+    with open(sys.argv[2]) as f:
+        answer = f.read()
+    if not can_run(suite, answer):
+        print("Not runnable" if not suite["runnable"] else "The answer is not Python code with a function")
+        sys.exit(1)
+    report = run(suite, answer)
+    print(json.dumps(dict(report, points=measured_points(report)), indent=2))
+    print(describe(report))
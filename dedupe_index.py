@@ -0,0 +1,182 @@
+# dedupe_index.py
+"""Cross-session near-duplicate index for interview questions.
+
+Every question served to a candidate is recorded per role as a MinHash
+signature. Banded LSH turns "is this new question too close to anything we
+already asked for this role?" into a handful of bucket lookups instead of a
+scan over every past question. The index is an append-only JSON-lines file,
+so recording a question is a single appended line. Every lookup first reads
+the lines appended since the last one, so questions recorded by other
+processes (other app servers, llm_worker.py pools) are seen too.
+The question bank filler compacts the file every DEDUPE_COMPACT_HOURS under a
+file lock that appends from every process also take, so no process's
+question is lost to the rewrite.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # no cross-process file locks on this platform - the index is never compacted
+
+DEDUPE_INDEX_DB = os.environ.get("DEDUPE_INDEX_DB", "question_index.jsonl")
+DEDUPE_THRESHOLD = float(os.environ.get("DEDUPE_THRESHOLD", "0.5"))  # estimated Jaccard similarity
+DEDUPE_TTL_DAYS = float(os.environ.get("DEDUPE_TTL_DAYS", "30"))      # forget questions older than this
+DEDUPE_COMPACT_HOURS = float(os.environ.get("DEDUPE_COMPACT_HOURS", "6"))  # drop expired lines from the file this often
+
+BANDS = 20
+ROWS = 3
+NUM_PERM = BANDS * ROWS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240101)  # fixed seed - signatures are persisted, so permutations must be stable
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "in", "on", "to", "for", "is", "are", "be", "by", "with",
+    "what", "how", "why", "when", "which", "do", "does", "you", "your", "it", "its", "this", "that",
+    "explain", "describe", "write", "can", "would", "between", "using", "use", "give", "example"
+}
+
+_lock = threading.Lock()
+_inode = None  # the index file last read; compact() replaces it
+_offset = 0    # bytes of it already read
+_entries: List[Tuple[str, str, Tuple[int, ...], float]] = []  # (role, question, signature, timestamp)
+_bands: Dict[Tuple[str, int, Tuple[int, ...]], List[int]] = {}
+_compacted_at = 0.0
+
+
+def shingles(text: str) -> set:
+    """Normalized content words of a question"""
+    words = re.findall(r"\w+", text.lower())
+    return {w for w in words if w not in _STOPWORDS and len(w) > 1} or set(words)
+
+
+def signature(text: str) -> Tuple[int, ...]:
+    """MinHash signature of a question's shingles"""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingles(text)]
+    if not hashes:
+        return tuple([_PRIME] * NUM_PERM)
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS)
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _band_keys(role: str, sig: Tuple[int, ...]):
+    for band in range(BANDS):
+        yield (role, band, sig[band * ROWS:(band + 1) * ROWS])
+
+
+def _insert(role: str, question: str, sig: Tuple[int, ...], ts: float):
+    idx = len(_entries)
+    _entries.append((role, question, sig, ts))
+    for key in _band_keys(role, sig):
+        _bands.setdefault(key, []).append(idx)
+
+
+@contextmanager
+def _file_lock(exclusive: bool):
+    """Hold the index's cross-process lock: shared to append to the file, exclusive to replace it"""
+    if fcntl is None:
+        yield
+        return
+    with open(DEDUPE_INDEX_DB + ".lock", 'a') as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _load():
+    """Bring the in-memory LSH tables up to date with the file (caller holds the lock):
+    read the lines appended since the last call, or everything if the file was replaced"""
+    global _inode, _offset
+    try:
+        f = open(DEDUPE_INDEX_DB, 'rb')
+    except FileNotFoundError:
+        return
+    with f:
+        stat = os.fstat(f.fileno())
+        if stat.st_ino != _inode or stat.st_size < _offset:
+            _entries.clear()
+            _bands.clear()
+            _inode, _offset = stat.st_ino, 0
+        if stat.st_size == _offset:
+            return
+        f.seek(_offset)
+        data = f.read()
+    complete = data.rfind(b"\n") + 1  # a line still being written is read next time
+    _offset += complete
+    cutoff = time.time() - DEDUPE_TTL_DAYS * 86400
+    for line in data[:complete].splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue  # torn write
+        if rec.get("ts", 0) >= cutoff and len(rec.get("sig", [])) == NUM_PERM:
+            _insert(rec["role"], rec["q"], tuple(rec["sig"]), rec["ts"])
+
+
+def find_similar(role: str, question: str, threshold: float = None) -> Optional[str]:
+    """Return a previously served question for this role that is a near-duplicate, if any"""
+    if threshold is None:
+        threshold = DEDUPE_THRESHOLD
+    sig = signature(question)
+    cutoff = time.time() - DEDUPE_TTL_DAYS * 86400
+    with _lock:
+        _load()
+        seen = set()
+        for key in _band_keys(role, sig):
+            for idx in _bands.get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                _, past_q, past_sig, ts = _entries[idx]
+                if ts >= cutoff and similarity(sig, past_sig) >= threshold:
+                    return past_q
+    return None
+
+
+def add(role: str, question: str):
+    """Record a question served to a candidate"""
+    sig = signature(question)
+    ts = time.time()
+    with _lock:
+        with _file_lock(exclusive=False), open(DEDUPE_INDEX_DB, 'a') as f:
+            f.write(json.dumps({"role": role, "q": question, "sig": list(sig), "ts": ts}) + "\n")
+        _load()  # picks up the new line, and any other process's since the last lookup
+
+
+def compact():
+    """Rewrite the index file without expired entries.
+    No process can append while it runs, so every line is either copied or still to be written."""
+    cutoff = time.time() - DEDUPE_TTL_DAYS * 86400
+    with _lock, _file_lock(exclusive=True):
+        _load()
+        live = [e for e in _entries if e[3] >= cutoff]
+        tmp_path = DEDUPE_INDEX_DB + ".tmp"
+        with open(tmp_path, 'w') as f:
+            for role, q, sig, ts in live:
+                f.write(json.dumps({"role": role, "q": q, "sig": list(sig), "ts": ts}) + "\n")
+        os.replace(tmp_path, DEDUPE_INDEX_DB)
+        _load()  # a new file - reloaded from scratch
+
+
+def maybe_compact():
+    """compact() if this process hasn't in DEDUPE_COMPACT_HOURS (called by the question bank filler)"""
+    global _compacted_at
+    if fcntl is None or not os.path.exists(DEDUPE_INDEX_DB) or time.time() - _compacted_at < DEDUPE_COMPACT_HOURS * 3600:
+        return
+    _compacted_at = time.time()
+    compact()
@@ -1,19 +1,24 @@
 # app.py
 import streamlit as st
-from typing import List, Dict
+import rerun_profiler
+rerun_profiler.profile_this_run()  # no-op unless PROFILE_RERUNS is set
 import os
 import time
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnableSequence
-import json
-import re
 import hashlib
-from datetime import datetime
-from pathlib import Path
-import base64
+from datetime import datetime, timedelta
+import question_bank
+import llm_metrics
+import llm_scheduler
+import storage
+import streaming
+from llm_client import warm_up
+from interview import DEEPSEEK_API_KEY, SKIPPED_ANSWER, TIMED_OUT_ANSWER, fill_question_bank
+import interview_engine
+import job_queue
+from interview_engine import ENGINE
+import llm_resilience
+from llm_resilience import LLMUnavailable
 try:
     from audio_recorder_streamlit import audio_recorder
     AUDIO_AVAILABLE = True
@@ -29,16 +34,11 @@ load_dotenv()
 # Ensure DEEPSEEK_API_KEY is set in your environment
 if "DEEPSEEK_API_KEY" not in os.environ:
     st.warning("Set environment variable DEEPSEEK_API_KEY before running. Example: export DEEPSEEK_API_KEY='sk-...'")
-DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY")
+HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", "10"))
+ADMIN_USERS = {u.strip() for u in os.environ.get("ADMIN_USERS", "").split(",") if u.strip()}  # may open the LLM Metrics page
 
-# Initialize LLM via LangChain with DeepSeek
-llm = ChatOpenAI(
-    model="deepseek-chat",
-    api_key=DEEPSEEK_API_KEY,
-    base_url="https://api.deepseek.com",
-    temperature=0,
-    max_tokens=400
-)
+# The shared LLM lives in interview.py; open its connections before the first candidate needs them
+warm_up(api_key=DEEPSEEK_API_KEY)
 
 # -------------------------
 # Helper functions
@@ -48,34 +48,12 @@ def init_state():
         st.session_state.logged_in = False
     if "candidate" not in st.session_state:
         st.session_state.candidate = {}
-    if "role" not in st.session_state:
-        st.session_state.role = None
-    if "lang" not in st.session_state:
-        st.session_state.lang = "English"
-    if "skills" not in st.session_state:
-        st.session_state.skills = []
-    if "asked_questions" not in st.session_state:
-        st.session_state.asked_questions = []
-    if "qa_history" not in st.session_state:
-        st.session_state.qa_history = []  # list of dicts: {q, a, score, feedback}
-    if "question_count" not in st.session_state:
-        st.session_state.question_count = 0
-    if "finalized" not in st.session_state:
-        st.session_state.finalized = False
-    if "current_question" not in st.session_state:
-        st.session_state.current_question = ""
+    if "interview" not in st.session_state:
+        st.session_state.interview = None  # interview_engine.Interview - everything about the current interview
     if "welcome_shown" not in st.session_state:
         st.session_state.welcome_shown = False
     if "last_ai_message" not in st.session_state:
         st.session_state.last_ai_message = ""
-    if "current_is_coding" not in st.session_state:
-        st.session_state.current_is_coding = False
-    if "question_start_time" not in st.session_state:
-        st.session_state.question_start_time = None
-    if "total_start_time" not in st.session_state:
-        st.session_state.total_start_time = None
-    if "time_expired" not in st.session_state:
-        st.session_state.time_expired = False
     if "username" not in st.session_state:
         st.session_state.username = None
     if "page_redirect" not in st.session_state:
@@ -84,14 +62,12 @@ def init_state():
         st.session_state.voice_mode = False
     if "audio_answer" not in st.session_state:
         st.session_state.audio_answer = None
-
-def get_time_remaining(start_time, max_seconds):
-    """Calculate remaining time in seconds"""
-    if start_time is None:
-        return max_seconds
-    elapsed = time.time() - start_time
-    remaining = max_seconds - elapsed
-    return max(0, remaining)
+    if "history_page" not in st.session_state:
+        st.session_state.history_page = 0
+    if "history_filters" not in st.session_state:
+        st.session_state.history_filters = None
+    if "history_open_id" not in st.session_state:
+        st.session_state.history_open_id = None  # the one evaluation whose Q&A detail is loaded
 
 def format_time(seconds):
     """Format seconds as MM:SS"""
@@ -99,34 +75,7 @@ def format_time(seconds):
     secs = int(seconds % 60)
     return f"{mins:02d}:{secs:02d}"
 
-# Database functions
-USERS_DB = "users.json"
-EVAL_HISTORY_DB = "evaluation_history.json"
-
-def load_users():
-    """Load users from JSON database"""
-    if os.path.exists(USERS_DB):
-        with open(USERS_DB, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    """Save users to JSON database"""
-    with open(USERS_DB, 'w') as f:
-        json.dump(users, f, indent=2)
-
-def load_eval_history():
-    """Load evaluation history from JSON database"""
-    if os.path.exists(EVAL_HISTORY_DB):
-        with open(EVAL_HISTORY_DB, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_eval_history(history):
-    """Save evaluation history to JSON database"""
-    with open(EVAL_HISTORY_DB, 'w') as f:
-        json.dump(history, f, indent=2)
-
+# Database functions (SQLite store - see storage.py; legacy JSON files are imported on first use)
 def hash_password(password):
     """Hash password using SHA256"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -247,25 +196,6 @@ def verify_password(stored_hash, password):
     """Verify password against stored hash"""
     return stored_hash == hash_password(password)
 
-def save_evaluation_result(username, eval_data):
-    """Save evaluation result to user's history"""
-    history = load_eval_history()
-    if username not in history:
-        history[username] = []
-    
-    eval_record = {
-        "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "role": eval_data.get("role"),
-        "score": eval_data.get("score"),
-        "max_score": eval_data.get("max_score"),
-        "percentage": eval_data.get("percentage"),
-        "time_taken": eval_data.get("time_taken"),
-        "qa_history": eval_data.get("qa_history", [])
-    }
-    
-    history[username].append(eval_record)
-    save_eval_history(history)
-
 def home_page():
     # Page styling with background
     st.markdown("""
@@ -308,16 +238,16 @@ def home_page():
                 if not username.strip() or not password.strip():
                     st.error("Please provide both username and password.")
                 else:
-                    users = load_users()
-                    if username in users and verify_password(users[username]["password"], password):
+                    user = storage.get_user(username)
+                    if user and verify_password(user["password"], password):
                         st.session_state.logged_in = True
                         st.session_state.username = username
                         st.session_state.candidate = {
-                            "name": users[username]["name"],
-                            "experience": users[username]["experience"],
-                            "email": users[username].get("email", "")
+                            "name": user["name"],
+                            "experience": user["experience"],
+                            "email": user.get("email") or ""
                         }
-                        st.success(f"Welcome back, {users[username]['name']}! 🎉")
+                        st.success(f"Welcome back, {user['name']}! 🎉")
                         time.sleep(1)
                         st.rerun()
                     else:
@@ -342,18 +272,16 @@ def home_page():
                 elif len(new_password) < 6:
                     st.error("Password must be at least 6 characters long.")
                 else:
-                    users = load_users()
-                    if new_username in users:
+                    created = storage.create_user(new_username, {
+                        "name": new_name.strip(),
+                        "email": new_email.strip(),
+                        "experience": new_experience,
+                        "password": hash_password(new_password),
+                        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    })
+                    if not created:
                         st.error("Username already exists. Please choose a different one.")
                     else:
-                        users[new_username] = {
-                            "name": new_name.strip(),
-                            "email": new_email.strip(),
-                            "experience": new_experience,
-                            "password": hash_password(new_password),
-                            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        }
-                        save_users(users)
                         st.success(f"Account created successfully! Welcome, {new_name}! 🎉")
                         st.info("Please login using the Login tab.")
     
@@ -370,108 +298,27 @@ def home_page():
         st.markdown("### 📊 Instant Feedback")
         st.write("Get detailed scores and improvement suggestions immediately")
 
-def build_question_prompt(role: str, skills: List[str], language: str, is_coding: bool = False, asked_questions: List[str] = None):
-    # Template that asks the LLM to produce role-specific technical questions
-    previous_questions = ""
-    if asked_questions:
-        previous_questions = f"\n\nIMPORTANT: Do NOT repeat these previously asked questions: {', '.join(asked_questions)}\nGenerate a completely DIFFERENT question."
-    
-    if is_coding:
-        template = (
-            "You are an interview generator for the role of {role}. "
-            "The candidate's listed skills: {skills}. "
-            "Generate one UNIQUE coding problem or algorithm question that requires writing actual code. "
-            "The question should ask the candidate to write a function, method, or code snippet. "
-            "Make it practical and relevant to the role. "
-            "Do not include answer or explanation. Output ONLY the question text. "
-            f"Respond in {{language}}.{previous_questions}"
-        )
-    else:
-        template = (
-            "You are an interview generator for the role of {role}. "
-            "The candidate's listed skills: {skills}. "
-            "Generate one UNIQUE theoretical or conceptual technical question (not a behavioral question) that tests these skills. "
-            "Focus on concepts, design patterns, best practices, or architecture. "
-            "Do not include answer or explanation. Output ONLY the question text. "
-            f"Respond in {{language}}.{previous_questions}"
-        )
-    
-    prompt = PromptTemplate(
-        template=template,
-        input_variables=["role", "skills", "language"]
-    )
-    return prompt
-
-def build_evaluator_prompt(role: str, skill_focus: str, question: str, candidate_answer: str, language: str, is_coding: bool = False):
-    # Prompt the LLM to evaluate candidate answer and give numeric score 0-20 & short feedback.
-    if is_coding:
-        template = (
-            "You are a strict technical interviewer/evaluator for the role of {role}. "
-            "Skill focus: {skill_focus}. "
-            "Question: {question}\n\n"
-            "Candidate answer: {candidate_answer}\n\n"
-            "This is a CODING question. Evaluate the code based on:\n"
-            "1. Correctness - Does the code solve the problem? (8 points)\n"
-            "2. Code Quality - Is it readable, well-structured? (4 points)\n"
-            "3. Efficiency - Is the approach optimal? (4 points)\n"
-            "4. Edge cases - Are they handled? (4 points)\n\n"
-            "In {language}, provide a numeric score between 0 and 20 (20 = perfect). "
-            "Include a reason explaining the score and 1-2 specific suggestions to improve the code. "
-            "If no code is provided or answer is off-topic, give 0 points. "
-            "Output in JSON with keys: score, reason, suggestions. "
-        )
-    else:
-        template = (
-            "You are a strict technical interviewer/evaluator for the role of {role}. "
-            "Skill focus: {skill_focus}. "
-            "Question: {question}\n\n"
-            "Candidate answer: {candidate_answer}\n\n"
-            "In {language}, first evaluate whether the answer addresses the technical requirements. "
-            "Then give a numeric score between 0 and 20 (20 = perfect), followed by a one-sentence reason and 1-2 suggestions to improve. "
-            "If the answer is off-topic, say it is off-topic and give 0 points. "
-            "Output in JSON with keys: score, reason, suggestions. "
-        )
-    
-    prompt = PromptTemplate(
-        template=template,
-        input_variables=["role", "skill_focus", "question", "candidate_answer", "language"]
-    )
-    return prompt
+def next_question(interview) -> tuple:
+    """Return the question to answer now, showing its text as it streams in"""
+    placeholder = st.empty()
+    on_partial = None
+    if streaming.STREAM_OUTPUT:
+        on_partial = streaming.placeholder_writer(placeholder, lambda text: f"**Question {interview.question_num + 1}:** {text}")
+    try:
+        result = interview_engine.run(ENGINE.next_question(interview, on_partial=on_partial))
+    except LLMUnavailable:
+        placeholder.empty()
+        st.error("⚠️ The question could not be generated in time. Please refresh the page to try again.")
+        st.stop()
+    placeholder.empty()
+    return result
 
-def gen_question(role: str, skills: List[str], language: str, question_num: int = 1, asked_questions: List[str] = None) -> tuple:
-    # Questions 3 and 5 will be coding questions
-    is_coding = question_num in [3, 5]
-    prompt = build_question_prompt(role, ", ".join(skills), language, is_coding, asked_questions)
-    
-    # Use temperature > 0 for variety in questions
-    varied_llm = ChatOpenAI(
-        model="deepseek-chat",
-        api_key=DEEPSEEK_API_KEY,
-        base_url="https://api.deepseek.com",
-        temperature=0.7,  # Add randomness to avoid repetition
-        max_tokens=400
-    )
-    chain = prompt | varied_llm | StrOutputParser()
-    question = chain.invoke({"role": role, "skills": ", ".join(skills), "language": language})
-    return question.strip().strip('"'), is_coding
 
-def evaluate_answer(role: str, skill_focus: str, question: str, answer: str, language: str, is_coding: bool = False) -> Dict:
-    prompt = build_evaluator_prompt(role, skill_focus, question, answer, language, is_coding)
-    chain = prompt | llm | StrOutputParser()
-    res = chain.invoke({"role": role, "skill_focus": skill_focus, "question": question, "candidate_answer": answer, "language": language})
-    # Try to parse simple "score: X" or JSON-like output; we'll be permissive
-    # Expecting a JSON-like, but if not, we fallback to parsing digits.
-    try:
-        # attempt to find JSON substring
-        jtext = res[res.find("{"):res.rfind("}")+1]
-        parsed = json.loads(jtext)
-        parsed['raw'] = res
-        return parsed
-    except Exception:
-        # fallback: try to extract first integer 0-20
-        m = re.search(r"(\b[0-1]?\d|20)\b", res)
-        score = int(m.group(0)) if m else 0
-        return {"score": score, "reason": res[:200], "suggestions": "", "raw": res}
+# Keep the question bank topped up in the background (once per server process) - the llm_worker.py pools do it with JOB_QUEUE
+if not job_queue.JOB_QUEUE:
+    question_bank.start_filler(fill_question_bank)
+# Publish LLM metrics to METRICS_FILE / METRICS_PORT if configured (once per server process)
+llm_metrics.start_exporters()
 
 # -------------------------
 # UI
@@ -488,20 +335,15 @@ init_state()
 if st.session_state.logged_in:
     st.sidebar.success(f"👤 Logged in as: **{st.session_state.candidate.get('name')}**")
     menu = ["Home", "New Evaluation", "Evaluation History", "Results"]
+    if st.session_state.username in ADMIN_USERS:
+        menu.append("LLM Metrics")
     if st.sidebar.button("🚪 Logout"):
         # Save current evaluation if exists
-        if st.session_state.finalized and st.session_state.qa_history:
-            total_score = sum([q["score"] for q in st.session_state.qa_history])
-            max_score = 20 * len(st.session_state.qa_history)
-            time_taken = time.time() - st.session_state.total_start_time if st.session_state.total_start_time else 0
-            save_evaluation_result(st.session_state.username, {
-                "role": st.session_state.role,
-                "score": total_score,
-                "max_score": max_score,
-                "percentage": (total_score / max_score * 100) if max_score else 0,
-                "time_taken": time_taken,
-                "qa_history": st.session_state.qa_history
-            })
+        interview = st.session_state.interview
+        if interview is not None:
+            if interview.finished and interview.qa_history and not interview.eval_id:
+                interview_engine.run(ENGINE.finalize(interview, recommend=False))
+            ENGINE.abandon(interview)
         
         # Clear session
         for key in list(st.session_state.keys()):
@@ -523,13 +365,11 @@ if choice == "Home":
         with col1:
             st.info("📝 Start a new evaluation from the **New Evaluation** page")
         with col2:
-            history = load_eval_history()
-            user_evals = history.get(st.session_state.username, [])
-            st.metric("🎯 Total Evaluations", len(user_evals))
+            user_stats = storage.get_user_stats(st.session_state.username)
+            st.metric("🎯 Total Evaluations", user_stats["evaluations"])
         with col3:
-            if user_evals:
-                avg_score = sum([e["percentage"] for e in user_evals]) / len(user_evals)
-                st.metric("📊 Average Score", f"{avg_score:.1f}%")
+            if user_stats["evaluations"]:
+                st.metric("📊 Average Score", f"{user_stats['average_percentage']:.1f}%")
         
         st.markdown("---")
         st.subheader("Quick Actions")
@@ -556,34 +396,29 @@ elif choice == "New Evaluation":
         skills_text = st.text_input("Main technical skills (comma-separated). Example: Spring Boot, REST, SQL, Kafka")
         start = st.form_submit_button("Start Evaluation")
         if start:
-            st.session_state.role = role
-            st.session_state.lang = language
-            skills = [s.strip() for s in skills_text.split(",") if s.strip()]
-            if not skills:
+            try:
+                interview = interview_engine.run(ENGINE.start(st.session_state.username, role, skills_text.split(","), language))
+            except ValueError:
                 st.warning("Please list at least one skill to focus the interview.")
             else:
-                st.session_state.skills = skills
-                st.session_state.asked_questions = []
-                st.session_state.qa_history = []
-                st.session_state.question_count = 0
-                st.session_state.finalized = False
+                # Drop the previous interview's background work; the engine is already on the first question
+                if st.session_state.interview is not None:
+                    ENGINE.abandon(st.session_state.interview)
+                st.session_state.interview = interview
                 st.session_state.welcome_shown = False  # Reset welcome for new evaluation
-                st.session_state.current_question = ""
-                st.session_state.question_start_time = None
-                st.session_state.total_start_time = time.time()  # Start total timer
-                st.session_state.time_expired = False
                 st.success("Setup complete. Scroll down to the chat below.")
                 st.rerun()
 
     # Chat / interview UI
-    if st.session_state.role and st.session_state.skills:
+    interview = st.session_state.interview
+    if interview is not None:
         st.subheader("Interview Chat")
         
         # Welcome message from AI (once)
         if not st.session_state.welcome_shown:
             welcome_text = f"Welcome {st.session_state.candidate.get('name')}! 👋\n\n"
-            welcome_text += f"I'm your AI interviewer for the {st.session_state.role} position. "
-            welcome_text += f"We will conduct a technical evaluation with 5 questions focusing on your skills: {', '.join(st.session_state.skills)}.\n\n"
+            welcome_text += f"I'm your AI interviewer for the {interview.role} position. "
+            welcome_text += f"We will conduct a technical evaluation with 5 questions focusing on your skills: {', '.join(interview.skills)}.\n\n"
             welcome_text += "📋 **Interview Format:**\n"
             welcome_text += "- Questions 1-2: Theoretical/Conceptual\n"
             welcome_text += "- Question 3: Coding Problem 💻\n"
@@ -593,20 +428,14 @@ elif choice == "New Evaluation":
             
             st.session_state.welcome_shown = True
             st.session_state.last_ai_message = welcome_text
-            
-            # Generate first question
-            first_q, is_coding = gen_question(st.session_state.role, st.session_state.skills, st.session_state.lang, question_num=1, asked_questions=[])
-            st.session_state.asked_questions.append(first_q)
-            st.session_state.question_count = 1
-            st.session_state.current_question = first_q
-            st.session_state.current_is_coding = is_coding
-            st.session_state.question_start_time = time.time()  # Start timer for first question
+        
+        # Generate first question (starts its timer) - retried on the next rerun if it didn't arrive
+        if not interview.current_question and not interview.finished:
+            next_question(interview)
         
         # Check total time (50 minutes max)
-        total_time_remaining = get_time_remaining(st.session_state.total_start_time, 50 * 60)
-        if total_time_remaining <= 0 and not st.session_state.finalized:
-            st.session_state.finalized = True
-            st.session_state.time_expired = True
+        total_time_remaining = interview.total_time_left()
+        if not interview.finished and ENGINE.expire(interview):
             st.error("⏰ Time's up! Total interview time (50 minutes) has expired.")
             st.info("👉 Please go to the **Results** page to see your evaluation.")
             st.stop()
@@ -614,20 +443,20 @@ elif choice == "New Evaluation":
         # Display total timer with auto-refresh
         col1, col2 = st.columns([3, 1])
         with col2:
-            if not st.session_state.finalized:
+            if not interview.finished:
                 timer_placeholder = st.empty()
                 timer_placeholder.metric("⏱️ Total Time Left", format_time(total_time_remaining))
         
         # Display welcome message
-        if st.session_state.last_ai_message and not st.session_state.qa_history:
+        if st.session_state.last_ai_message and not interview.qa_history:
             st.info(st.session_state.last_ai_message)
         
         # Show previous QA history first (older questions at top)
-        if st.session_state.qa_history:
+        if interview.qa_history:
             st.markdown("### 📝 Interview Progress:")
-            for idx, qa in enumerate(st.session_state.qa_history, start=1):
+            for idx, qa in enumerate(interview.qa_history, start=1):
                 # Determine if this was a coding question (questions 3 and 5)
-                q_type_icon = "💻" if idx in [3, 5] else "💭"
+                q_type_icon = "💻" if idx in interview_engine.CODING_QUESTIONS else "💭"
                 with st.expander(f"{q_type_icon} Question {idx} - Score: {qa.get('score')}/20", expanded=False):
                     st.markdown(f"**Q:** {qa['q']}")
                     st.markdown(f"**Your Answer:** {qa['a']}")
@@ -696,17 +525,17 @@ elif choice == "New Evaluation":
                 st.caption("Click to test if audio works")
         
         # Display current question (newest at bottom)
-        if st.session_state.current_question and st.session_state.question_count > 0 and st.session_state.question_count <= 5:
+        if interview.current_question and not interview.finished:
             # Check question time (10 minutes max per question)
-            question_time_remaining = get_time_remaining(st.session_state.question_start_time, 10 * 60)
+            question_time_remaining = interview.question_time_left()
             
-            question_type = "💻 Coding Question" if st.session_state.current_is_coding else "💭 Conceptual Question"
-            st.markdown(f"### ❓ Question {st.session_state.question_count}: {question_type}")
+            question_type = "💻 Coding Question" if interview.current_is_coding else "💭 Conceptual Question"
+            st.markdown(f"### ❓ Question {interview.question_num}: {question_type}")
             
             # Display question timer
             col1, col2, col3 = st.columns([3, 1, 0.5])
             with col1:
-                st.markdown(f"**{st.session_state.current_question}**")
+                st.markdown(f"**{interview.current_question}**")
                 
                 # Add text-to-speech button for the question
                 if st.session_state.voice_mode:
@@ -714,7 +543,7 @@ elif choice == "New Evaluation":
                     col_tts1, col_tts2 = st.columns([1, 3])
                     with col_tts1:
                         # HTML-based TTS button
-                        st.markdown(create_audio_player(st.session_state.current_question, f"q{st.session_state.question_count}"), unsafe_allow_html=True)
+                        st.markdown(create_audio_player(interview.current_question, f"q{interview.question_num}"), unsafe_allow_html=True)
                     with col_tts2:
                         st.caption("💡 Click the button above to hear the question read aloud")
             
@@ -726,9 +555,9 @@ elif choice == "New Evaluation":
                     st.rerun()
 
         # Candidate answer input
-        if not st.session_state.finalized:
+        if not interview.finished:
             # Check if question time expired
-            question_time_remaining = get_time_remaining(st.session_state.question_start_time, 10 * 60)
+            question_time_remaining = interview.question_time_left()
             
             # Voice input section (outside form)
             if st.session_state.voice_mode:
@@ -745,7 +574,7 @@ elif choice == "New Evaluation":
                             neutral_color="#667eea",
                             icon_name="microphone",
                             icon_size="3x",
-                            key=f"audio_recorder_{st.session_state.question_count}"
+                            key=f"audio_recorder_{interview.question_num}"
                         )
                         
                         if audio_bytes:
@@ -836,8 +665,8 @@ elif choice == "New Evaluation":
             with st.form("answer_form", clear_on_submit=True):
                 # Pre-fill with audio transcription if available
                 default_text = st.session_state.audio_answer if st.session_state.audio_answer else ""
-                placeholder_text = "Write your code here..." if st.session_state.current_is_coding else "Type your answer here (or use voice input above)..."
-                answer = st.text_area("Your answer", value=default_text, key="answer_area", height=200 if st.session_state.current_is_coding else 150, placeholder=placeholder_text)
+                placeholder_text = "Write your code here..." if interview.current_is_coding else "Type your answer here (or use voice input above)..."
+                answer = st.text_area("Your answer", value=default_text, key="answer_area", height=200 if interview.current_is_coding else 150, placeholder=placeholder_text)
                 
                 col1, col2 = st.columns([1, 1])
                 with col1:
@@ -848,34 +677,39 @@ elif choice == "New Evaluation":
                 # Handle timeout
                 if question_time_remaining <= 0:
                     st.warning("⏰ Time's up for this question! Auto-submitting...")
-                    answer = answer if answer.strip() else "[No answer provided - Time expired]"
+                    answer = answer if answer.strip() else TIMED_OUT_ANSWER
                     submit_ans = True
                 
                 if submit_ans or skip_ans:
                     if skip_ans:
-                        answer = "[Skipped - Don't know]"
+                        answer = SKIPPED_ANSWER
                     elif not answer.strip():
                         st.error("Please provide an answer before submitting.")
                         st.stop()
                     
-                    # Evaluate answer
-                    q = st.session_state.current_question
-                    skill_focus = st.session_state.skills[0]  # for simplicity, focus on first skill (could be rotated)
-                    is_coding = st.session_state.current_is_coding
-                    
-                    spinner_text = "🤔 Evaluating your code..." if is_coding else "🤔 Evaluating your answer..."
+                    # Evaluate answer (the engine loads the next question alongside)
+                    spinner_text = "🤔 Evaluating your code..." if interview.current_is_coding else "🤔 Evaluating your answer..."
                     with st.spinner(spinner_text):
-                        eval_result = evaluate_answer(st.session_state.role, skill_focus, q, answer, st.session_state.lang, is_coding)
-                    
-                    # Parse evaluation results
-                    score = int(eval_result.get("score", 0))
-                    reason = eval_result.get("reason", "") or eval_result.get("raw", "")
-                    suggestions = eval_result.get("suggestions", "")
-                    
-                    # Save to history
-                    st.session_state.qa_history.append({
-                        "q": q, "a": answer, "score": score, "feedback": f"{reason} {suggestions}"
-                    })
+                        # Show the score and feedback while the evaluator is still writing them
+                        live_feedback = st.empty()
+                        def render_partial_evaluation(fields):
+                            if "score" not in fields:
+                                return ""
+                            partial = f"**Score: {fields['score']}/20**"
+                            if fields.get("reason"):
+                                partial += f"\n\n**💬 Feedback:** {fields['reason']}"
+                            return partial
+                        show_partial = streaming.placeholder_writer(live_feedback, render_partial_evaluation)
+                        try:
+                            eval_result = interview_engine.run(ENGINE.submit_answer(interview, answer, on_partial=show_partial))
+                        except LLMUnavailable:
+                            # The form clears on submit - put the answer back so it can be resubmitted as is
+                            live_feedback.empty()
+                            st.session_state.audio_answer = answer
+                            st.error("⚠️ The evaluator did not respond in time. Your answer has been kept - please submit it again.")
+                            st.stop()
+                        live_feedback.empty()
+                    score, reason, suggestions = eval_result["score"], eval_result["reason"], eval_result["suggestions"]
                     
                     # Display immediate feedback
                     st.markdown("---")
@@ -899,74 +733,16 @@ elif choice == "New Evaluation":
                     st.markdown("---")
                     
                     # Check if interview is complete or move to next question
-                    if st.session_state.question_count >= 5:
-                        st.session_state.finalized = True
-                        
-                        # Save evaluation to history
-                        total_score = sum([q["score"] for q in st.session_state.qa_history])
-                        max_score = 20 * len(st.session_state.qa_history)
-                        time_taken = time.time() - st.session_state.total_start_time if st.session_state.total_start_time else 0
-                        save_evaluation_result(st.session_state.username, {
-                            "role": st.session_state.role,
-                            "score": total_score,
-                            "max_score": max_score,
-                            "percentage": (total_score / max_score * 100) if max_score else 0,
-                            "time_taken": time_taken,
-                            "qa_history": st.session_state.qa_history
-                        })
-                        
+                    if eval_result["complete"]:
+                        # Saved, and the final recommendation is being written in the background
                         st.balloons()
                         st.success("🎉 Interview complete! You've answered all 5 questions.")
                         st.info("👉 Please go to the **Results** page to see your final evaluation.")
                     else:
-                        # Generate next question
-                        next_q_num = st.session_state.question_count + 1
-                        with st.spinner("Preparing next question..."):
-                            tries = 0
-                            new_q = ""
-                            new_is_coding = False
-                            while tries < 8:
-                                tries += 1
-                                candidate_q, new_is_coding = gen_question(
-                                    st.session_state.role, 
-                                    st.session_state.skills, 
-                                    st.session_state.lang, 
-                                    question_num=next_q_num,
-                                    asked_questions=st.session_state.asked_questions
-                                )
-                                # Check if question is truly unique (not just different wording)
-                                is_duplicate = False
-                                for asked in st.session_state.asked_questions:
-                                    # Simple similarity check - if more than 50% of words match, consider it duplicate
-                                    asked_words = set(asked.lower().split())
-                                    candidate_words = set(candidate_q.lower().split())
-                                    if len(asked_words) > 0:
-                                        overlap = len(asked_words.intersection(candidate_words)) / len(asked_words)
-                                        if overlap > 0.5:
-                                            is_duplicate = True
-                                            break
-                                
-                                if not is_duplicate:
-                                    new_q = candidate_q
-                                    break
-                            
-                            if not new_q:
-                                # Fallback question if generation fails
-                                if next_q_num in [3, 5]:
-                                    new_q = f"Write a function to solve a common problem using {st.session_state.skills[0]}."
-                                    new_is_coding = True
-                                else:
-                                    new_q = f"Explain an advanced concept or best practice related to {st.session_state.skills[0]}."
-                                    new_is_coding = False
-                            
-                            st.session_state.asked_questions.append(new_q)
-                            st.session_state.current_question = new_q
-                            st.session_state.current_is_coding = new_is_coding
-                            st.session_state.question_count = next_q_num
-                            st.session_state.question_start_time = time.time()  # Reset timer for new question
-                            st.session_state.audio_answer = None  # Clear previous audio recording
+                        # The next question is already current (generated alongside the evaluation)
+                        st.session_state.audio_answer = None  # Clear previous audio recording
                         
-                        st.success(f"✅ Moving to Question {st.session_state.question_count}...")
+                        st.success(f"✅ Moving to Question {interview.question_num}...")
                         time.sleep(1.5)  # Brief pause before refresh
                         st.rerun()
 
@@ -978,59 +754,125 @@ elif choice == "Evaluation History":
     st.title("📜 Evaluation History")
     st.markdown(f"**User:** {st.session_state.candidate.get('name')}")
     
-    history = load_eval_history()
-    user_evals = history.get(st.session_state.username, [])
+    username = st.session_state.username
+    total_evals = storage.get_user_stats(username)["evaluations"]
     
-    if not user_evals:
+    if not total_evals:
         st.info("No evaluation history found. Complete your first evaluation to see results here!")
         if st.button("🚀 Start New Evaluation"):
             st.session_state.page_redirect = "New Evaluation"
             st.rerun()
     else:
-        st.success(f"You have completed **{len(user_evals)}** evaluation(s)")
+        st.success(f"You have completed **{total_evals}** evaluation(s)")
         
-        # Display evaluations in reverse chronological order (newest first)
-        for idx, eval_data in enumerate(reversed(user_evals), 1):
-            with st.expander(f"📝 Evaluation #{len(user_evals) - idx + 1} - {eval_data['date']} - {eval_data['role']}", expanded=(idx==1)):
-                col1, col2, col3, col4 = st.columns(4)
-                with col1:
-                    st.metric("Role", eval_data['role'])
-                with col2:
-                    st.metric("Score", f"{eval_data['score']}/{eval_data['max_score']}")
-                with col3:
-                    st.metric("Percentage", f"{eval_data['percentage']:.1f}%")
-                with col4:
-                    st.metric("Time", format_time(eval_data['time_taken']))
-                
-                st.markdown("---")
-                st.subheader("Question-wise Performance:")
-                
-                for q_idx, qa in enumerate(eval_data['qa_history'], 1):
-                    q_type_icon = "💻" if q_idx in [3, 5] else "💭"
-                    with st.container():
-                        st.markdown(f"**{q_type_icon} Question {q_idx}:** {qa['q']}")
-                        st.markdown(f"**Your Answer:** {qa['a']}")
-                        score_color = "🟢" if qa['score'] >= 16 else "🟡" if qa['score'] >= 12 else "🟠" if qa['score'] >= 8 else "🔴"
-                        st.markdown(f"**{score_color} Score:** {qa['score']}/20")
-                        st.markdown(f"**Feedback:** {qa['feedback']}")
+        # Filters are applied in the database query
+        col1, col2 = st.columns(2)
+        with col1:
+            role_filter = st.selectbox("Role", ["All roles"] + storage.user_roles(username))
+        with col2:
+            date_filter = st.checkbox("Filter by date")
+        date_from = date_to = None
+        if date_filter:
+            col1, col2 = st.columns(2)
+            with col1:
+                date_from = st.date_input("From", value=datetime.now().date() - timedelta(days=30)).isoformat()
+            with col2:
+                date_to = st.date_input("To", value=datetime.now().date()).isoformat()
+        role = None if role_filter == "All roles" else role_filter
+        
+        filters = (role, date_from, date_to)
+        if st.session_state.history_filters != filters:
+            st.session_state.history_filters = filters
+            st.session_state.history_page = 0
+        
+        matching = storage.count_evaluations(username, *filters)
+        page_count = max(1, -(-matching // HISTORY_PAGE_SIZE))
+        page = min(st.session_state.history_page, page_count - 1)
+        offset = page * HISTORY_PAGE_SIZE
+        summaries = storage.evaluation_summaries(username, *filters, limit=HISTORY_PAGE_SIZE, offset=offset)
+        
+        if not summaries:
+            st.info("No evaluations match these filters.")
+        
+        # Summary rows only - the Q&A detail is loaded for the opened evaluation alone
+        for idx, eval_data in enumerate(summaries):
+            eval_num = matching - offset - idx
+            is_open = st.session_state.history_open_id == eval_data['id']
+            col1, col2, col3, col4, col5 = st.columns([3, 3, 2, 2, 1])
+            with col1:
+                st.markdown(f"**📝 #{eval_num}** {eval_data['date']}")
+            with col2:
+                st.markdown(eval_data['role'])
+            with col3:
+                st.markdown(f"{eval_data['score']}/{eval_data['max_score']}")
+            with col4:
+                st.markdown(f"{eval_data['percentage']:.1f}%")
+            with col5:
+                if st.button("Close" if is_open else "Open", key=f"history_open_{eval_data['id']}"):
+                    st.session_state.history_open_id = None if is_open else eval_data['id']
+                    st.rerun()
+            
+            if is_open:
+                eval_detail = storage.get_evaluation(username, eval_data['id'])
+                if eval_detail:
+                    with st.container(border=True):
+                        col1, col2, col3, col4 = st.columns(4)
+                        with col1:
+                            st.metric("Role", eval_detail['role'])
+                        with col2:
+                            st.metric("Score", f"{eval_detail['score']}/{eval_detail['max_score']}")
+                        with col3:
+                            st.metric("Percentage", f"{eval_detail['percentage']:.1f}%")
+                        with col4:
+                            st.metric("Time", format_time(eval_detail['time_taken']))
+                        
+                        if eval_detail.get('recommendation'):
+                            st.markdown("---")
+                            st.subheader("Final Recommendation:")
+                            st.markdown(eval_detail['recommendation'])
+                        
                         st.markdown("---")
+                        st.subheader("Question-wise Performance:")
+                        
+                        for q_idx, qa in enumerate(eval_detail['qa_history'], 1):
+                            q_type_icon = "💻" if storage.question_type(qa, q_idx) == "coding" else "💭"
+                            with st.container():
+                                st.markdown(f"**{q_type_icon} Question {q_idx}:** {qa['q']}")
+                                st.markdown(f"**Your Answer:** {qa['a']}")
+                                score_color = "🟢" if qa['score'] >= 16 else "🟡" if qa['score'] >= 12 else "🟠" if qa['score'] >= 8 else "🔴"
+                                st.markdown(f"**{score_color} Score:** {qa['score']}/20")
+                                st.markdown(f"**Feedback:** {qa['feedback']}")
+                                st.markdown("---")
+        
+        if page_count > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                if st.button("⬅️ Newer", disabled=page == 0, use_container_width=True):
+                    st.session_state.history_page = page - 1
+                    st.rerun()
+            with col2:
+                st.markdown(f"<div style='text-align: center;'>Page {page + 1} of {page_count} • {matching} evaluation(s)</div>", unsafe_allow_html=True)
+            with col3:
+                if st.button("Older ➡️", disabled=page >= page_count - 1, use_container_width=True):
+                    st.session_state.history_page = page + 1
+                    st.rerun()
 
 elif choice == "Results":
     if not st.session_state.logged_in:
         st.info("Please login first on the Login page.")
         st.stop()
     st.header("Interview Results")
-    total_score = sum([q["score"] for q in st.session_state.qa_history])
-    max_score = 20 * max(1, len(st.session_state.qa_history))
-    pct = (total_score / max_score) * 100 if max_score else 0
-    
-    # Calculate time taken
-    time_taken = 0
-    if st.session_state.total_start_time:
-        time_taken = time.time() - st.session_state.total_start_time
+    interview = st.session_state.interview
+    if interview is None:
+        st.info("No evaluation yet. Start one from the **New Evaluation** page.")
+        st.stop()
+    total_score = interview.total_score
+    max_score = interview.max_score
+    pct = interview.percentage
+    time_taken = interview.time_taken()
     
     st.markdown(f"**Candidate:** {st.session_state.candidate.get('name')}")
-    st.markdown(f"**Role:** {st.session_state.role}  •  **Language:** {st.session_state.lang}")
+    st.markdown(f"**Role:** {interview.role}  •  **Language:** {interview.language}")
     
     # Display time info
     col1, col2 = st.columns(2)
@@ -1039,13 +881,13 @@ elif choice == "Results":
     with col2:
         st.metric("⏱️ Time Taken", format_time(time_taken))
     
-    if st.session_state.time_expired:
+    if interview.time_expired:
         st.warning("⚠️ Note: Interview was terminated due to timeout (50 minutes exceeded).")
     
     st.markdown("---")
     st.markdown("### 📋 Detailed Question-wise Performance")
-    for i, qa in enumerate(st.session_state.qa_history, start=1):
-        q_type_icon = "💻" if i in [3, 5] else "💭"
+    for i, qa in enumerate(interview.qa_history, start=1):
+        q_type_icon = "💻" if i in interview_engine.CODING_QUESTIONS else "💭"
         score_color = "🟢" if qa['score'] >= 16 else "🟡" if qa['score'] >= 12 else "🟠" if qa['score'] >= 8 else "🔴"
         with st.expander(f"{q_type_icon} Question {i} - {score_color} Score: {qa['score']}/20", expanded=False):
             st.markdown(f"**Q:** {qa['q']}")
@@ -1058,58 +900,35 @@ elif choice == "Results":
     st.markdown("## 🎯 Final Recommendation")
     
     # Check if evaluation is complete (all 5 questions answered)
-    if len(st.session_state.qa_history) < 5:
+    if not interview.complete:
         st.info("⏳ **Evaluation in Progress**")
-        st.write(f"Completed: {len(st.session_state.qa_history)}/5 questions")
+        st.write(f"Completed: {len(interview.qa_history)}/5 questions")
         st.write("Please complete all questions to receive your final recommendation.")
     else:
-        # Generate AI-powered recommendation
-        with st.spinner("🤖 Generating detailed recommendation..."):
-            # Prepare summary for AI
-            qa_summary = ""
-            for i, qa in enumerate(st.session_state.qa_history, 1):
-                qa_summary += f"Q{i} (Score: {qa['score']}/20): {qa['q'][:100]}... Answer quality: {qa['feedback'][:150]}...\n"
-            
-            recommendation_prompt = PromptTemplate(
-                template=(
-                    "You are a senior technical hiring manager evaluating a candidate for {role} position.\n\n"
-                    "Candidate Performance Summary:\n"
-                    "- Total Score: {total_score}/{max_score} ({percentage:.1f}%)\n"
-                    "- Questions Answered: 5 (2 conceptual, 2 coding, 1 conceptual)\n"
-                    "- Time Taken: {time_taken} minutes\n\n"
-                    "Question-wise breakdown:\n{qa_summary}\n\n"
-                    "Based on this performance, provide:\n"
-                    "1. Clear recommendation: RECOMMENDED or NOT RECOMMENDED\n"
-                    "2. 2-3 key strengths observed\n"
-                    "3. 2-3 areas for improvement\n"
-                    "4. Brief rationale (2-3 sentences) explaining your recommendation\n\n"
-                    "Be professional, constructive, and specific. Format your response clearly."
-                ),
-                input_variables=["role", "total_score", "max_score", "percentage", "time_taken", "qa_summary"]
-            )
-            
-            chain = recommendation_prompt | llm | StrOutputParser()
-            recommendation = chain.invoke({
-                "role": st.session_state.role,
-                "total_score": total_score,
-                "max_score": max_score,
-                "percentage": pct,
-                "time_taken": f"{int(time_taken // 60)}:{int(time_taken % 60):02d}",
-                "qa_summary": qa_summary
-            })
-            
-            # Display recommendation with styling
-            if "RECOMMENDED" in recommendation.upper() and "NOT RECOMMENDED" not in recommendation.upper():
-                st.success("✅ **Candidate is RECOMMENDED for this role**")
-            else:
-                st.error("❌ **Candidate is NOT RECOMMENDED for this role**")
-            
+        # The recommendation is computed once per completed evaluation (started in the background
+        # when the last answer was scored) and kept on the interview for every rerun after that
+        if interview.recommendation is None:
+            with st.spinner("🤖 Generating detailed recommendation..."):
+                # Render the recommendation as it is written instead of waiting for the whole text
+                live_recommendation = st.empty()
+                interview_engine.run(ENGINE.finalize(interview, on_partial=streaming.placeholder_writer(live_recommendation)))
+                live_recommendation.empty()
+        recommendation = interview.recommendation
+        
+        # Display recommendation with styling
+        if recommendation is None:
+            st.warning("⚠️ The recommendation could not be generated right now. Open Results again in a moment to retry.")
+        elif "RECOMMENDED" in recommendation.upper() and "NOT RECOMMENDED" not in recommendation.upper():
+            st.success("✅ **Candidate is RECOMMENDED for this role**")
+            st.markdown(recommendation)
+        else:
+            st.error("❌ **Candidate is NOT RECOMMENDED for this role**")
             st.markdown(recommendation)
     
     st.markdown("---")
     
     # Export results button
-    if len(st.session_state.qa_history) == 5:
+    if interview.complete:
         if st.button("📥 Export Complete Evaluation Report", use_container_width=True):
             import io
             out = io.StringIO()
@@ -1117,14 +936,14 @@ elif choice == "Results":
             out.write("CANDIDATE EVALUATION REPORT\n")
             out.write("="*60 + "\n\n")
             out.write(f"Candidate: {st.session_state.candidate.get('name')}\n")
-            out.write(f"Role: {st.session_state.role}\n")
+            out.write(f"Role: {interview.role}\n")
             out.write(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             out.write(f"Total Score: {total_score}/{max_score} ({pct:.1f}%)\n")
             out.write(f"Time Taken: {format_time(time_taken)}\n\n")
             out.write("="*60 + "\n")
             out.write("QUESTION-WISE PERFORMANCE\n")
             out.write("="*60 + "\n\n")
-            for i, qa in enumerate(st.session_state.qa_history, start=1):
+            for i, qa in enumerate(interview.qa_history, start=1):
                 out.write(f"Q{i}: {qa['q']}\n")
                 out.write(f"Answer: {qa['a']}\n")
                 out.write(f"Score: {qa['score']}/20\n")
@@ -1133,3 +952,81 @@ elif choice == "Results":
             
             filename = f"evaluation_{st.session_state.username}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
             st.download_button("📄 Download Report", out.getvalue(), file_name=filename, mime="text/plain")
+
+elif choice == "LLM Metrics":
+    if st.session_state.username not in ADMIN_USERS:
+        st.info("This page is only available to administrators.")
+        st.stop()
+    st.title("📈 LLM Metrics")
+    st.caption("Calls made by this server process since it started.")
+    if job_queue.JOB_QUEUE:
+        st.info("LLM calls run in the llm_worker.py processes, so the call, scheduler and circuit breaker figures below "
+                "only cover this web process. Each worker exports its own metrics with a `worker` label "
+                "(METRICS_PORT + 1 + n, or METRICS_FILE with a -<worker> suffix); aggregate them in Prometheus.")
+    
+    summary = llm_metrics.call_site_summary()
+    if not summary:
+        st.info("No LLM calls recorded yet.")
+    else:
+        st.subheader("Per call site")
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown("**Cache hit rate**")
+        lookups = {}
+        for labels, value in llm_metrics.REGISTRY.counters("cache_requests_total"):
+            lookups.setdefault(labels["cache"], {"hit": 0, "miss": 0})[labels["result"]] += value
+        for cache, counts in sorted(lookups.items()):
+            total = counts["hit"] + counts["miss"]
+            st.metric(cache.replace("_", " ").title(), f"{counts['hit'] / total * 100:.0f}%" if total else "-", help=f"{int(counts['hit'])} of {int(total)} lookups")
+    with col2:
+        st.markdown("**Question generation**")
+        st.metric("Retry rounds", int(sum(llm_metrics.counter_totals("question_retries_total", "question_num").values())))
+        st.metric("Duplicates rejected", int(sum(llm_metrics.counter_totals("question_duplicates_total", "call_site").values())))
+        st.metric("Fallback questions", int(sum(llm_metrics.counter_totals("question_fallbacks_total", "question_num").values())))
+    with col3:
+        st.markdown("**HTTP attempts**")
+        attempts = llm_metrics.counter_totals("llm_http_requests_total", "status")
+        calls = sum(row["calls"] for row in summary)
+        st.metric("Attempts", int(sum(attempts.values())), help="Includes the client's own retries")
+        st.metric("Retried attempts", max(0, int(sum(attempts.values())) - calls))
+        failed = {status: int(n) for status, n in sorted(attempts.items()) if not status.startswith("2")}
+        if failed:
+            st.caption("Non-2xx: " + ", ".join(f"{status} × {n}" for status, n in failed.items()))
+        hedges = llm_metrics.counter_totals("llm_hedges_total", "result")
+        st.metric("Hedged requests", int(hedges.get("sent", 0)), help=f"{int(hedges.get('won', 0))} answered before the original")
+        if llm_resilience.BREAKER.state != "closed":
+            st.error(f"Circuit breaker {llm_resilience.BREAKER.state.replace('_', '-')}: LLM calls are being refused")
+    
+    st.markdown("**LLM scheduler**")
+    queue = llm_scheduler.SCHEDULER.snapshot()
+    waits = {labels["priority"]: series for labels, series in llm_metrics.REGISTRY.histograms("llm_queue_wait_seconds")}
+    cols = st.columns(len(queue["queued"]) + 1)
+    cols[0].metric("In flight", f"{queue['in_flight']} / {queue['max_in_flight']}")
+    for col, (name, depth) in zip(cols[1:], queue["queued"].items()):
+        series = waits.get(name)
+        mean_wait = f"{series['sum'] / series['count']:.2f}s average wait over {series['count']} calls" if series else "No calls yet"
+        col.metric(f"Queued: {name.replace('_', ' ')}", depth, help=mean_wait)
+    
+    if job_queue.JOB_QUEUE:
+        st.markdown("**Job queue**")
+        jobs = job_queue.counts()
+        cols = st.columns(5)
+        for col, status in zip(cols, ("queued", "running", "done", "failed", "cancelled")):
+            col.metric(status.capitalize(), jobs.get(status, 0))
+    
+    recent = llm_metrics.REGISTRY.recent_calls()
+    if recent:
+        st.subheader("Recent calls")
+        st.dataframe(recent[::-1], use_container_width=True, hide_index=True)
+    
+    prometheus_text = llm_metrics.render_prometheus()
+    with st.expander("Prometheus metrics"):
+        st.code(prometheus_text, language="text")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("📥 Download metrics", prometheus_text, file_name="llm_metrics.prom", mime="text/plain", use_container_width=True)
+    with col2:
+        if st.button("🔄 Refresh", use_container_width=True):
+            st.rerun()
@@ -0,0 +1,126 @@
+# eval_cache.py
+"""Content-addressed cache for answer evaluations.
+
+evaluate_answer runs at temperature 0, so the same (role, skill, question,
+answer, language, type) under the same evaluator prompt always deserves the
+same score. Results are kept in
+an in-memory LRU in front of an on-disk store of one JSON file per key
+(sharded by the first two hex digits), trimmed oldest-first when it grows
+past EVAL_CACHE_DISK_ENTRIES.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+EVAL_CACHE_DIR = os.environ.get("EVAL_CACHE_DIR", ".eval_cache")
+EVAL_CACHE_SIZE = int(os.environ.get("EVAL_CACHE_SIZE", "1024"))                 # in-memory entries
+EVAL_CACHE_DISK_ENTRIES = int(os.environ.get("EVAL_CACHE_DISK_ENTRIES", "50000"))  # on-disk entries
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, Dict]" = OrderedDict()
+_disk_count: Optional[int] = None
+
+
+def _normalize(text: str, lower: bool = False) -> str:
+    text = " ".join((text or "").split())
+    return text.lower() if lower else text
+
+
+def make_key(role: str, skill_focus: str, question: str, answer: str, language: str, is_coding: bool, prompt: str = "") -> str:
+    """Hash of everything the evaluation depends on, including the evaluator prompt template
+    (so editing the prompt doesn't serve scores from the old one)"""
+    payload = json.dumps([
+        role, _normalize(skill_focus, lower=True), _normalize(question, lower=True),
+        _normalize(answer), language, bool(is_coding), prompt
+    ], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(EVAL_CACHE_DIR, key[:2], key + ".json")
+
+
+def _remember(key: str, result: Dict):
+    """Insert into the in-memory LRU (caller holds the lock)"""
+    _memory[key] = result
+    _memory.move_to_end(key)
+    while len(_memory) > EVAL_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+def get(key: str) -> Optional[Dict]:
+    """Return a cached evaluation or None"""
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return dict(_memory[key])
+    path = _path(key)
+    try:
+        with open(path, 'r') as f:
+            result = json.load(f)
+        os.utime(path)  # mark as recently used for eviction
+    except (OSError, ValueError):
+        return None
+    with _lock:
+        _remember(key, result)
+    return dict(result)
+
+
+def put(key: str, result: Dict):
+    """Store an evaluation in both tiers"""
+    global _disk_count
+    result = dict(result)
+    with _lock:
+        _remember(key, result)
+    path = _path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        is_new = not os.path.exists(path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        return  # the disk tier is best effort
+    if is_new:
+        with _lock:
+            if _disk_count is None:
+                _disk_count = _count_disk_entries()
+            _disk_count += 1
+            over = _disk_count > EVAL_CACHE_DISK_ENTRIES
+        if over:
+            evict()
+
+
+def _count_disk_entries() -> int:
+    count = 0
+    for _, _, files in os.walk(EVAL_CACHE_DIR):
+        count += sum(1 for name in files if name.endswith(".json"))
+    return count
+
+
+def evict(target: int = None):
+    """Remove least recently used disk entries until at most `target` remain (default 90% of the limit)"""
+    global _disk_count
+    if target is None:
+        target = int(EVAL_CACHE_DISK_ENTRIES * 0.9)
+    entries = []
+    for root, _, files in os.walk(EVAL_CACHE_DIR):
+        for name in files:
+            if name.endswith(".json"):
+                path = os.path.join(root, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    pass
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - target)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    with _lock:
+        _disk_count = min(len(entries), target)
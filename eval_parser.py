@@ -0,0 +1,426 @@
+# eval_parser.py
+"""Incremental, schema-validated parser for evaluator responses.
+
+The evaluator is asked for {"score": int, "reason": str, "suggestions": str}.
+Responses are fed to EvaluationParser chunk by chunk as they stream in; a
+small character-level state machine tracks the top-level object, so fields
+are available the moment they are complete (and the string being written is
+available as it grows). Common malformations are repaired on the way through
+instead of asking the LLM again: code fences and prose around the object
+(braces in the prose included - the evaluation is the last top-level object
+with a score key), single-quoted strings, unquoted keys, trailing or missing commas, raw
+newlines inside strings and truncated output. The score is coerced to an
+integer and clamped to 0-20. If no score field exists, only a number
+explicitly labelled as the score is accepted - never the first number in
+the text, which is usually a rubric weight like "8 points", and not a
+labelled one followed by "points" or "out of" ("Score: 8 points out of 20
+are for correctness").
+
+Run `python eval_parser.py check` to validate the parser against the
+response corpus, and `python eval_parser.py bench` to time it.
+"""
+import json
+import re
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+SCORE_MIN = 0
+SCORE_MAX = 20
+SCHEMA = {"score": int, "reason": str, "suggestions": str}
+EVAL_PARSER_CORPUS = "eval_parser_corpus.jsonl"
+
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+_LABELLED_SCORE = re.compile(r"\bscore\b[\"']?\s*(?:[:=]|is|of)?\s*(\d{1,3}(?:\.\d+)?)(?!\.?\d)"
+                             r"(?!\s*(?:points?|pts|marks?|out\s+of)\b)\s*(?:/\s*20\b)?", re.I)
+_FRACTION = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*(?:/\s*\d+)?\s*$")
+
+
+def _decode_string(raw: str, quote: str) -> str:
+    """Decode the body of a (possibly single-quoted or unterminated) string literal"""
+    if raw.endswith("\\") and not raw.endswith("\\\\"):
+        raw = raw[:-1]  # dangling escape at the end of a chunk
+    if quote == "'":
+        raw = re.sub(r'(?<!\\)"', r'\\"', raw.replace("\\'", "'"))
+    try:
+        return json.loads('"' + raw + '"', strict=False)
+    except ValueError:
+        return raw.replace('\\"', '"').replace("\\n", "\n")
+
+
+def _decode_scalar(raw: str):
+    raw = raw.strip()
+    if raw in _LITERALS:
+        return _LITERALS[raw]
+    try:
+        return int(raw)
+    except ValueError:
+        pass
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+
+def _decode_nested(raw: str):
+    """Decode a nested array/object value, repairing it the same way as the top level"""
+    text = re.sub(r",\s*([}\]])", r"\1", raw)
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        text = re.sub(r"'((?:[^'\\]|\\.)*)'", lambda m: json.dumps(_decode_string(m.group(1), "'")), text)
+        try:
+            return json.loads(text, strict=False)
+        except ValueError:
+            return raw
+
+
+class EvaluationParser:
+    """Feed an evaluator response in chunks; read partial fields at any time and the validated result at the end"""
+
+    def __init__(self):
+        self.raw = ""
+        self.fields: Dict = {}
+        self.repairs = set()
+        self._state = "seek"
+        self._key: Optional[str] = None
+        self._buf: List[str] = []
+        self._quote = '"'
+        self._escape = False
+        self._depth = 0
+        self._nested_quote: Optional[str] = None
+        self._after_comma = False
+        self._objects = 0
+        self._kept: Optional[Tuple[Dict, set]] = None  # fields and repairs of the last finished object with a score
+
+    # -- input -----------------------------------------------------------
+    def feed(self, chunk: str) -> Dict:
+        """Consume the next chunk; returns the fields known so far"""
+        self.raw += chunk
+        for ch in chunk:
+            self._step(ch)
+        return self.partial()
+
+    def update(self, text: str) -> Dict:
+        """Consume the accumulated response so far (the shape streaming.stream_text reports)"""
+        if not text.startswith(self.raw):
+            self.__init__()  # the producer restarted - parse from scratch
+        return self.feed(text[len(self.raw):])
+
+    def _store(self, value):
+        if self._key is not None:
+            self.fields[self._key] = value
+        self._key = None
+        self._buf = []
+        self._state = "after_value"
+
+    def _open_object(self):
+        self.fields = {}
+        self.repairs = set()
+        self._key = None
+        self._after_comma = False
+        self._objects += 1
+        self._state = "key_wait"
+
+    def _close_object(self):
+        if "score" in self.fields:
+            self._kept = (self.fields, self.repairs)
+        self._state = "seek"  # prose may hold a {...} of its own, before or after the evaluation
+
+    def _start_key(self, ch: str):
+        self._after_comma = False
+        self._buf = []
+        if ch in "\"'":
+            if ch == "'":
+                self.repairs.add("single_quotes")
+            self._quote = ch
+            self._state = "key"
+        else:
+            self.repairs.add("unquoted_key")
+            self._buf = [ch]
+            self._state = "bare_key"
+
+    def _step(self, ch: str):
+        state = self._state
+        if state == "seek":
+            if ch == "{":
+                self._open_object()
+        elif state == "key_wait":
+            if ch == "}":
+                if self._after_comma:
+                    self.repairs.add("trailing_comma")
+                self._close_object()
+            elif ch in "\"'" or ch.isalnum() or ch == "_":
+                self._start_key(ch)
+            elif ch == ",":
+                self._after_comma = True
+        elif state in ("key", "string"):
+            if self._escape:
+                self._buf.append(ch)
+                self._escape = False
+            elif ch == "\\":
+                self._buf.append(ch)
+                self._escape = True
+            elif ch == self._quote:
+                text = _decode_string("".join(self._buf), self._quote)
+                if state == "key":
+                    self._key = text.strip().lower()
+                    self._buf = []
+                    self._state = "colon"
+                else:
+                    self._store(text)
+            else:
+                if ch == "\n" and state == "string":
+                    self.repairs.add("raw_newline")
+                self._buf.append(ch)
+        elif state == "bare_key":
+            if ch.isalnum() or ch == "_":
+                self._buf.append(ch)
+            else:
+                self._key = "".join(self._buf).lower()
+                self._buf = []
+                self._state = "value_wait" if ch == ":" else "colon"
+        elif state == "colon":
+            if ch == ":":
+                self._state = "value_wait"
+        elif state == "value_wait":
+            if ch in "\"'":
+                if ch == "'":
+                    self.repairs.add("single_quotes")
+                self._quote = ch
+                self._buf = []
+                self._state = "string"
+            elif ch in "{[":
+                self._depth = 1
+                self._nested_quote = None
+                self._buf = [ch]
+                self._state = "nested"
+            elif not ch.isspace():
+                self._buf = [ch]
+                self._state = "scalar"
+        elif state == "scalar":
+            if ch in ",}" or ch.isspace():
+                self._store(_decode_scalar("".join(self._buf)))
+                self._step(ch)
+            else:
+                self._buf.append(ch)
+        elif state == "nested":
+            self._buf.append(ch)
+            if self._nested_quote:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == self._nested_quote:
+                    self._nested_quote = None
+            elif ch in "\"'":
+                self._nested_quote = ch
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._store(_decode_nested("".join(self._buf)))
+        elif state == "after_value":
+            if ch == ",":
+                self._after_comma = True
+                self._state = "key_wait"
+            elif ch == "}":
+                self._close_object()
+            elif ch in "\"'":
+                self.repairs.add("missing_comma")
+                self._start_key(ch)
+
+    # -- output ----------------------------------------------------------
+    def _selected(self, final: bool = False) -> Tuple[Dict, set]:
+        """Fields and repairs of the object the evaluation is read from: the current one if it has
+        a score key, else the last finished one that had, else whatever the current one holds"""
+        fields = dict(self.fields)
+        repairs = set(self.repairs)
+        if self._key is not None and self._state == "string":
+            fields[self._key] = _decode_string("".join(self._buf), self._quote)
+        elif self._key is not None and self._state == "scalar" and final:
+            fields[self._key] = _decode_scalar("".join(self._buf))
+        if "score" not in fields and self._kept is not None:
+            return dict(self._kept[0]), set(self._kept[1])
+        if final and self._state != "seek":
+            repairs.add("truncated")  # output was cut off - keep whatever the last field had reached
+        return fields, repairs
+
+    def partial(self) -> Dict:
+        """Validated view of the fields completed so far, plus the string currently being written"""
+        fields, _ = self._selected()
+        found = {}
+        if "score" in fields:
+            score = _coerce_score(fields["score"])
+            if score is not None:
+                found["score"] = _clamp(score)
+        for field in ("reason", "suggestions"):
+            if field in fields:
+                found[field] = _coerce_text(fields[field])
+        return found
+
+    def result(self) -> Dict:
+        """Final, schema-valid evaluation: score, reason, suggestions, raw, parse_status and repairs"""
+        fields, repairs = self._selected(final=True)
+        return validate(fields, self.raw, found_object=self._objects > 0, repairs=repairs)
+
+
+def _coerce_score(value) -> Optional[int]:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(round(value))
+    if isinstance(value, str):
+        m = _FRACTION.match(value)
+        if m:
+            return int(round(float(m.group(1))))
+    return None
+
+
+def _clamp(score: int) -> int:
+    return max(SCORE_MIN, min(SCORE_MAX, score))
+
+
+def _coerce_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return " ".join(_coerce_text(v) for v in value).strip()
+    if isinstance(value, dict):
+        return " ".join(f"{k}: {_coerce_text(v)}" for k, v in value.items())
+    return str(value).strip()
+
+
+def validate(fields: Dict, raw: str, found_object: bool = True, repairs=None) -> Dict:
+    """Apply the schema to parsed fields. parse_status is ok, repaired or fallback (no usable score field)."""
+    repairs = set(repairs or ())
+    fields = {str(k).lower(): v for k, v in fields.items()}
+    score = _coerce_score(fields.get("score"))
+    status = "ok"
+    if score is None:
+        m = _LABELLED_SCORE.search(raw)
+        score = int(round(float(m.group(1)))) if m else SCORE_MIN
+        status = "fallback"
+    elif score != _clamp(score):
+        repairs.add("score_clamped")
+    if status == "ok" and (repairs or not found_object):
+        status = "repaired"
+    reason = _coerce_text(fields.get("reason"))
+    if not found_object and not reason:
+        reason = raw[:200]
+    return {
+        "score": _clamp(score),
+        "reason": reason,
+        "suggestions": _coerce_text(fields.get("suggestions")),
+        "raw": raw,
+        "parse_status": status,
+        "repairs": sorted(repairs)
+    }
+
+
+def parse_evaluation(text: str) -> Dict:
+    """Parse a complete evaluator response"""
+    parser = EvaluationParser()
+    parser.feed(text)
+    return parser.result()
+
+
+def _split_objects(text: str) -> List[str]:
+    """Top-level {...} objects in a response (a JSON array or objects one after another), the last possibly truncated"""
+    objects = []
+    depth, start, quote, escape = 0, 0, None, False
+    for i, ch in enumerate(text):
+        if quote:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'" and depth:
+            quote = ch
+        elif ch == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif ch == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                objects.append(text[start:i + 1])
+    if depth:
+        objects.append(text[start:])
+    return objects
+
+
+def parse_evaluation_list(text: str) -> List[Dict]:
+    """Parse a batched evaluator response into one validated result per object.
+
+    Each result carries the "id" the evaluator echoed back (None if missing or not a number).
+    """
+    results = []
+    for obj in _split_objects(text):
+        parser = EvaluationParser()
+        parser.feed(obj)
+        result = parser.result()
+        result["id"] = _coerce_score(parser._selected()[0].get("id"))
+        results.append(result)
+    return results
+
+
+# -------------------------
+# Corpus check / benchmark
+# -------------------------
+def load_corpus(path: str = EVAL_PARSER_CORPUS) -> List[Dict]:
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _chunked(text: str, size: int) -> Dict:
+    parser = EvaluationParser()
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+    return parser.result()
+
+
+def check(path: str = EVAL_PARSER_CORPUS) -> int:
+    """Parse every corpus response whole and in small chunks; returns the number of failures"""
+    failures = 0
+    for case in load_corpus(path):
+        results = [parse_evaluation(case["response"])] + [_chunked(case["response"], size) for size in (1, 7)]
+        problems = []
+        for result in results:
+            for field in ("score", "parse_status", "reason", "suggestions"):
+                if field in case and result[field] != case[field]:
+                    problems.append(f"{field}={result[field]!r} (expected {case[field]!r})")
+        if any(r != results[0] for r in results[1:]):
+            problems.append("chunked parse differs from whole parse")
+        if problems:
+            failures += 1
+            print(f"FAIL {case['name']}: " + "; ".join(dict.fromkeys(problems)))
+    print(f"{len(load_corpus(path)) - failures} passed, {failures} failed")
+    return failures
+
+
+def bench(path: str = EVAL_PARSER_CORPUS, iterations: int = 200):
+    """Time whole and streamed (8-character chunk) parsing over the corpus"""
+    corpus = [case["response"] for case in load_corpus(path)]
+    for label, fn in (("whole", parse_evaluation), ("chunked", lambda text: _chunked(text, 8))):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for text in corpus:
+                fn(text)
+        elapsed = time.perf_counter() - start
+        print(f"{label:8s} {elapsed / (iterations * len(corpus)) * 1e6:8.1f} us/response")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "check":
+        sys.exit(1 if check(*sys.argv[2:3]) else 0)
+    elif command == "bench":
+        bench(*sys.argv[2:3], *[int(n) for n in sys.argv[3:4]])
+    else:
+        print("Usage: python eval_parser.py check [corpus.jsonl]")
+        print("       python eval_parser.py bench [corpus.jsonl] [iterations]")
+        sys.exit(1)
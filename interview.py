@@ -0,0 +1,589 @@
+# interview.py
+"""Interview logic shared by the Streamlit app and the command-line tools.
+
+Prompts, question generation, answer evaluation and the final
+recommendation live here, free of any Streamlit calls, so they can be
+imported headlessly (see rescore.py). Functions that may run on worker
+threads take everything they need as arguments.
+"""
+import json
+import os
+import re
+from typing import Dict, List
+
+from dotenv import load_dotenv
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+import code_runner
+import dedupe_index
+import eval_cache
+import eval_parser
+import llm_metrics
+import llm_resilience
+import llm_scheduler
+import question_bank
+import storage
+import streaming
+import translations
+from llm_client import get_llm
+
+load_dotenv()
+DEEPSEEK_API_KEY = os.environ.get("DEEPSEEK_API_KEY")
+
+# Question generation batching: candidates requested per LLM call, and calls before falling back
+QUESTION_BATCH_SIZE = int(os.environ.get("QUESTION_BATCH_SIZE", "4"))
+QUESTION_BATCH_ROUNDS = 2
+
+# Batched evaluation: answers scored per LLM call, and completion tokens allowed per answer
+EVAL_BATCH_SIZE = int(os.environ.get("EVAL_BATCH_SIZE", "5"))
+EVAL_BATCH_TOKENS_PER_ITEM = int(os.environ.get("EVAL_BATCH_TOKENS_PER_ITEM", "250"))
+
+# Shared LLM via LangChain with DeepSeek (one pooled client per process)
+llm = get_llm(api_key=DEEPSEEK_API_KEY)
+
+def build_question_prompt(role: str, skills: List[str], language: str, is_coding: bool = False, asked_questions: List[str] = None, count: int = 1, complexity: int = question_bank.DEFAULT_COMPLEXITY):
+    # Template that asks the LLM to produce role-specific technical questions.
+    # With count > 1 it asks for several distinct candidates as a JSON array instead of plain text.
+    # Above entry level (the adaptive build) the difficulty is asked for explicitly.
+    complexity_note = ""
+    if complexity > question_bank.DEFAULT_COMPLEXITY:
+        complexity_note = f"Make the question complexity level: {complexity} (1=easiest, {question_bank.MAX_COMPLEXITY}=hardest). "
+    previous_questions = ""
+    if asked_questions:
+        # Escape any literal braces so PromptTemplate won't treat them as variables
+        prev_text = ', '.join(asked_questions).replace('{', '{{').replace('}', '}}')
+        previous_questions = f"\n\nIMPORTANT: Do NOT repeat these previously asked questions: {prev_text}\nGenerate a completely DIFFERENT question."
+    
+    if count > 1:
+        what = f"{count} DISTINCT"
+        output_format = (
+            "Each question must cover a different topic. Do not include answers or explanations. "
+            "Output ONLY a JSON array of objects with keys: skill (the listed skill the question tests), question. "
+        )
+    else:
+        what = "one UNIQUE"
+        output_format = "Do not include answer or explanation. Output ONLY the question text. "
+    
+    if is_coding:
+        template = (
+            "You are an interview generator for the role of {role}. "
+            "The candidate's listed skills: {skills}. "
+            f"Generate {what} coding problem or algorithm question(s) that require writing actual code. "
+            "The question should ask the candidate to write a function, method, or code snippet. "
+            "Make it practical and relevant to the role. "
+            f"{complexity_note}"
+            f"{output_format}"
+            f"Respond in {{language}}.{previous_questions}"
+        )
+    else:
+        template = (
+            "You are an interview generator for the role of {role}. "
+            "The candidate's listed skills: {skills}. "
+            f"Generate {what} theoretical or conceptual technical question(s) (not behavioral questions) that test these skills. "
+            "Focus on concepts, design patterns, best practices, or architecture. "
+            f"{complexity_note}"
+            f"{output_format}"
+            f"Respond in {{language}}.{previous_questions}"
+        )
+    
+    prompt = PromptTemplate(
+        template=template,
+        input_variables=["role", "skills", "language"]
+    )
+    return prompt
+
+# Rubrics and scoring instructions shared by build_evaluator_prompt and BATCH_EVALUATOR_TEMPLATE,
+# so an edit here changes live evaluation and batched re-scoring alike
+EVALUATOR_PREAMBLE = "You are a strict technical interviewer/evaluator for the role of {role}. "
+CODING_RUBRIC = (
+    "Evaluate the code based on:\n"
+    "1. Correctness - Does the code solve the problem? (8 points)\n"
+    "2. Code Quality - Is it readable, well-structured? (4 points)\n"
+    "3. Efficiency - Is the approach optimal? (4 points)\n"
+    "4. Edge cases - Are they handled? (4 points)\n"
+    "If no code is provided or the answer is off-topic, give 0 points."
+)
+CONCEPTUAL_RUBRIC = (
+    "Evaluate whether the answer addresses the technical requirements. "
+    "If the answer is off-topic, say it is off-topic and give 0 points."
+)
+SCORE_INSTRUCTIONS = (
+    "In {language}, give a numeric score between 0 and 20 (20 = perfect), "
+    "a one-sentence reason explaining the score and 1-2 specific suggestions to improve."
+)
+
+def build_evaluator_prompt(role: str, skill_focus: str, question: str, candidate_answer: str, language: str, is_coding: bool = False, tested: bool = False):
+    # Prompt the LLM to evaluate candidate answer and give numeric score 0-20 & short feedback.
+    # With tested=True the code has been run against hidden tests (code_runner.py) and only its quality is scored, 0-4.
+    input_variables = ["role", "skill_focus", "question", "candidate_answer", "language"]
+    if is_coding and tested:
+        template = (
+            EVALUATOR_PREAMBLE +
+            "Skill focus: {skill_focus}. "
+            "Question: {question}\n\n"
+            "Candidate answer: {candidate_answer}\n\n"
+            "This is a CODING question. The code has already been run against hidden tests: {test_report}\n"
+            "Correctness, edge cases and efficiency are scored from those results. "
+            f"Judge ONLY the code quality - readability, naming, structure and idiomatic use of the language - "
+            f"with a numeric score between 0 and {code_runner.QUALITY_POINTS} ({code_runner.QUALITY_POINTS} = excellent). "
+            "In {language}, include a reason about the code quality and 1-2 specific suggestions to improve the code, "
+            "using the test results where they help. "
+            "Output in JSON with keys: score, reason, suggestions. "
+        )
+        input_variables.append("test_report")
+    else:
+        template = (
+            EVALUATOR_PREAMBLE +
+            "Skill focus: {skill_focus}. "
+            "Question: {question}\n\n"
+            "Candidate answer: {candidate_answer}\n\n" +
+            ("This is a CODING question. " + CODING_RUBRIC if is_coding else CONCEPTUAL_RUBRIC) + "\n\n" +
+            SCORE_INSTRUCTIONS + " "
+            "Output in JSON with keys: score, reason, suggestions. "
+        )
+    
+    prompt = PromptTemplate(
+        template=template,
+        input_variables=input_variables
+    )
+    return prompt
+
+def build_test_suite_prompt():
+    # Hidden tests for a coding question, checked and stored by code_runner.test_suite
+    template = (
+        "You write hidden unit tests for a coding interview question.\n\n"
+        "Question: {question}\n\n"
+        "If the question can be answered with a single Python function that takes JSON-compatible arguments "
+        "and returns a JSON-compatible value, output a JSON object with keys: "
+        "runnable (true), "
+        "function (the name a candidate would most likely give the function), "
+        "reference (a correct and efficient Python solution defining that function), "
+        "cases (8 to 12 objects with keys: args - the list of positional arguments, expected - the return value, "
+        "edge - true for edge cases such as empty input, a single element, duplicates, negative numbers or limits), "
+        "benchmark (a Python expression using only builtins and the random module that evaluates to the argument list "
+        "for a large input the reference solution handles in well under a second). "
+        "Otherwise output {{\"runnable\": false}}. Output ONLY the JSON."
+    )
+    return PromptTemplate(template=template, input_variables=["question"])
+
+def gen_test_suite(role: str, question: str, question_num: int = None) -> str:
+    """Ask the LLM for a coding question's hidden test suite (raw JSON text)"""
+    prompt = build_test_suite_prompt()
+    
+    def attempt(timeout, partial):
+        chain = prompt | get_llm(api_key=DEEPSEEK_API_KEY, max_tokens=2000, timeout=timeout) | StrOutputParser()
+        return chain.invoke({"question": question}, config=llm_metrics.track("generate_tests", role, question_num))
+    return llm_resilience.call("generate_tests", attempt)
+
+def prepare_tests(role: str, question: str, question_num: int = None) -> Dict:
+    """The hidden test suite for a coding question, generated on first use (see code_runner.test_suite)"""
+    return code_runner.test_suite(question, lambda: gen_test_suite(role, question, question_num))
+
+def gen_question_batch(role: str, skills: List[str], language: str, is_coding: bool = False, asked_questions: List[str] = None, count: int = None, on_partial=None, question_num: int = None, call_site: str = "generate_question", complexity: int = question_bank.DEFAULT_COMPLEXITY) -> List[tuple]:
+    """Ask the LLM for several distinct candidate questions in one call. Returns (skill, question) pairs.
+    With `on_partial`, the response is streamed and the first question is reported as it arrives."""
+    count = count or QUESTION_BATCH_SIZE
+    prompt = build_question_prompt(role, ", ".join(skills), language, is_coding, asked_questions, count=count, complexity=complexity)
+    inputs = {"role": role, "skills": ", ".join(skills), "language": language}
+    
+    def attempt(timeout, partial):
+        # Use temperature > 0 for variety in questions
+        varied_llm = get_llm(api_key=DEEPSEEK_API_KEY, temperature=0.7, max_tokens=250 * count, timeout=timeout)  # Add randomness to avoid repetition
+        chain = prompt | varied_llm | StrOutputParser()
+        config = llm_metrics.track(call_site, role, question_num)
+        if partial:
+            return streaming.stream_text(chain, inputs, partial, config=config)
+        return chain.invoke(inputs, config=config)
+    
+    def first_question(text):
+        partial_q = streaming.partial_json_fields(text, ["question"]).get("question")
+        if partial_q:
+            on_partial(partial_q)
+    res = llm_resilience.call(call_site, attempt, first_question if on_partial and streaming.STREAM_OUTPUT else None)
+    return parse_question_batch(res, skills)
+
+def parse_question_batch(res: str, skills: List[str]) -> List[tuple]:
+    """Parse a JSON array of {skill, question} objects, falling back to one question per line"""
+    try:
+        items = json.loads(res[res.find("["):res.rfind("]")+1])
+        if not isinstance(items, list):
+            items = [items]
+    except Exception:
+        items = [re.sub(r"^\s*(\d+[.)]|[-*])\s*", "", line) for line in res.splitlines() if line.strip()]
+    
+    # Map each candidate onto one of the candidate's skills so surplus lands in the right bank bucket
+    skill_lookup = {question_bank.normalize_skill(s): s for s in skills}
+    candidates = []
+    for item in items:
+        if isinstance(item, dict):
+            question = str(item.get("question", ""))
+            skill = skill_lookup.get(question_bank.normalize_skill(str(item.get("skill", ""))), skills[0])
+        else:
+            question = str(item)
+            skill = skills[0]
+        question = question.strip().strip('"')
+        if question:
+            candidates.append((skill, question))
+    return candidates
+
+def gen_question(role: str, skills: List[str], language: str, question_num: int = 1, asked_questions: List[str] = None, on_partial=None, complexity: int = question_bank.DEFAULT_COMPLEXITY) -> tuple:
+    # Questions 3 and 5 will be coding questions
+    # Questions are generated and banked in English (translations.CANONICAL_LANGUAGE) and returned in English;
+    # `language` only decides which translations to prepare alongside
+    is_coding = question_num in [3, 5]
+    asked_questions = asked_questions or []
+    
+    # Draw from the pre-generated bank first; only call the LLM on a miss
+    # Questions close to ones already served to other candidates never will be - those leave the bank
+    banked = question_bank.take(role, skills, is_coding, translations.CANONICAL_LANGUAGE, complexity,
+                                reject=lambda q: is_duplicate_question(q, asked_questions),
+                                discard=lambda q: dedupe_index.find_similar(role, q) is not None)
+    llm_metrics.cache_lookup("question_bank", bool(banked))
+    if banked:
+        return banked, is_coding
+    
+    # One call returns several candidates: keep the first unique one and bank the rest
+    kept = []
+    for skill, candidate_q in gen_question_batch(role, skills, translations.CANONICAL_LANGUAGE, is_coding, asked_questions, on_partial=on_partial, question_num=question_num, complexity=complexity):
+        if is_duplicate_question(candidate_q, asked_questions + [q for _, q in kept], role):
+            llm_metrics.inc("question_duplicates_total", call_site="generate_question")
+            continue
+        kept.append((skill, candidate_q))
+    for skill, surplus_q in kept[1:]:
+        question_bank.add(question_bank.make_key(role, skill, is_coding, complexity, translations.CANONICAL_LANGUAGE), [surplus_q])
+    if kept:
+        # One call translates the question and the banked surplus for later candidates
+        translate_questions([q for _, q in kept], language, role, question_num)
+    return (kept[0][1] if kept else ""), is_coding
+
+def fill_question_bank(role: str, skill: str, is_coding: bool, complexity: int, language: str, existing: List[str]) -> List[str]:
+    """Generate a batch of questions for the background bank filler"""
+    fresh = []
+    for _, q in gen_question_batch(role, [skill], language, is_coding, existing, call_site="bank_fill", complexity=complexity):
+        # Reject near-duplicates before they are stored in the bank
+        if not is_duplicate_question(q, existing + fresh, role):
+            fresh.append(q)
+        else:
+            llm_metrics.inc("question_duplicates_total", call_site="bank_fill")
+    # Translate them for the languages candidates have used, before anyone draws them
+    with llm_scheduler.priority("background"):
+        for target in translations.wanted_languages():
+            translate_questions(fresh, target, role)
+    return fresh
+
+def build_translation_prompt():
+    # Several questions per call, passed as a JSON array so the reply can be matched item by item
+    template = (
+        "Translate each of these technical interview questions into {language}. "
+        "Keep code, identifiers, function names and technical terms that are usually written in English unchanged. "
+        "Output ONLY a JSON array of the translated strings, in the same order.\n\n"
+        "{questions}"
+    )
+    return PromptTemplate(template=template, input_variables=["language", "questions"])
+
+def translate_questions(questions: List[str], language: str, role: str = "", question_num: int = None) -> List[str]:
+    """The questions in `language`: cached translations, with the missing ones translated together
+    in one LLM call and stored for every later candidate. A question that can't be translated
+    (provider unavailable, malformed reply) is returned in English and tried again next time."""
+    if translations.is_canonical(language) or not questions:
+        return list(questions)
+    done = translations.lookup(questions, language)
+    missing = [q for q in dict.fromkeys(questions) if q not in done]
+    llm_metrics.cache_lookup("translation", not missing)
+    if missing:
+        prompt = build_translation_prompt()
+        inputs = {"language": language, "questions": json.dumps(missing, ensure_ascii=False, indent=1)}
+        
+        def attempt(timeout, partial):
+            chain = prompt | get_llm(api_key=DEEPSEEK_API_KEY, max_tokens=400 * len(missing), timeout=timeout) | StrOutputParser()
+            return chain.invoke(inputs, config=llm_metrics.track("translate", role, question_num))
+        try:
+            res = llm_resilience.call("translate", attempt)
+            translated = json.loads(res[res.find("["):res.rfind("]")+1])
+        except (llm_resilience.LLMUnavailable, ValueError):
+            translated = None
+        if isinstance(translated, list) and len(translated) == len(missing):
+            done.update(translations.store(language, [(q, str(t).strip()) for q, t in zip(missing, translated)]))
+    return [done.get(q, q) for q in questions]
+
+def is_duplicate_question(candidate_q: str, asked_questions: List[str], role: str = None) -> bool:
+    """Check if a question is truly unique (not just different wording)"""
+    candidate_words = set(candidate_q.lower().split())
+    for asked in asked_questions:
+        # Simple similarity check - if more than 50% of words match, consider it duplicate
+        asked_words = set(asked.lower().split())
+        if len(asked_words) > 0:
+            overlap = len(asked_words.intersection(candidate_words)) / len(asked_words)
+            if overlap > 0.5:
+                return True
+    # Also reject questions too close to ones already served to other candidates for this role
+    if role and dedupe_index.find_similar(role, candidate_q):
+        return True
+    return False
+
+def generate_unique_question(role: str, skills: List[str], language: str, question_num: int, asked_questions: List[str], on_partial=None, complexity: int = question_bank.DEFAULT_COMPLEXITY) -> tuple:
+    """Generate a question that doesn't repeat earlier ones, trying QUESTION_BATCH_ROUNDS batches before falling back.
+    The question is chosen in English and returned in `language`; `complexity` is the adaptive build's difficulty level."""
+    if not translations.is_canonical(language):
+        asked_questions = [translations.canonical(q) for q in asked_questions]  # compare in English
+        on_partial = None  # don't stream the English draft to the candidate
+    tries = 0
+    new_q = ""
+    new_is_coding = False
+    while tries < QUESTION_BATCH_ROUNDS:
+        if tries:
+            llm_metrics.inc("question_retries_total", question_num=question_num)
+        tries += 1
+        try:
+            candidate_q, new_is_coding = gen_question(role, skills, language, question_num=question_num, asked_questions=asked_questions, on_partial=on_partial, complexity=complexity)
+        except llm_resilience.LLMUnavailable:
+            break  # no time for another round - use the fallback below
+        if candidate_q and not is_duplicate_question(candidate_q, asked_questions, role):
+            new_q = candidate_q
+            break
+    
+    if not new_q:
+        # Fallback question if generation fails
+        llm_metrics.inc("question_fallbacks_total", question_num=question_num)
+        if question_num in [3, 5]:
+            new_q = f"Write a function to solve a common problem using {skills[0]}."
+            new_is_coding = True
+        else:
+            new_q = f"Explain an advanced concept or best practice related to {skills[0]}."
+            new_is_coding = False
+    return translate_questions([new_q], language, role, question_num)[0], new_is_coding
+
+# Placeholder answers the UI submits on skip/timeout - their evaluation is fixed, so never ask the LLM
+SKIPPED_ANSWER = "[Skipped - Don't know]"
+TIMED_OUT_ANSWER = "[No answer provided - Time expired]"
+CANNED_EVALUATIONS = {
+    SKIPPED_ANSWER: {"score": 0, "reason": "The question was skipped.", "suggestions": "Review the fundamentals of this topic and try to attempt every question, even partially."},
+    TIMED_OUT_ANSWER: {"score": 0, "reason": "No answer was provided before the time limit.", "suggestions": "Manage your time per question and write down at least a partial answer."},
+    "": {"score": 0, "reason": "No answer was provided.", "suggestions": "Attempt an answer, even a partial one, to earn points."}
+}
+
+def runnable_suite(role: str, question: str, answer: str, language: str, question_num: int = None):
+    """The coding question's hidden test suite if code execution is on and the answer can be run against it, else None"""
+    if not code_runner.CODE_EXECUTION:
+        return None
+    suite = None
+    try:
+        # Tests belong to the English question, so every language shares one suite
+        source = question if translations.is_canonical(language) else translations.canonical(question)
+        suite = prepare_tests(role, source, question_num)
+    except (llm_resilience.LLMUnavailable, OSError, RuntimeError):
+        pass  # no tests this time (LLM or sandbox trouble) - the LLM scores the whole rubric
+    if not code_runner.can_run(suite, answer):
+        llm_metrics.inc("code_runs_total", result="not_run")
+        return None
+    return suite
+
+def evaluate_answer(role: str, skill_focus: str, question: str, answer: str, language: str, is_coding: bool = False, on_partial=None, use_cache: bool = True, question_num: int = None) -> Dict:
+    """Score an answer. With `on_partial`, the response is streamed and the fields parsed so far
+    (score, reason, suggestions) are reported as soon as they appear."""
+    # Fast path for skipped / timed-out / empty answers
+    canned = CANNED_EVALUATIONS.get((answer or "").strip())
+    if canned is not None:
+        return dict(canned, raw="")
+    
+    # Python code is run against the question's hidden tests first; the LLM then only scores its quality
+    suite = runnable_suite(role, question, answer, language, question_num) if is_coding else None
+    report = None
+    if suite is not None:
+        try:
+            report = code_runner.run(suite, answer)
+        except (OSError, RuntimeError):
+            llm_metrics.inc("code_runs_total", result="not_run")  # the sandbox failed - the LLM scores the whole rubric
+        else:
+            outcome = "stopped" if report["stopped"] else "passed" if report["passed"] == report["total"] and report["edge_passed"] == report["edge_total"] else "failed"
+            llm_metrics.inc("code_runs_total", result=outcome)
+    prompt = build_evaluator_prompt(role, skill_focus, question, answer, language, is_coding, tested=report is not None)
+    
+    # Same inputs and prompt at temperature 0 give the same result - serve repeats from the cache.
+    # Not tested answers: their score includes measured runtimes, which differ from run to run.
+    use_cache = use_cache and report is None
+    cache_key = eval_cache.make_key(role, skill_focus, question, answer, language, is_coding, prompt=prompt.template)
+    cached = eval_cache.get(cache_key) if use_cache else None
+    if use_cache:
+        llm_metrics.cache_lookup("evaluation", cached is not None)
+    if cached is not None:
+        return cached
+    
+    inputs = {"role": role, "skill_focus": skill_focus, "question": question, "candidate_answer": answer, "language": language}
+    if report is not None:
+        inputs["test_report"] = code_runner.describe(report)
+    finish = (lambda fields: code_runner.combine(fields, report)) if report else (lambda fields: fields)
+    
+    def attempt(timeout, partial):
+        chain = prompt | get_llm(api_key=DEEPSEEK_API_KEY, timeout=timeout) | StrOutputParser()
+        config = llm_metrics.track("evaluate_answer", role, question_num)
+        if partial:
+            return streaming.stream_text(chain, inputs, partial, config=config)
+        return chain.invoke(inputs, config=config)
+    # The parser consumes the response as it arrives, repairs common JSON slips and clamps the score to 0-20
+    parser = eval_parser.EvaluationParser()
+    show_partial = None
+    if on_partial and streaming.STREAM_OUTPUT:
+        show_partial = lambda text: on_partial(finish(parser.update(text)))
+    parser.update(llm_resilience.call("evaluate_answer", attempt, show_partial))
+    parsed = finish(parser.result())
+    if use_cache and parsed["parse_status"] != "fallback":
+        eval_cache.put(cache_key, parsed)  # only evaluations with a real score field are cached
+    return parsed
+
+# Built from the same rubrics as build_evaluator_prompt
+BATCH_EVALUATOR_TEMPLATE = (
+    EVALUATOR_PREAMBLE +
+    "Evaluate each of the candidate answers below independently.\n\n"
+    "CODING items: " + CODING_RUBRIC + "\n\n"
+    "CONCEPTUAL items: " + CONCEPTUAL_RUBRIC + "\n\n"
+    "For every item: " + SCORE_INSTRUCTIONS + "\n\n"
+    "{items}\n\n"
+    "Output only a JSON array with one object per item, in the same order, with keys: id, score, reason, suggestions. "
+)
+
+def build_batch_evaluator_prompt():
+    # One shared preamble and rubric for several answers; the items are passed as a variable so their text needs no escaping
+    return PromptTemplate(template=BATCH_EVALUATOR_TEMPLATE, input_variables=["role", "language", "items"])
+
+def format_batch_items(items: List[Dict]) -> str:
+    """Render batch items as numbered blocks (ids start at 1)"""
+    blocks = []
+    for idx, item in enumerate(items, 1):
+        kind = "CODING" if item.get("is_coding") else "CONCEPTUAL"
+        blocks.append(
+            f"Item {idx} ({kind}, skill focus: {item['skill_focus']})\n"
+            f"Question: {item['question']}\n"
+            f"Candidate answer: {item['answer']}"
+        )
+    return "\n\n".join(blocks)
+
+def evaluate_answers_batch(role: str, items: List[Dict], language: str, use_cache: bool = True, batch_size: int = None) -> List[Dict]:
+    """Score several answers with one LLM call per `batch_size` (default EVAL_BATCH_SIZE) items.
+
+    `items` are dicts with skill_focus, question, answer and is_coding. Returns one result per
+    item, in order. Coding answers that can be run against hidden tests (see runnable_suite), and
+    items the batch response doesn't cover with a valid score (missing, wrong id, no score field),
+    are evaluated individually with evaluate_answer.
+    """
+    results: List[Dict] = [None] * len(items)
+    single_template = {}
+    todo = []
+    for idx, item in enumerate(items):
+        # Same fast paths as evaluate_answer: canned placeholder answers, then the cache
+        canned = CANNED_EVALUATIONS.get((item["answer"] or "").strip())
+        if canned is not None:
+            results[idx] = dict(canned, raw="")
+            continue
+        is_coding = bool(item.get("is_coding"))
+        if is_coding and runnable_suite(role, item["question"], item["answer"], language) is not None:
+            continue  # scored like a live answer, against its hidden tests, by evaluate_answer below
+        if is_coding not in single_template:
+            single_template[is_coding] = build_evaluator_prompt(role, "", "", "", language, is_coding).template
+        keys = [
+            eval_cache.make_key(role, item["skill_focus"], item["question"], item["answer"], language, is_coding, prompt=template)
+            for template in (single_template[is_coding], BATCH_EVALUATOR_TEMPLATE)
+        ]
+        cached = next((hit for hit in map(eval_cache.get, keys) if hit is not None), None) if use_cache else None
+        if use_cache:
+            llm_metrics.cache_lookup("evaluation", cached is not None)
+        if cached is not None:
+            results[idx] = cached
+        else:
+            todo.append((idx, keys[1]))
+    
+    batch_size = batch_size or EVAL_BATCH_SIZE
+    chain_prompt = build_batch_evaluator_prompt()
+    for start in range(0, len(todo), batch_size):
+        chunk = todo[start:start + batch_size]
+        batch_inputs = {"role": role, "language": language, "items": format_batch_items([items[idx] for idx, _ in chunk])}
+        max_tokens = EVAL_BATCH_TOKENS_PER_ITEM * len(chunk)
+        
+        def attempt(timeout, partial):
+            batch_llm = get_llm(api_key=DEEPSEEK_API_KEY, max_tokens=max_tokens, timeout=timeout)
+            chain = chain_prompt | batch_llm | StrOutputParser()
+            return chain.invoke(batch_inputs, config=llm_metrics.track("evaluate_batch", role))
+        try:
+            res = llm_resilience.call("evaluate_batch", attempt)
+        except llm_resilience.LLMUnavailable:
+            llm_metrics.inc("eval_batch_fallbacks_total", len(chunk), reason="unavailable")
+            continue  # every item in this chunk falls back to a single call
+        parsed = eval_parser.parse_evaluation_list(res)
+        by_id = {p["id"]: p for p in parsed if p["id"] is not None}
+        if not by_id and len(parsed) == len(chunk):
+            by_id = {pos: p for pos, p in enumerate(parsed, 1)}  # no ids echoed - trust the order
+        missed = 0
+        for pos, (idx, cache_key) in enumerate(chunk, 1):
+            result = by_id.get(pos)
+            if result is not None and result["parse_status"] != "fallback":
+                result.pop("id", None)
+                results[idx] = result
+                eval_cache.put(cache_key, result)
+            else:
+                missed += 1
+        if missed:
+            llm_metrics.inc("eval_batch_fallbacks_total", missed, reason="unparsed")
+    
+    # Per-item fallback for whatever the batch didn't score
+    for idx, item in enumerate(items):
+        if results[idx] is None:
+            results[idx] = evaluate_answer(role, item["skill_focus"], item["question"], item["answer"], language,
+                                           bool(item.get("is_coding")), use_cache=use_cache)
+    return results
+
+def generate_recommendation(role: str, qa_history: List[Dict], total_score: int, max_score: int, percentage: float, time_taken: float, on_partial=None) -> str:
+    """Ask the LLM for the final hiring recommendation, streaming it to `on_partial` if given"""
+    # Prepare summary for AI
+    qa_summary = ""
+    for i, qa in enumerate(qa_history, 1):
+        qa_summary += f"Q{i} (Score: {qa['score']}/20): {qa['q'][:100]}... Answer quality: {qa['feedback'][:150]}...\n"
+    
+    recommendation_prompt = PromptTemplate(
+        template=(
+            "You are a senior technical hiring manager evaluating a candidate for {role} position.\n\n"
+            "Candidate Performance Summary:\n"
+            "- Total Score: {total_score}/{max_score} ({percentage:.1f}%)\n"
+            "- Questions Answered: 5 (2 conceptual, 2 coding, 1 conceptual)\n"
+            "- Time Taken: {time_taken} minutes\n\n"
+            "Question-wise breakdown:\n{qa_summary}\n\n"
+            "Based on this performance, provide:\n"
+            "1. Clear recommendation: RECOMMENDED or NOT RECOMMENDED\n"
+            "2. 2-3 key strengths observed\n"
+            "3. 2-3 areas for improvement\n"
+            "4. Brief rationale (2-3 sentences) explaining your recommendation\n\n"
+            "Be professional, constructive, and specific. Format your response clearly."
+        ),
+        input_variables=["role", "total_score", "max_score", "percentage", "time_taken", "qa_summary"]
+    )
+    
+    inputs = {
+        "role": role,
+        "total_score": total_score,
+        "max_score": max_score,
+        "percentage": percentage,
+        "time_taken": f"{int(time_taken // 60)}:{int(time_taken % 60):02d}",
+        "qa_summary": qa_summary
+    }
+    
+    def attempt(timeout, partial):
+        chain = recommendation_prompt | get_llm(api_key=DEEPSEEK_API_KEY, timeout=timeout) | StrOutputParser()
+        config = llm_metrics.track("recommendation", role)
+        if partial:
+            return streaming.stream_text(chain, inputs, partial, config=config)
+        return chain.invoke(inputs, config=config)
+    return llm_resilience.call("recommendation", attempt, on_partial if streaming.STREAM_OUTPUT else None)
+
+def recommend_and_store(username: str, eval_id: str, role: str, qa_history: List[Dict], total_score: int, max_score: int, percentage: float, time_taken: float, on_partial=None) -> str:
+    """Generate the recommendation for a saved evaluation and store it with the record (runs in the background)"""
+    recommendation = generate_recommendation(role, qa_history, total_score, max_score, percentage, time_taken, on_partial=on_partial)
+    storage.set_recommendation(username, eval_id, recommendation)
+    return recommendation
+
+# LLM work that llm_worker.py can run for the web process (see job_queue.py), by job kind = call site
+JOBS = {
+    "generate_question": generate_unique_question,
+    "evaluate_answer": evaluate_answer,
+    "recommendation": recommend_and_store,
+    "generate_tests": prepare_tests
+}
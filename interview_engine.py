@@ -0,0 +1,490 @@
+# interview_engine.py
+"""Async interview engine, independent of Streamlit.
+
+An Interview holds one candidate's interview: setup, questions asked, answers
+and scores, timing, and the saved record. InterviewEngine drives it through
+question generation (bank, prefetch, dedupe), answer evaluation, saving and
+the final recommendation:
+
+    engine = InterviewEngine()
+    interview = await engine.start(username, role, skills, language)
+    question, is_coding = await engine.next_question(interview)
+    while not interview.finished:
+        result = await engine.submit_answer(interview, answer)
+    summary = await engine.finalize(interview)
+
+The LLM stack underneath (llm_scheduler, llm_resilience, LangChain) is
+synchronous, so blocking work runs on a bounded pool of ENGINE_WORKERS threads
+and the coroutines only await it. One event loop can therefore hold thousands
+of interviews while the thread count and the LLM concurrency stay bounded.
+`on_partial` callbacks are invoked on the event loop's thread, so a Streamlit
+script can pass placeholder writers and drive the engine with run().
+
+With JOB_QUEUE=1 the LLM work goes to job_queue.py instead and runs on worker
+pools started with `python llm_worker.py`; the engine only submits jobs and
+polls them by id, so the web process does no generation or parsing itself.
+"""
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import code_runner
+import dedupe_index
+import job_queue
+import llm_scheduler
+import prefetch
+import storage
+import streaming
+import translations
+from interview import JOBS, generate_unique_question, prepare_tests, recommend_and_store
+from llm_resilience import LLMUnavailable
+
+ENGINE_WORKERS = int(os.environ.get("ENGINE_WORKERS", "32"))
+
+QUESTIONS_PER_INTERVIEW = 5
+CODING_QUESTIONS = (3, 5)
+QUESTION_SECONDS = 10 * 60
+INTERVIEW_SECONDS = 50 * 60
+MAX_SCORE_PER_QUESTION = 20
+
+_executor = ThreadPoolExecutor(max_workers=ENGINE_WORKERS, thread_name_prefix="engine")
+
+
+class Interview:
+    """State of one interview.
+
+    Besides plain data it holds handles to the interview's background work (the
+    recommendation's Future and TokenStream when JOB_QUEUE is off), so it lives in
+    the memory of the process running it - st.session_state, say - and can't be
+    pickled into an external store.
+    """
+
+    def __init__(self, username: str, role: str, skills: List[str], language: str):
+        self.id = uuid.uuid4().hex  # also keys this interview's prefetch jobs
+        self.username = username
+        self.role = role
+        self.skills = list(skills)
+        self.language = language
+        self.asked_questions: List[str] = []
+        self.qa_history: List[Dict] = []  # {q, a, score, feedback, is_coding, skill, language}
+        self.question_num = 0             # number of the question currently shown (0 before the first)
+        self.current_question = ""
+        self.current_is_coding = False
+        self.question_started: Optional[float] = None
+        self.started = time.time()
+        self.finished = False
+        self.time_expired = False
+        self.eval_id: Optional[str] = None
+        self.recommendation: Optional[str] = None
+        self.recommendation_job: Union[Future, str, None] = None  # job id with JOB_QUEUE
+        self.jobs: Dict[int, str] = {}    # queued prefetch job ids by question number (JOB_QUEUE)
+        self.loaded: Dict[int, Tuple[str, bool]] = {}  # questions loaded for an answer that failed to score, by number
+        self.recommendation_preview: Optional[streaming.TokenStream] = None
+
+    @property
+    def complete(self) -> bool:
+        return len(self.qa_history) >= QUESTIONS_PER_INTERVIEW
+
+    @property
+    def total_score(self) -> int:
+        return sum(qa["score"] for qa in self.qa_history)
+
+    @property
+    def max_score(self) -> int:
+        return MAX_SCORE_PER_QUESTION * len(self.qa_history)
+
+    @property
+    def percentage(self) -> float:
+        return self.total_score / self.max_score * 100 if self.max_score else 0
+
+    def time_taken(self) -> float:
+        return time.time() - self.started
+
+    def question_time_left(self) -> float:
+        if self.question_started is None:
+            return QUESTION_SECONDS
+        return max(0, QUESTION_SECONDS - (time.time() - self.question_started))
+
+    def total_time_left(self) -> float:
+        return max(0, INTERVIEW_SECONDS - self.time_taken())
+
+
+class _Partials:
+    """Hands partial output from worker threads to `callback` on the event loop's thread.
+
+    If the callback raises (Streamlit interrupting the run, say) delivery stops, the
+    worker's next partial raises the same exception to abandon the LLM call, and
+    check() re-raises it on the loop.
+    """
+
+    def __init__(self, callback: Callable):
+        self.callback = callback
+        self.error: Optional[BaseException] = None
+        self._loop = asyncio.get_running_loop()
+
+    def __call__(self, value):
+        if self.error is not None:
+            raise self.error
+        self._loop.call_soon_threadsafe(self._deliver, value)
+
+    def _deliver(self, value):
+        if self.error is None:
+            try:
+                self.callback(value)
+            except BaseException as e:
+                self.error = e
+
+    def check(self):
+        if self.error is not None:
+            raise self.error
+
+
+def _emitter(on_partial: Optional[Callable]) -> Optional[_Partials]:
+    return None if on_partial is None else _Partials(on_partial)
+
+
+def _follow(stream: Optional[streaming.TokenStream], emit: Optional[Callable]):
+    if stream is not None and emit is not None:
+        for text in stream.follow():
+            emit(text)
+
+
+class InterviewEngine:
+    """Async API over the interview logic in interview.py; holds no per-interview state itself"""
+
+    def __init__(self, executor: ThreadPoolExecutor = None, queued: bool = None):
+        self.executor = executor or _executor
+        self.queued = job_queue.JOB_QUEUE if queued is None else queued
+
+    async def _blocking(self, fn: Callable, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, lambda: fn(*args, **kwargs))
+
+    async def _call(self, kind: str, on_partial: Optional[Callable] = None, **kwargs):
+        """Run interview.JOBS[kind] on a worker pool (JOB_QUEUE) or on this process's threads"""
+        if self.queued:
+            job_id = await self._blocking(job_queue.submit, kind, kwargs, stream=on_partial is not None)
+            return await self._await_job(job_id, on_partial)
+        partials = _emitter(on_partial)
+        result = await self._blocking(JOBS[kind], on_partial=partials, **kwargs)
+        if partials is not None:
+            partials.check()
+        return result
+
+    async def _await_job(self, job_id: str, on_partial: Optional[Callable] = None):
+        """Poll a queued job until it finishes, passing new partial output to `on_partial`.
+        Raises LLMUnavailable if the worker's call failed that way or the job takes longer than
+        JOB_WAIT_TIMEOUT. The job is cancelled if waiting fails, but not if the waiting task is
+        cancelled - _load_question keeps prefetched jobs for the next attempt."""
+        deadline = time.monotonic() + job_queue.JOB_WAIT_TIMEOUT
+        shown = None
+        try:
+            while True:
+                job = await self._blocking(job_queue.get, job_id)
+                if job is None:
+                    raise job_queue.JobFailed(job_id, "JobLost", "the job no longer exists")
+                if on_partial is not None and job["partial"] is not None and job["partial"] != shown:
+                    shown = job["partial"]
+                    on_partial(shown)
+                if job["status"] == "done":
+                    return job["result"]
+                if job["status"] in job_queue.FINISHED:
+                    if job["error_type"] == LLMUnavailable.__name__:
+                        raise LLMUnavailable(job["error"])
+                    raise job_queue.JobFailed(job_id, job["error_type"] or job["status"], job["error"] or "")
+                if time.monotonic() >= deadline:
+                    raise LLMUnavailable(f"job {job_id} still {job['status']} after {job_queue.JOB_WAIT_TIMEOUT:g}s")
+                await asyncio.sleep(job_queue.JOB_POLL_INTERVAL)
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            await self._blocking(job_queue.cancel, [job_id])
+            raise
+
+    # -- questions ---------------------------------------------------------
+    async def _prefetch(self, interview: Interview, question_num: int):
+        """Start generating a question on the prefetch pool (no-op if already scheduled)"""
+        if question_num > QUESTIONS_PER_INTERVIEW:
+            return
+        if self.queued:
+            if question_num not in interview.jobs:
+                interview.jobs[question_num] = await self._blocking(
+                    job_queue.submit, "generate_question", self._question_args(interview, question_num),
+                    priority="background", stream=streaming.STREAM_OUTPUT
+                )
+            return
+        preview = streaming.TokenStream() if streaming.STREAM_OUTPUT else None
+        prefetch.schedule(
+            interview.id, question_num, generate_unique_question,
+            interview.role, list(interview.skills), interview.language, question_num, list(interview.asked_questions),
+            on_partial=preview.update if preview else None, preview=preview
+        )
+
+    def _question_loader(self, interview: Interview, question_num: int, emit: Optional[Callable]) -> Callable[[], tuple]:
+        """Callable returning the prefetched question (following its partial output), or generating it inline.
+        Inputs are captured up front so the callable can run on a worker thread."""
+        role, skills, language = interview.role, list(interview.skills), interview.language
+        asked_questions = list(interview.asked_questions)
+
+        def load():
+            prefetch.promote(interview.id, question_num, "next_question")  # the candidate is waiting for it now
+            _follow(prefetch.preview(interview.id, question_num), emit)
+            result = prefetch.collect(interview.id, question_num)
+            if result is None:
+                result = generate_unique_question(role, skills, language, question_num, asked_questions, on_partial=emit)
+            return result
+        return load
+
+    def _question_args(self, interview: Interview, question_num: int) -> Dict:
+        return {"role": interview.role, "skills": list(interview.skills), "language": interview.language,
+                "question_num": question_num, "asked_questions": list(interview.asked_questions)}
+
+    async def _load_question(self, interview: Interview, question_num: int, on_partial: Optional[Callable] = None) -> tuple:
+        """The prefetched question `question_num` (following its partial output), or a newly generated one"""
+        if question_num in interview.loaded:
+            return interview.loaded.pop(question_num)
+        if not self.queued:
+            partials = _emitter(on_partial)
+            result = await self._blocking(self._question_loader(interview, question_num, partials))
+            if partials is not None:
+                partials.check()
+            return result
+        job_id = interview.jobs.get(question_num)
+        if job_id is not None:
+            await self._blocking(job_queue.promote, job_id, "next_question")  # the candidate is waiting for it now
+            try:
+                result = await self._await_job(job_id, on_partial)
+            except job_queue.JobFailed:
+                result = None  # generated again below
+            except Exception:
+                interview.jobs.pop(question_num, None)
+                raise
+            interview.jobs.pop(question_num, None)
+            if result is not None:
+                return tuple(result)
+        return tuple(await self._call("generate_question", on_partial, **self._question_args(interview, question_num)))
+
+    async def _ask(self, interview: Interview, question: str, is_coding: bool, question_num: int):
+        """Make `question` the current one and start on the one after it"""
+        interview.asked_questions.append(question)
+        interview.current_question = question
+        interview.current_is_coding = is_coding
+        interview.question_num = question_num
+        interview.question_started = time.time()
+        source = await self._blocking(record_asked, interview.role, interview.language, question)
+        await self._prefetch(interview, question_num + 1)
+        if is_coding and code_runner.CODE_EXECUTION:
+            await self._prepare_tests(interview, source, question_num)
+
+    async def _prepare_tests(self, interview: Interview, question: str, question_num: int):
+        """Generate the coding question's hidden tests while the candidate writes the answer"""
+        if self.queued:
+            await self._blocking(job_queue.submit, "generate_tests",
+                                 {"role": interview.role, "question": question, "question_num": question_num},
+                                 priority="background")
+        else:
+            self.executor.submit(llm_scheduler.run_as, "background", prepare_tests, interview.role, question, question_num)
+
+    # -- API ---------------------------------------------------------------
+    async def start(self, username: str, role: str, skills: List[str], language: str) -> Interview:
+        """Create an interview and start generating its first question"""
+        skills = [s.strip() for s in skills if s.strip()]
+        if not skills:
+            raise ValueError("At least one skill is required")
+        interview = Interview(username, role, skills, language)
+        await self._prefetch(interview, 1)
+        return interview
+
+    async def next_question(self, interview: Interview, on_partial: Callable[[str], None] = None) -> Tuple[str, bool]:
+        """The question to answer now, generating the first one if needed.
+        `on_partial` receives the question text as it streams in."""
+        if interview.current_question or interview.finished:
+            return interview.current_question, interview.current_is_coding
+        question_num = interview.question_num + 1
+        question, is_coding = await self._load_question(interview, question_num, on_partial)
+        await self._ask(interview, question, is_coding, question_num)
+        return question, is_coding
+
+    async def submit_answer(self, interview: Interview, answer: str, on_partial: Callable[[Dict], None] = None) -> Dict:
+        """Score the answer to the current question while the next question is loaded.
+
+        `on_partial` receives the evaluation fields known so far. Returns the evaluation
+        (score, reason, suggestions, ...) plus `complete` and `next_question`. Raises
+        LLMUnavailable, leaving the interview unchanged, if the evaluator doesn't answer in time;
+        the next question, if it loaded, is kept for the resubmission.
+        """
+        if interview.finished or not interview.current_question:
+            raise ValueError("No question is waiting for an answer")
+        question, is_coding, question_num = interview.current_question, interview.current_is_coding, interview.question_num
+        skill_focus = interview.skills[0]  # for simplicity, focus on first skill (could be rotated)
+        evaluate = self._call("evaluate_answer", on_partial, role=interview.role, skill_focus=skill_focus, question=question,
+                              answer=answer, language=interview.language, is_coding=is_coding, question_num=question_num)
+        if question_num < QUESTIONS_PER_INTERVIEW:
+            # Evaluation and next-question generation don't depend on each other - run them side by side
+            load_next = asyncio.ensure_future(self._load_question(interview, question_num + 1))
+            try:
+                eval_result = await evaluate
+            except Exception:
+                # The next question has been taken off the prefetch pool - keep it for the resubmission
+                try:
+                    interview.loaded[question_num + 1] = await load_next
+                except Exception:
+                    pass
+                raise
+            except BaseException:
+                load_next.cancel()
+                raise
+            next_q = await load_next
+        else:
+            eval_result, next_q = await evaluate, None
+
+        score = int(eval_result.get("score", 0))
+        reason = eval_result.get("reason", "") or eval_result.get("raw", "")
+        suggestions = eval_result.get("suggestions", "")
+        interview.qa_history.append({
+            "q": question, "a": answer, "score": score, "feedback": f"{reason} {suggestions}",
+            "is_coding": is_coding, "skill": skill_focus, "language": interview.language
+        })
+        if next_q is None:
+            interview.finished = True
+            interview.current_question = ""
+            await self._blocking(self._save, interview)
+            await self._start_recommendation(interview)
+        else:
+            await self._ask(interview, next_q[0], next_q[1], question_num + 1)
+        return dict(eval_result, score=score, reason=reason, suggestions=suggestions,
+                    complete=next_q is None, next_question=next_q)
+
+    def expire(self, interview: Interview) -> bool:
+        """End the interview if its total time is up; True if it has expired"""
+        if not interview.finished and interview.total_time_left() <= 0:
+            interview.finished = True
+            interview.time_expired = True
+            self._discard(interview)
+        return interview.time_expired
+
+    async def finalize(self, interview: Interview, on_partial: Callable[[str], None] = None, recommend: bool = True) -> Dict:
+        """Save the interview if it isn't saved yet and, once all questions are answered,
+        return the final recommendation (streamed to `on_partial`).
+
+        The recommendation is None if the interview is incomplete or the LLM didn't answer in time;
+        calling finalize again retries it.
+        """
+        interview.finished = True
+        await self._blocking(self._discard, interview)
+        if interview.qa_history and interview.eval_id is None:
+            await self._blocking(self._save, interview)
+        if recommend and interview.complete and interview.recommendation is None:
+            job, preview = interview.recommendation_job, interview.recommendation_preview
+            interview.recommendation_job = interview.recommendation_preview = None
+            recommendation = None
+            if isinstance(job, str):
+                await self._blocking(job_queue.promote, job, "next_question")  # the candidate is waiting for it now
+                try:
+                    recommendation = await self._await_job(job, on_partial)
+                except (LLMUnavailable, job_queue.JobFailed):
+                    recommendation = None
+            elif job is not None:
+                partials = _emitter(on_partial)
+                if preview is not None and partials is not None:
+                    await self._blocking(_follow, preview, partials)
+                    partials.check()
+                try:
+                    recommendation = await asyncio.wrap_future(job)
+                except Exception:
+                    recommendation = None
+            if recommendation is None:
+                try:
+                    recommendation = await self._call("recommendation", on_partial, **self._recommendation_args(interview))
+                except LLMUnavailable:
+                    pass  # nothing stored - generated again the next time finalize is called
+            interview.recommendation = recommendation
+        return {
+            "eval_id": interview.eval_id,
+            "total_score": interview.total_score,
+            "max_score": interview.max_score,
+            "percentage": interview.percentage,
+            "time_taken": interview.time_taken(),
+            "recommendation": interview.recommendation
+        }
+
+    def abandon(self, interview: Interview):
+        """Drop the interview's background work (new evaluation, logout)"""
+        self._discard(interview)
+
+    def _discard(self, interview: Interview):
+        prefetch.discard_session(interview.id)
+        if interview.jobs:
+            job_queue.cancel(interview.jobs.values())
+            interview.jobs.clear()
+
+    # -- persistence -------------------------------------------------------
+    def _save(self, interview: Interview):
+        interview.eval_id = storage.add_evaluation(interview.username, {
+            "id": uuid.uuid4().hex,
+            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "role": interview.role,
+            "score": interview.total_score,
+            "max_score": interview.max_score,
+            "percentage": interview.percentage,
+            "time_taken": interview.time_taken(),
+            "qa_history": list(interview.qa_history),
+            "recommendation": None
+        })
+
+    def _recommendation_args(self, interview: Interview) -> Dict:
+        return {"username": interview.username, "eval_id": interview.eval_id, "role": interview.role,
+                "qa_history": list(interview.qa_history), "total_score": interview.total_score,
+                "max_score": interview.max_score, "percentage": interview.percentage, "time_taken": interview.time_taken()}
+
+    async def _start_recommendation(self, interview: Interview):
+        """Generate and store the recommendation in the background so finalize() only has to collect it"""
+        if self.queued:
+            interview.recommendation_job = await self._blocking(job_queue.submit, "recommendation",
+                                                                self._recommendation_args(interview),
+                                                                priority="background", stream=streaming.STREAM_OUTPUT)
+            return
+        preview = streaming.TokenStream() if streaming.STREAM_OUTPUT else None
+        job = self.executor.submit(llm_scheduler.run_as, "background", recommend_and_store, **self._recommendation_args(interview),
+                                   on_partial=preview.update if preview else None)
+        if preview is not None:
+            job.add_done_callback(lambda _: preview.close())
+        interview.recommendation_job = job
+        interview.recommendation_preview = preview
+
+
+ENGINE = InterviewEngine()
+
+
+def run(coro):
+    """Drive an engine coroutine to completion from synchronous code (e.g. a Streamlit rerun)"""
+    return asyncio.run(coro)
+
+
+def record_asked(role: str, language: str, question: str) -> str:
+    """Add a served question to the dedupe index and return its English form
+    (the dedupe index and the hidden tests work on the English question)"""
+    source = question if translations.is_canonical(language) else translations.canonical(question)
+    dedupe_index.add(role, source)
+    return source
+
+
+def evaluate_and_generate_adaptive(evaluate: Callable[[], Dict], generate_at: Callable[[int], tuple],
+                                   candidate_levels: List[int], select_level: Callable[[Dict], int]) -> Tuple[Dict, int, tuple]:
+    """Generate the next question at every candidate complexity level on the engine's threads while
+    `evaluate` runs on this one, then keep the one the score selects (for the adaptive build, eval_merged).
+
+    Returns (eval_result, selected_level, (question, is_coding)).
+    """
+    jobs = {level: _executor.submit(generate_at, level) for level in dict.fromkeys(candidate_levels)}
+    eval_result = evaluate()
+    level = select_level(eval_result)
+    for other, job in jobs.items():
+        if other != level:
+            job.cancel()  # no-op if already running; the result is simply dropped
+    job = jobs.get(level)
+    next_q = job.result() if job is not None else generate_at(level)
+    return eval_result, level, next_q
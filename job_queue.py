@@ -0,0 +1,210 @@
+# job_queue.py
+"""SQLite-backed queue of LLM jobs, shared by the web process and llm_worker.py.
+
+With JOB_QUEUE=1 the interview engine doesn't call the LLM itself: it submits
+a job (question generation, answer evaluation, recommendation) and polls it by
+id, while worker pools started separately with `python llm_worker.py` claim,
+run and complete the jobs. Jobs are claimed by priority class
+(llm_scheduler.PRIORITIES), oldest first.
+
+A claimed job carries a lease that its worker renews while the job runs. If the
+worker dies the lease lapses and the job is handed to another worker, up to
+JOB_MAX_ATTEMPTS times. Streamed output is written to the job row as it
+arrives, so the page can show it while polling. Finished jobs are deleted
+after JOB_RETENTION seconds.
+
+    python job_queue.py stats     # jobs per kind and status
+    python job_queue.py purge     # delete finished jobs now
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Iterable, Optional
+
+import llm_scheduler
+
+JOB_QUEUE = os.environ.get("JOB_QUEUE", "0") != "0"                         # run LLM work on llm_worker.py pools
+JOB_QUEUE_DB = os.environ.get("JOB_QUEUE_DB", "jobs.db")
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "0.1"))      # seconds between polls, web and workers
+JOB_WAIT_TIMEOUT = float(os.environ.get("JOB_WAIT_TIMEOUT", "90"))         # seconds the web process waits for a job
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "30"))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "2"))
+JOB_RETENTION = float(os.environ.get("JOB_RETENTION", "3600"))
+
+FINISHED = ("done", "failed", "cancelled")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    priority    INTEGER NOT NULL,  -- index into llm_scheduler.PRIORITIES
+    stream      INTEGER NOT NULL,  -- 1 = report partial output
+    payload     TEXT NOT NULL,     -- JSON keyword arguments
+    status      TEXT NOT NULL,     -- queued / running / done / failed / cancelled
+    partial     TEXT,              -- JSON partial output so far
+    result      TEXT,              -- JSON
+    error_type  TEXT,
+    error       TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    worker      TEXT,
+    lease_until REAL,
+    created_at  REAL NOT NULL,
+    started_at  REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, priority, created_at);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+class JobFailed(Exception):
+    """A job ended without a result; `error_type` is the worker-side exception's class name"""
+
+    def __init__(self, job_id: str, error_type: str, message: str):
+        super().__init__(f"{error_type}: {message}")
+        self.job_id = job_id
+        self.error_type = error_type
+
+
+def connect(path: str = None) -> sqlite3.Connection:
+    """Return this thread's connection, creating the schema on first use"""
+    path = path or JOB_QUEUE_DB
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conns[path] = conn
+        with _init_lock:
+            if path not in _initialized:
+                conn.executescript(SCHEMA)
+                _initialized.add(path)
+    return conn
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict:
+    job = dict(row)
+    for field in ("payload", "partial", "result"):
+        if job.get(field) is not None:
+            job[field] = json.loads(job[field])
+    job["priority"] = llm_scheduler.PRIORITIES[job["priority"]]
+    job["stream"] = bool(job["stream"])
+    return job
+
+
+def submit(kind: str, payload: Dict, priority: str = None, stream: bool = False) -> str:
+    """Queue a job; returns its id. `priority` defaults to the class of the call site named `kind`."""
+    priority = priority or llm_scheduler.CALL_SITE_PRIORITY.get(kind, "next_question")
+    job_id = uuid.uuid4().hex
+    connect().execute(
+        "INSERT INTO jobs (id, kind, priority, stream, payload, status, created_at) VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+        (job_id, kind, llm_scheduler.PRIORITIES.index(priority), int(stream), json.dumps(payload), time.time())
+    )
+    return job_id
+
+
+def get(job_id: str) -> Optional[Dict]:
+    row = connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def promote(job_id: str, priority: str):
+    """Move a still queued job up to `priority` (a prefetch the candidate is now waiting for)"""
+    connect().execute("UPDATE jobs SET priority = MIN(priority, ?) WHERE id = ? AND status = 'queued'",
+                      (llm_scheduler.PRIORITIES.index(priority), job_id))
+
+
+def cancel(job_ids: Iterable[str]):
+    """Drop jobs nobody will collect; a running job's worker stops at its next lease renewal"""
+    ids = list(job_ids)
+    if ids:
+        connect().execute(
+            f"UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id IN ({','.join('?' * len(ids))}) "
+            "AND status IN ('queued', 'running')", [time.time()] + ids
+        )
+
+
+def claim(worker: str) -> Optional[Dict]:
+    """Take the next job for `worker`, reclaiming jobs whose worker stopped renewing their lease"""
+    conn = connect()
+    now = time.time()
+    # Cheap read first so idle workers don't take the write lock on every poll
+    if not conn.execute("SELECT 1 FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) LIMIT 1",
+                        (now,)).fetchone():
+        return None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("UPDATE jobs SET status = 'failed', error_type = 'WorkerLost', error = 'worker stopped renewing its lease', "
+                     "finished_at = ? WHERE status = 'running' AND lease_until < ? AND attempts >= ?", (now, now, JOB_MAX_ATTEMPTS))
+        conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND lease_until < ?", (now,))
+        row = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority, created_at LIMIT 1").fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute("UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, lease_until = ?, started_at = ? "
+                     "WHERE id = ?", (worker, now + JOB_LEASE_SECONDS, now, row["id"]))
+        job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return _row_to_job(job)
+
+
+def renew(job_id: str, worker: str, partial=None) -> bool:
+    """Extend the lease (and store partial output, if given). False if the job was cancelled or handed to another worker."""
+    sql = "UPDATE jobs SET lease_until = ?" + (", partial = ?" if partial is not None else "") + \
+          " WHERE id = ? AND worker = ? AND status = 'running'"
+    params = [time.time() + JOB_LEASE_SECONDS] + ([json.dumps(partial)] if partial is not None else []) + [job_id, worker]
+    return connect().execute(sql, params).rowcount == 1
+
+
+def complete(job_id: str, worker: str, result) -> bool:
+    return connect().execute(
+        "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+        (json.dumps(result), time.time(), job_id, worker)
+    ).rowcount == 1
+
+
+def fail(job_id: str, worker: str, error: BaseException) -> bool:
+    return connect().execute(
+        "UPDATE jobs SET status = 'failed', error_type = ?, error = ?, finished_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+        (type(error).__name__, str(error), time.time(), job_id, worker)
+    ).rowcount == 1
+
+
+def purge(older_than: float = None) -> int:
+    """Delete jobs that finished more than `older_than` seconds ago (default JOB_RETENTION)"""
+    cutoff = time.time() - (JOB_RETENTION if older_than is None else older_than)
+    return connect().execute(
+        f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED))}) AND finished_at < ?", list(FINISHED) + [cutoff]
+    ).rowcount
+
+
+def counts() -> Dict[str, int]:
+    """Jobs per status"""
+    return {row["status"]: row["n"] for row in connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "stats":
+        for row in connect().execute("SELECT kind, status, COUNT(*) AS n FROM jobs GROUP BY kind, status ORDER BY kind, status"):
+            print(f"{row['kind']:20s} {row['status']:10s} {row['n']}")
+    elif command == "purge":
+        print(f"Deleted {purge()} finished job(s)")
+    else:
+        print("Usage: python job_queue.py [stats|purge]")
+        sys.exit(1)
@@ -0,0 +1,167 @@
+# llm_client.py
+"""Process-wide LLM client registry.
+
+One ChatOpenAI per (model, base_url, api_key) is created per server process
+and shared by every Streamlit rerun and session. All of them sit on a single
+pooled HTTP client so keep-alive connections (and their TLS handshakes) are
+reused. Per-call parameters such as temperature are bound onto the shared
+client instead of constructing a new one.
+
+The provider defaults to DeepSeek; DEEPSEEK_BASE_URL / DEEPSEEK_MODEL point
+the app at any OpenAI-compatible endpoint (e.g. the bundled stub_llm.py).
+They are read at call time so values loaded from .env are honoured.
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+
+import llm_metrics
+
+DEFAULT_MODEL = "deepseek-chat"
+DEFAULT_BASE_URL = "https://api.deepseek.com"
+DEFAULT_TEMPERATURE = 0
+DEFAULT_MAX_TOKENS = 400
+
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.environ.get("LLM_MAX_KEEPALIVE", "10"))
+LLM_WARM_CONNECTIONS = int(os.environ.get("LLM_WARM_CONNECTIONS", "2"))
+
+_lock = threading.Lock()
+_registry: Dict[Tuple[str, str, str], ChatOpenAI] = {}
+_http_client = None
+_async_http_client = None
+_warmed = False
+_local = threading.local()
+
+
+def _limits():
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE)
+
+
+def _count_response(response: httpx.Response):
+    # Every attempt passes through here, so retries show up too
+    if response.request.url.path.endswith("/chat/completions"):  # not the warm-up pings
+        llm_metrics.inc("llm_http_requests_total", status=response.status_code)
+
+
+def _track_response(response: httpx.Response):
+    opened = getattr(_local, "responses", None)
+    if opened is not None:
+        opened.append(response)
+
+
+async def _acount_response(response: httpx.Response):
+    _count_response(response)
+
+
+@contextmanager
+def closing_responses():
+    """Close every response this thread opens inside the block on the way out.
+
+    A stream abandoned mid-way (lost hedge, deadline, interrupted rerun) otherwise
+    keeps its pooled connection until the garbage collector finalizes it - which can
+    happen on a thread that holds httpcore's pool lock, deadlocking the whole pool.
+    Yields the list of responses opened so far, so another thread can close them early.
+    """
+    previous = getattr(_local, "responses", None)
+    _local.responses = []
+    try:
+        yield _local.responses
+    finally:
+        opened, _local.responses = _local.responses, previous
+        for response in list(opened):
+            response.close()
+
+
+def get_http_client() -> httpx.Client:
+    """Return the shared, pooled HTTP client"""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=_limits(), timeout=httpx.Timeout(60.0, connect=10.0),
+                                        event_hooks={"response": [_count_response, _track_response]})
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the shared, pooled async HTTP client"""
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(limits=_limits(), timeout=httpx.Timeout(60.0, connect=10.0),
+                                                    event_hooks={"response": [_acount_response]})
+        return _async_http_client
+
+
+def _base_llm(model: str, base_url: str, api_key: str) -> ChatOpenAI:
+    key = (model, base_url, api_key or "")
+    with _lock:
+        llm = _registry.get(key)
+    if llm is not None:
+        return llm
+    # Build the OpenAI clients ourselves so the sync and async sides each get a
+    # pooled client of the right type. Retries are left to llm_resilience, which
+    # knows each call's deadline.
+    sync_client = openai.OpenAI(api_key=api_key, base_url=base_url, http_client=get_http_client(), max_retries=0)
+    async_client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=get_async_http_client(), max_retries=0)
+    llm = ChatOpenAI(
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        temperature=DEFAULT_TEMPERATURE,
+        max_tokens=DEFAULT_MAX_TOKENS,
+        client=sync_client.chat.completions,
+        async_client=async_client.chat.completions
+    )
+    with _lock:
+        return _registry.setdefault(key, llm)
+
+
+def get_base_url() -> str:
+    return os.environ.get("DEEPSEEK_BASE_URL") or DEFAULT_BASE_URL
+
+
+def get_model() -> str:
+    return os.environ.get("DEEPSEEK_MODEL") or DEFAULT_MODEL
+
+
+def get_llm(model: str = None, base_url: str = None, api_key: str = None, **overrides):
+    """Return the shared LLM, with any per-call overrides (temperature, max_tokens, ...) bound on top"""
+    if api_key is None:
+        api_key = os.environ.get("DEEPSEEK_API_KEY")
+    llm = _base_llm(model or get_model(), base_url or get_base_url(), api_key)
+    if overrides:
+        return llm.bind(**overrides)
+    return llm
+
+
+def warm_up(base_url: str = None, api_key: str = None):
+    """Open pooled connections to the LLM provider in the background.
+
+    Safe to call on every rerun - only the first call per process does anything,
+    so the first candidate doesn't pay for DNS and TLS setup.
+    """
+    global _warmed
+    with _lock:
+        if _warmed:
+            return
+        _warmed = True
+    if api_key is None:
+        api_key = os.environ.get("DEEPSEEK_API_KEY")
+    client = get_http_client()
+    url = (base_url or get_base_url()).rstrip("/") + "/models"
+    headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    def _ping():
+        try:
+            client.get(url, headers=headers)
+        except Exception:
+            pass  # warm-up is best effort
+
+    for _ in range(max(1, LLM_WARM_CONNECTIONS)):
+        threading.Thread(target=_ping, name="llm-warmup", daemon=True).start()
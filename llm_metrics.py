@@ -0,0 +1,356 @@
+# llm_metrics.py
+"""In-process metrics for LLM calls.
+
+Every chain call in interview.py runs with `config=llm_metrics.track(call_site,
+role=..., question_num=...)`; the attached LangChain callback handler records
+wall time, time to first token (streamed calls), prompt and completion tokens
+and errors. Question-generation retries, duplicate rejections and cache
+lookups are counted by interview.py, and llm_client counts every HTTP attempt
+the OpenAI client makes. llm_scheduler reports queue depth, calls in flight
+and time spent queued; llm_resilience reports retries, hedged requests,
+deadline misses and the circuit breaker.
+
+The registry is read by the admin page in eval.py and rendered in the
+Prometheus text format by render_prometheus(); start_exporters() also writes
+it to METRICS_FILE and/or serves it on METRICS_PORT.
+
+The registry is per process. With JOB_QUEUE the LLM calls, scheduler and
+circuit breaker live in the llm_worker.py processes, so each worker exports its
+own registry with a `worker` label: METRICS_FILE gets a -<worker> suffix and
+worker n serves METRICS_PORT + 1 + n. Aggregate them in Prometheus; the admin
+page only sees the web process.
+"""
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+METRICS_FILE = os.environ.get("METRICS_FILE", "")                           # Prometheus textfile, rewritten periodically
+METRICS_FILE_INTERVAL = float(os.environ.get("METRICS_FILE_INTERVAL", "15"))  # seconds between rewrites
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))                       # serve /metrics on this port (0 = off)
+METRICS_RECENT_CALLS = int(os.environ.get("METRICS_RECENT_CALLS", "200"))     # calls listed on the admin page
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+SAMPLES_PER_SERIES = 1000  # latest observations kept per histogram series for percentiles
+CHARS_PER_TOKEN = 4        # token estimate when the provider reports no usage (streamed calls)
+
+METRICS = {
+    "llm_calls_total": ("counter", "LLM calls by call site, role, question number and status"),
+    "llm_call_seconds": ("histogram", "Wall time of LLM calls"),
+    "llm_first_token_seconds": ("histogram", "Time to the first token of streamed LLM calls"),
+    "llm_prompt_tokens_total": ("counter", "Prompt tokens sent (estimated for streamed calls)"),
+    "llm_completion_tokens_total": ("counter", "Completion tokens received (estimated for streamed calls)"),
+    "llm_http_requests_total": ("counter", "HTTP attempts to the LLM provider by status, including retries"),
+    "question_retries_total": ("counter", "Extra question-generation rounds because every candidate was a duplicate"),
+    "question_duplicates_total": ("counter", "Generated questions rejected as duplicates"),
+    "question_fallbacks_total": ("counter", "Questions replaced by the generic fallback question"),
+    "cache_requests_total": ("counter", "Cache lookups by cache and result"),
+    "eval_batch_fallbacks_total": ("counter", "Batched answers re-scored one by one because the batch call failed or missed them, by reason"),
+    "code_runs_total": ("counter", "Coding answers run against hidden tests by result (passed, failed, stopped, not_run)"),
+    "llm_queue_depth": ("gauge", "LLM calls waiting for a scheduler slot by priority"),
+    "llm_in_flight": ("gauge", "LLM calls holding a scheduler slot"),
+    "llm_queue_wait_seconds": ("histogram", "Time LLM calls spent queued for a scheduler slot by priority"),
+    "llm_retries_total": ("counter", "LLM call retries by call site and error"),
+    "llm_hedges_total": ("counter", "Hedged duplicate requests sent, and whether the duplicate won or lost"),
+    "llm_deadline_exceeded_total": ("counter", "LLM calls given up at their call site's deadline"),
+    "llm_breaker_open": ("gauge", "1 while the LLM circuit breaker is open"),
+    "llm_breaker_rejections_total": ("counter", "LLM calls refused because the circuit breaker was open")
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict) -> Labels:
+    return tuple(sorted((k, "" if v is None else str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    """Thread-safe counters, gauges and histograms keyed by metric name and labels"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Dict] = {}
+        self.recent = deque(maxlen=METRICS_RECENT_CALLS)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = {
+                    "count": 0, "sum": 0.0, "buckets": [0] * len(LATENCY_BUCKETS),
+                    "samples": deque(maxlen=SAMPLES_PER_SERIES)
+                }
+            series["count"] += 1
+            series["sum"] += value
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    series["buckets"][i] += 1
+            series["samples"].append(value)
+
+    def record_call(self, call: Dict):
+        with self._lock:
+            self.recent.append(call)
+
+    def counters(self, name: str) -> List[Tuple[Dict, float]]:
+        with self._lock:
+            return [(dict(labels), value) for (n, labels), value in self._counters.items() if n == name]
+
+    def gauges(self, name: str) -> List[Tuple[Dict, float]]:
+        with self._lock:
+            return [(dict(labels), value) for (n, labels), value in self._gauges.items() if n == name]
+
+    def histograms(self, name: str) -> List[Tuple[Dict, Dict]]:
+        with self._lock:
+            return [(dict(labels), dict(series, buckets=list(series["buckets"]), samples=list(series["samples"])))
+                    for (n, labels), series in self._histograms.items() if n == name]
+
+    def recent_calls(self) -> List[Dict]:
+        with self._lock:
+            return list(self.recent)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.recent.clear()
+
+
+REGISTRY = Registry()
+
+
+def inc(name: str, amount: float = 1, **labels):
+    REGISTRY.inc(name, amount, **labels)
+
+
+def cache_lookup(cache: str, hit: bool):
+    REGISTRY.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times one chain call's LLM run and records it under the call site's labels"""
+
+    def __init__(self, call_site: str, role: str = "", question_num: Optional[int] = None, registry: Registry = None):
+        self.call_site = call_site
+        self.role = role or ""
+        self.question_num = "" if question_num is None else str(question_num)
+        self.registry = registry or REGISTRY
+        self._runs: Dict = {}
+
+    def _start(self, run_id, prompt_chars: int):
+        self._runs[run_id] = {"start": time.perf_counter(), "first_token": None, "chunks": 0, "prompt_chars": prompt_chars}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, sum(len(str(m.content)) for batch in messages for m in batch))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, sum(len(p) for p in prompts))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is None:
+            return
+        if run["first_token"] is None:
+            run["first_token"] = time.perf_counter() - run["start"]
+        run["chunks"] += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        completion_chars = sum(len(g.text) for gens in response.generations for g in gens)
+        self._finish(run, "ok",
+                     usage.get("prompt_tokens") or run["prompt_chars"] // CHARS_PER_TOKEN,
+                     usage.get("completion_tokens") or run["chunks"] or completion_chars // CHARS_PER_TOKEN)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            # GeneratorExit: the caller stopped reading the stream (a hedged request that lost, or a deadline)
+            status = "cancelled" if isinstance(error, GeneratorExit) else "error"
+            self._finish(run, status, run["prompt_chars"] // CHARS_PER_TOKEN, 0, error=f"{type(error).__name__}: {error}")
+
+    def _finish(self, run: Dict, status: str, prompt_tokens: int, completion_tokens: int, error: str = None):
+        seconds = time.perf_counter() - run["start"]
+        registry = self.registry
+        registry.inc("llm_calls_total", call_site=self.call_site, role=self.role, question_num=self.question_num, status=status)
+        registry.observe("llm_call_seconds", seconds, call_site=self.call_site)
+        if run["first_token"] is not None:
+            registry.observe("llm_first_token_seconds", run["first_token"], call_site=self.call_site)
+        registry.inc("llm_prompt_tokens_total", prompt_tokens, call_site=self.call_site, role=self.role)
+        registry.inc("llm_completion_tokens_total", completion_tokens, call_site=self.call_site, role=self.role)
+        registry.record_call({
+            "time": time.strftime("%H:%M:%S"),
+            "call_site": self.call_site,
+            "role": self.role,
+            "question_num": self.question_num,
+            "status": status,
+            "seconds": round(seconds, 3),
+            "first_token": round(run["first_token"], 3) if run["first_token"] is not None else None,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "error": error
+        })
+
+
+def track(call_site: str, role: str = "", question_num: Optional[int] = None) -> Dict:
+    """Runnable config that records the call under these labels: chain.invoke(inputs, config=track(...))"""
+    return {"callbacks": [MetricsCallbackHandler(call_site, role, question_num)], "run_name": call_site}
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * p)))]
+
+
+def latency_percentile(name: str, call_site: str, p: float, min_samples: int = 1, registry: Registry = None) -> Optional[float]:
+    """Percentile of a call site's recent observations of a histogram, or None with fewer than `min_samples`"""
+    samples = [v for labels, series in (registry or REGISTRY).histograms(name) if labels.get("call_site") == call_site
+               for v in series["samples"]]
+    return _percentile(samples, p) if len(samples) >= min_samples else None
+
+
+def call_site_summary(registry: Registry = None) -> List[Dict]:
+    """One row per call site for the admin page"""
+    registry = registry or REGISTRY
+    rows: Dict[str, Dict] = {}
+
+    def row(call_site: str) -> Dict:
+        return rows.setdefault(call_site, {"call_site": call_site, "calls": 0, "errors": 0, "p50_s": None, "p95_s": None,
+                                           "p50_first_token_s": None, "prompt_tokens": 0, "completion_tokens": 0})
+    for labels, value in registry.counters("llm_calls_total"):
+        r = row(labels["call_site"])
+        r["calls"] += int(value)
+        if labels["status"] == "error":
+            r["errors"] += int(value)
+    for labels, series in registry.histograms("llm_call_seconds"):
+        r = row(labels["call_site"])
+        r["p50_s"] = _percentile(series["samples"], 0.5)
+        r["p95_s"] = _percentile(series["samples"], 0.95)
+    for labels, series in registry.histograms("llm_first_token_seconds"):
+        row(labels["call_site"])["p50_first_token_s"] = _percentile(series["samples"], 0.5)
+    for name, field in (("llm_prompt_tokens_total", "prompt_tokens"), ("llm_completion_tokens_total", "completion_tokens")):
+        for labels, value in registry.counters(name):
+            row(labels["call_site"])[field] += int(value)
+    return sorted(rows.values(), key=lambda r: r["call_site"])
+
+
+def counter_totals(name: str, by: str, registry: Registry = None) -> Dict[str, float]:
+    """Sum a counter over every label except `by`"""
+    totals: Dict[str, float] = {}
+    for labels, value in (registry or REGISTRY).counters(name):
+        totals[labels.get(by, "")] = totals.get(labels.get(by, ""), 0) + value
+    return totals
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict, extra: Dict = None) -> str:
+    items = sorted(dict(labels, **_constant_labels).items()) + list((extra or {}).items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in items) + "}"
+
+
+def render_prometheus(registry: Registry = None) -> str:
+    """All metrics in the Prometheus text exposition format"""
+    registry = registry or REGISTRY
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind in ("counter", "gauge"):
+            values = registry.counters(name) if kind == "counter" else registry.gauges(name)
+            for labels, value in sorted(values, key=lambda lv: sorted(lv[0].items())):
+                lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            continue
+        for labels, series in sorted(registry.histograms(name), key=lambda ls: sorted(ls[0].items())):
+            for bound, count in zip(LATENCY_BUCKETS, series["buckets"]):
+                lines.append(f"{name}_bucket{_format_labels(labels, {'le': f'{bound:g}'})} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {series['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {series['sum']:.6f}")
+            lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path: str = None):
+    """Atomically (re)write the Prometheus text to `path` (for node_exporter's textfile collector)"""
+    path = path or METRICS_FILE
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_exporters_lock = threading.Lock()
+_exporters_started = False
+_constant_labels: Dict[str, str] = {}  # added to every exported series, e.g. {"worker": ...}
+
+
+def start_exporters(worker: str = "", index: int = 0):
+    """Start the METRICS_FILE writer and METRICS_PORT endpoint if configured (once per process).
+    llm_worker.py passes its worker name and process index, so each worker exports separately."""
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    path, port = METRICS_FILE, METRICS_PORT
+    if worker:
+        _constant_labels["worker"] = worker
+        root, ext = os.path.splitext(METRICS_FILE)
+        path = f"{root}-{worker}{ext}" if METRICS_FILE else ""
+        port = METRICS_PORT + 1 + index if METRICS_PORT else 0
+    if path:
+        def write_forever():
+            while True:
+                time.sleep(METRICS_FILE_INTERVAL)
+                try:
+                    write_textfile(path)
+                except OSError:
+                    pass  # try again next interval
+        threading.Thread(target=write_forever, name="metrics-file", daemon=True).start()
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+        except OSError:
+            return  # port taken, e.g. by another server process on this host
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
@@ -0,0 +1,364 @@
+# llm_resilience.py
+"""Deadlines, retries, circuit breaking and hedging for LLM calls.
+
+interview.py hands every LLM call to `call(call_site, attempt, on_partial)`,
+where `attempt(timeout, on_partial)` makes one request whose HTTP timeout is
+`timeout` seconds. For each call:
+
+- the whole call, queueing and retries included, must finish within the call
+  site's deadline (LLM_DEADLINES); a call still queued for a scheduler slot
+  when it passes leaves the queue;
+- timeouts, connection errors, 429s and 5xx responses are retried up to
+  LLM_RETRIES times with full-jitter exponential backoff (honouring
+  Retry-After), as long as the deadline leaves room;
+- after LLM_BREAKER_FAILURES consecutive provider failures the breaker
+  opens, and calls fail immediately for LLM_BREAKER_COOLDOWN seconds before
+  a single probe call is let through;
+- for the call sites in LLM_HEDGE_CALL_SITES, a duplicate request is sent
+  once the first has gone unanswered for the call site's recent p95 latency
+  (time to first token when streamed), and whichever answers first wins; the
+  loser gives its scheduler slot back and its response is closed right away.
+
+Anything that can't be answered in time raises LLMUnavailable; callers fall
+back (generic question) or ask the candidate to resubmit. Every attempt holds
+its own llm_scheduler slot, and backoff sleeps hold none. Streamed partial
+output is always delivered on the calling thread, so Streamlit placeholders
+keep working when the request itself runs on one of the LLM_HEDGE_WORKERS
+hedge threads.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import openai
+
+import llm_client
+import llm_metrics
+import llm_scheduler
+
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", "2"))                          # extra attempts after a retryable failure
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "0.5"))             # seconds; doubled per retry, fully jittered
+LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", "8"))
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))         # consecutive failures that open the breaker
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))      # seconds before a probe call is allowed
+LLM_HEDGE_CALL_SITES = [s.strip() for s in os.environ.get("LLM_HEDGE_CALL_SITES", "evaluate_answer,generate_question").split(",") if s.strip()]
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))      # recent calls needed before hedging starts
+LLM_HEDGE_MIN_DELAY = float(os.environ.get("LLM_HEDGE_MIN_DELAY", "0.5"))       # never hedge sooner than this
+LLM_HEDGE_WORKERS = int(os.environ.get("LLM_HEDGE_WORKERS", "32"))               # threads running hedged attempts, for all calls
+
+# Seconds from the start of a call (queueing and retries included) until it is given up
+DEFAULT_DEADLINES = {
+    "evaluate_answer": 45,
+    "generate_question": 30,
+    "recommendation": 90,
+    "generate_tests": 60,
+    "translate": 30,
+    "bank_fill": 120,
+    "evaluate_batch": 180
+}
+DEFAULT_DEADLINE = 60
+
+
+def _parse_deadlines(text: str) -> Dict[str, float]:
+    """"evaluate_answer=30,generate_question=20" -> {call_site: seconds}"""
+    deadlines = dict(DEFAULT_DEADLINES)
+    for item in text.split(","):
+        if "=" in item:
+            call_site, seconds = item.split("=", 1)
+            deadlines[call_site.strip()] = float(seconds)
+    return deadlines
+
+
+LLM_DEADLINES = _parse_deadlines(os.environ.get("LLM_DEADLINES", ""))
+
+
+class LLMUnavailable(Exception):
+    """The call could not be answered within its deadline (or the breaker is open)"""
+
+
+class DeadlineExceeded(Exception):
+    """Raised inside an attempt once the call's deadline has passed"""
+
+    def __init__(self, queued: bool = False):
+        super().__init__("deadline passed before a scheduler slot was free" if queued else "deadline passed")
+        self.queued = queued  # the time went on our own queue, not on the provider
+
+
+class HedgeLost(Exception):
+    """Stops a streamed attempt once the other one has answered first"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError,
+                          httpx.TransportError)):  # APITimeoutError is an APIConnectionError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: BaseException) -> float:
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after", 0)) if response is not None else 0
+    except ValueError:
+        return 0  # an HTTP date - fall back to our own backoff
+
+
+class CircuitBreaker:
+    """closed -> open after `failures` consecutive failures -> half-open (one probe) after `cooldown`"""
+
+    def __init__(self, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._consecutive = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._probing:
+                return False
+            self._probing = True  # half-open: let exactly one call find out if the provider is back
+            return True
+
+    def success(self):
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._probing = False
+        llm_metrics.REGISTRY.set("llm_breaker_open", 0)
+
+    def skip(self):
+        """The call never reached the provider - neither a success nor a failure"""
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._consecutive += 1
+            self._probing = False
+            if self._opened_at is None and self._consecutive < self.failures:
+                return
+            self._opened_at = time.monotonic()  # open, or re-open after a failed probe
+        llm_metrics.REGISTRY.set("llm_breaker_open", 1)
+
+
+BREAKER = CircuitBreaker()
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def hedge_after(call_site: str, streamed: bool) -> Optional[float]:
+    """Seconds after which a duplicate request is sent, or None if this call isn't hedged"""
+    if call_site not in LLM_HEDGE_CALL_SITES:
+        return None
+    name = "llm_first_token_seconds" if streamed else "llm_call_seconds"
+    threshold = llm_metrics.latency_percentile(name, call_site, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES)
+    return None if threshold is None else max(threshold, LLM_HEDGE_MIN_DELAY)
+
+
+def _run_attempt(call_site: str, attempt: Callable, on_partial, deadline: float, on_start: Callable = None):
+    """One request inside a scheduler slot, with the time left as its HTTP timeout.
+
+    `on_start(slot, responses)` runs once the slot is held, just before the request is sent.
+    """
+    try:
+        with llm_scheduler.slot(call_site, deadline - time.monotonic()) as held, \
+                llm_client.closing_responses() as responses:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                raise DeadlineExceeded(queued=True)
+            if on_start is not None:
+                on_start(held, responses)
+            if on_partial is None:
+                return attempt(timeout, None)
+
+            def partial(text: str):
+                if time.monotonic() > deadline:
+                    raise DeadlineExceeded()  # a stream that trickles on past the deadline
+                on_partial(text)
+            return attempt(timeout, partial)
+    except llm_scheduler.QueueTimeout:
+        raise DeadlineExceeded(queued=True) from None
+
+
+def _hedge_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=LLM_HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+        return _pool
+
+
+class _Race:
+    """State shared by the attempts of one hedged call; guarded by `cond`"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.winner: Optional[int] = None
+        self.text: Optional[str] = None
+        self.version = 0
+        self.sent = False  # an attempt got a scheduler slot and made its request
+        self.over = False  # the caller has returned; attempts not yet sent are dropped
+        self.outcomes: Dict[int, tuple] = {}  # attempt -> ("ok", result) | ("error", exception)
+        self.running: Dict[int, tuple] = {}  # attempt -> (scheduler slot, responses it opened)
+
+    def abandon(self, keep: Optional[int] = None):
+        """Hand back the slots of every sent attempt but `keep`, and close what they have received"""
+        with self.cond:
+            losers = [self.running.pop(i) for i in list(self.running) if i != keep]
+        for held, responses in losers:
+            held.release()
+            for response in list(responses):
+                response.close()
+
+
+def _hedged(call_site: str, attempt: Callable, on_partial, deadline: float, delay: float):
+    """Run the call on the hedge pool, send a duplicate after `delay` and return the first answer.
+
+    As soon as one attempt has won, the other gives its scheduler slot back and its response is
+    closed; a duplicate that hasn't been sent yet never is.
+    """
+    race = _Race()
+    priority = llm_scheduler.current_priority(call_site)
+    streamed = on_partial is not None
+
+    def run(idx: int):
+        def started(held, responses):
+            with race.cond:
+                if race.over or race.winner is not None:
+                    raise HedgeLost()
+                race.sent = True
+                race.running[idx] = (held, responses)
+
+        def partial(text: str):
+            with race.cond:
+                if race.winner is None:
+                    race.winner = idx  # the first token decides a streamed race
+                if race.winner != idx:
+                    raise HedgeLost()
+                race.text = text
+                race.version += 1
+                race.cond.notify_all()
+        try:
+            with llm_scheduler.priority(priority):
+                outcome = ("ok", _run_attempt(call_site, attempt, partial if streamed else None, deadline, started))
+        except Exception as e:
+            outcome = ("error", e)
+        with race.cond:
+            race.running.pop(idx, None)
+            race.outcomes[idx] = outcome
+            if race.winner is None and outcome[0] == "ok":
+                race.winner = idx
+            race.cond.notify_all()
+
+    attempts = [_hedge_pool().submit(run, 0)]
+    hedge_at = time.monotonic() + delay
+    seen = 0
+    try:
+        while True:
+            launched = len(attempts)
+            with race.cond:
+                while True:
+                    now = time.monotonic()
+                    finished = race.winner is not None and race.winner in race.outcomes
+                    all_failed = race.winner is None and len(race.outcomes) == launched
+                    hedge_due = launched == 1 and race.winner is None and now >= hedge_at
+                    if finished or all_failed or hedge_due or race.version != seen or now >= deadline:
+                        break
+                    if launched > 1 and race.winner is not None and len(race.running) > 1:
+                        break  # a streamed attempt won while the other is still running
+                    wake = min(deadline, hedge_at) if launched == 1 and race.winner is None else deadline
+                    race.cond.wait(wake - now)
+                text, changed, seen = race.text, race.version != seen, race.version
+                winner = race.winner
+                outcome = race.outcomes.get(winner) if finished else None
+                errors = [race.outcomes[i][1] for i in sorted(race.outcomes)] if all_failed else []
+                sent = race.sent
+            if winner is not None and launched > 1:
+                race.abandon(keep=winner)
+            if changed and outcome is None:
+                on_partial(text)
+            if outcome is not None:
+                if launched > 1:
+                    llm_metrics.inc("llm_hedges_total", call_site=call_site, result="won" if winner else "lost")
+                if outcome[0] == "error":
+                    raise outcome[1]
+                if on_partial is not None and text is not None:
+                    on_partial(text)
+                return outcome[1]
+            if errors:
+                raise errors[-1]
+            if hedge_due:
+                llm_metrics.inc("llm_hedges_total", call_site=call_site, result="sent")
+                attempts.append(_hedge_pool().submit(run, 1))
+            elif time.monotonic() >= deadline:
+                raise DeadlineExceeded(queued=not sent)
+    finally:
+        with race.cond:
+            race.over = True
+        for future in attempts:
+            future.cancel()  # still waiting for a pool thread
+        race.abandon()
+
+
+def call(call_site: str, attempt: Callable[[float, Optional[Callable[[str], None]]], object],
+         on_partial: Callable[[str], None] = None, deadline: float = None):
+    """Run `attempt(timeout, on_partial)` under the call site's deadline, retry, breaker and hedging policy"""
+    seconds = deadline if deadline is not None else LLM_DEADLINES.get(call_site, DEFAULT_DEADLINE)
+    give_up_at = time.monotonic() + seconds
+    errors: List[BaseException] = []
+    for retry in range(LLM_RETRIES + 1):
+        if not BREAKER.allow():
+            llm_metrics.inc("llm_breaker_rejections_total", call_site=call_site)
+            raise LLMUnavailable(f"{call_site}: the LLM provider is failing, circuit breaker open") from (errors[-1] if errors else None)
+        delay = hedge_after(call_site, on_partial is not None)
+        try:
+            if delay is None:
+                result = _run_attempt(call_site, attempt, on_partial, give_up_at)
+            else:
+                result = _hedged(call_site, attempt, on_partial, give_up_at, delay)
+        except DeadlineExceeded as e:
+            if e.queued:
+                BREAKER.skip()  # a backed-up queue says nothing about the provider's health
+            else:
+                BREAKER.failure()
+            errors.append(e)
+            break
+        except Exception as e:
+            if not is_retryable(e):
+                BREAKER.success()  # the provider answered; the request itself was bad
+                raise
+            BREAKER.failure()
+            errors.append(e)
+            if retry == LLM_RETRIES:
+                break
+            llm_metrics.inc("llm_retries_total", call_site=call_site, reason=type(e).__name__)
+            backoff = max(random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** retry)), _retry_after(e))
+            if time.monotonic() + backoff >= give_up_at:
+                break
+            time.sleep(backoff)
+            continue
+        BREAKER.success()
+        return result
+    if isinstance(errors[-1], DeadlineExceeded) or time.monotonic() >= give_up_at:
+        llm_metrics.inc("llm_deadline_exceeded_total", call_site=call_site)
+        raise LLMUnavailable(f"{call_site}: no answer within {seconds:g}s") from errors[-1]
+    raise LLMUnavailable(f"{call_site}: failed after {len(errors)} attempt(s): {errors[-1]}") from errors[-1]
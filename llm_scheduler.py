@@ -0,0 +1,212 @@
+# llm_scheduler.py
+"""Process-wide admission control for outbound LLM calls.
+
+Every chain call in interview.py runs inside `with llm_scheduler.slot(call_site):`.
+A call waits until it is at the head of a priority queue, fewer than
+LLM_MAX_IN_FLIGHT calls are running and the token bucket (LLM_RATE_LIMIT calls
+per second, bursts of LLM_RATE_BURST) has a token. The slot is held for the
+whole call, including streamed output and the OpenAI client's own retries.
+
+Calls are ranked by class, highest first:
+
+    live_evaluation   a candidate waiting for their feedback
+    next_question     questions and recommendations shown on the page
+    background        prefetch and question-bank filling
+    rescore           batch re-scoring
+
+The class comes from the call site, unless the thread runs under
+`priority(...)` (prefetch workers and rescore.py do). Background and rescore
+calls never take the last LLM_RESERVED_SLOTS slots, so a live call isn't
+stuck behind a full pool of background work. A call that can't get a slot
+within its timeout leaves the queue with QueueTimeout. Queue depth, calls in
+flight and queue wait are exported through llm_metrics.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple, Union
+
+import llm_metrics
+
+LLM_MAX_IN_FLIGHT = int(os.environ.get("LLM_MAX_IN_FLIGHT", "16"))      # concurrent calls to the provider
+LLM_RESERVED_SLOTS = int(os.environ.get("LLM_RESERVED_SLOTS", "2"))     # slots background/rescore calls can't take
+LLM_RATE_LIMIT = float(os.environ.get("LLM_RATE_LIMIT", "0"))           # calls per second (0 = unlimited)
+LLM_RATE_BURST = int(os.environ.get("LLM_RATE_BURST", "0"))             # token bucket size (default: LLM_RATE_LIMIT, at least 1)
+
+PRIORITIES = ("live_evaluation", "next_question", "background", "rescore")
+BACKGROUND_PRIORITIES = ("background", "rescore")
+CALL_SITE_PRIORITY = {
+    "evaluate_answer": "live_evaluation",
+    "generate_question": "next_question",
+    "recommendation": "next_question",
+    "generate_tests": "live_evaluation",  # only when an answer is waiting for them; prepared ahead at background
+    "translate": "next_question",
+    "bank_fill": "background",
+    "evaluate_batch": "rescore"
+}
+
+_local = threading.local()
+
+
+class QueueTimeout(Exception):
+    """No slot became free within the caller's timeout"""
+
+
+class Scheduler:
+    """Priority queue + in-flight limit + token bucket; acquire() blocks, release() frees the slot"""
+
+    def __init__(self, max_in_flight: int = LLM_MAX_IN_FLIGHT, reserved: int = LLM_RESERVED_SLOTS,
+                 rate: float = LLM_RATE_LIMIT, burst: int = LLM_RATE_BURST):
+        self.max_in_flight = max(1, max_in_flight)
+        self.reserved = max(0, min(reserved, self.max_in_flight - 1))
+        self.rate = rate
+        self.burst = max(1, burst or int(rate))
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []  # heap of (priority rank, arrival)
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._depth: Dict[str, int] = {name: 0 for name in PRIORITIES}
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+
+    def _take_token(self) -> float:
+        """Take a token if one is available; otherwise return the seconds until the next one"""
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    def _limit(self, name: str) -> int:
+        return self.max_in_flight - (self.reserved if name in BACKGROUND_PRIORITIES else 0)
+
+    def _publish(self, name: str):
+        llm_metrics.REGISTRY.set("llm_queue_depth", self._depth[name], priority=name)
+        llm_metrics.REGISTRY.set("llm_in_flight", self._in_flight)
+
+    def acquire(self, name: str, timeout: float = None) -> float:
+        """Block until a call of class `name` may start; returns the seconds spent queued.
+
+        Raises QueueTimeout, and leaves the queue, if that takes longer than `timeout` seconds.
+        """
+        entry = (PRIORITIES.index(name), next(self._seq))
+        started = time.perf_counter()
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            self._depth[name] += 1
+            self._publish(name)
+            try:
+                while True:
+                    delay = None
+                    if self._waiting[0] == entry and self._in_flight < self._limit(name):
+                        delay = self._take_token()
+                        if not delay:
+                            break
+                    if give_up_at is not None:
+                        left = give_up_at - time.monotonic()
+                        if left <= 0:
+                            raise QueueTimeout(f"no {name} slot within {timeout:.1f}s")
+                        delay = left if delay is None else min(delay, left)
+                    self._cond.wait(delay)
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._depth[name] -= 1
+                self._publish(name)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self._depth[name] -= 1
+            self._in_flight += 1
+            self._publish(name)
+            self._cond.notify_all()  # the next head may be able to start too
+        waited = time.perf_counter() - started
+        llm_metrics.REGISTRY.observe("llm_queue_wait_seconds", waited, priority=name)
+        return waited
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            llm_metrics.REGISTRY.set("llm_in_flight", self._in_flight)
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            return {"in_flight": self._in_flight, "max_in_flight": self.max_in_flight, "queued": dict(self._depth)}
+
+
+SCHEDULER = Scheduler()
+
+
+class Promotable:
+    """A class for work handed to a pool that can be raised while the work runs (prefetch.promote)"""
+
+    def __init__(self, name: str):
+        if name not in PRIORITIES:
+            raise ValueError(f"Unknown priority {name!r}")
+        self.name = name
+
+    def promote(self, name: str):
+        """Queue the work's next calls under `name` if it ranks higher; a call already queued keeps its place"""
+        if PRIORITIES.index(name) < PRIORITIES.index(self.name):
+            self.name = name
+
+
+def current_priority(call_site: str) -> str:
+    """The class a call from this thread is queued under"""
+    current = getattr(_local, "priority", None)
+    return getattr(current, "name", current) or CALL_SITE_PRIORITY.get(call_site, "next_question")
+
+
+@contextmanager
+def priority(name: Union[str, Promotable]):
+    """Queue every LLM call made by this thread under `name`, whatever its call site"""
+    if getattr(name, "name", name) not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name!r}")
+    previous = getattr(_local, "priority", None)
+    _local.priority = name
+    try:
+        yield
+    finally:
+        _local.priority = previous
+
+
+def run_as(name: Union[str, Promotable], fn: Callable, *args, **kwargs):
+    """fn(*args, **kwargs) under priority(name) - for handing work to a pool"""
+    with priority(name):
+        return fn(*args, **kwargs)
+
+
+class Slot:
+    """A held slot; release() is idempotent, so a slot can be handed back before its call returns"""
+
+    def __init__(self, scheduler: Scheduler):
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._held = True
+
+    def release(self):
+        with self._lock:
+            if not self._held:
+                return
+            self._held = False
+        self._scheduler.release()
+
+
+@contextmanager
+def slot(call_site: str, timeout: float = None):
+    """Hold one scheduler slot for the duration of an LLM call (QueueTimeout after `timeout` seconds queued)"""
+    SCHEDULER.acquire(current_priority(call_site), timeout)
+    held = Slot(SCHEDULER)
+    try:
+        yield held
+    finally:
+        held.release()
@@ -0,0 +1,174 @@
+# llm_worker.py
+"""Worker pool for queued LLM jobs (see job_queue.py).
+
+    python llm_worker.py [--processes 1] [--threads 8]
+
+Each worker thread claims the next job, runs it from interview.JOBS under the
+job's priority class in this process's llm_scheduler, and stores the result
+(or the error) on the job row. One heartbeat thread per process renews the
+leases of the jobs it is running and writes their streamed output; a job the
+web process has cancelled is abandoned at its next partial output.
+
+--processes starts that many pools to spread response parsing and streaming
+over several cores. Each pool has its own LLM_MAX_IN_FLIGHT slots, question
+bank filler, caches and LLM metrics, which it exports with a `worker` label
+(see llm_metrics.start_exporters). The question bank, dedupe index and the
+languages in demand are shared through the database and index file. Stop with
+Ctrl+C; jobs left running are picked up by another worker once their lease
+lapses.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+import job_queue
+import llm_metrics
+import llm_scheduler
+
+PURGE_INTERVAL = 300  # seconds between deletions of old finished jobs
+
+
+class JobCancelled(Exception):
+    """The job was cancelled, or handed to another worker after a lapsed lease"""
+
+
+class _Running:
+    """A job this process is running; its partial output is written by the heartbeat thread"""
+
+    def __init__(self, job: Dict):
+        self.job = job
+        self.partial = None
+        self.version = 0
+        self.written = 0
+        self.cancelled = False
+
+    def update(self, value):
+        if self.cancelled:
+            raise JobCancelled(self.job["id"])
+        self.partial = value
+        self.version += 1
+
+
+_lock = threading.Lock()
+_running: Dict[str, _Running] = {}
+
+
+def _heartbeat(worker: str, stop: threading.Event):
+    """Write new partial output every poll interval and renew every lease a few times per lease period"""
+    renewed = purged = 0.0
+    while not stop.wait(job_queue.JOB_POLL_INTERVAL):
+        now = time.monotonic()
+        renew_all = now - renewed >= job_queue.JOB_LEASE_SECONDS / 3
+        with _lock:
+            running = list(_running.values())
+        for run in running:
+            version, partial = run.version, run.partial
+            if version == run.written and not renew_all:
+                continue
+            try:
+                if not job_queue.renew(run.job["id"], worker, partial if version != run.written else None):
+                    run.cancelled = True
+                run.written = version
+            except sqlite3.OperationalError:
+                pass  # database busy - try again on the next beat
+        if renew_all:
+            renewed = now
+        if now - purged >= PURGE_INTERVAL:
+            purged = now
+            try:
+                job_queue.purge()
+            except sqlite3.OperationalError:
+                pass
+
+
+def run_job(job: Dict, worker: str):
+    from interview import JOBS
+
+    run = _Running(job)
+    with _lock:
+        _running[job["id"]] = run
+    try:
+        fn = JOBS.get(job["kind"])
+        if fn is None:
+            raise ValueError(f"Unknown job kind {job['kind']!r}")
+        kwargs = dict(job["payload"])
+        if job["stream"]:
+            kwargs["on_partial"] = run.update
+        result = llm_scheduler.run_as(job["priority"], fn, **kwargs)
+    except JobCancelled:
+        pass
+    except Exception as e:
+        job_queue.fail(job["id"], worker, e)
+    else:
+        job_queue.complete(job["id"], worker, result)
+    finally:
+        with _lock:
+            _running.pop(job["id"], None)
+
+
+def _work(worker: str, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            job = job_queue.claim(worker)
+        except sqlite3.OperationalError:
+            job = None  # database busy
+        if job is None:
+            stop.wait(job_queue.JOB_POLL_INTERVAL)
+            continue
+        run_job(job, worker)
+
+
+def start_threads(threads: int, worker: str, stop: threading.Event):
+    """Start the heartbeat and `threads` job threads, which run until `stop` is set; returns the threads"""
+    pool = [threading.Thread(target=_heartbeat, args=(worker, stop), name="job-heartbeat", daemon=True)]
+    pool += [threading.Thread(target=_work, args=(worker, stop), name=f"job-worker-{i}", daemon=True) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    return pool
+
+
+def run_pool(threads: int, index: int = 0):
+    """Run one pool in this process until interrupted; `index` numbers the processes of one llm_worker.py"""
+    import question_bank
+    from interview import fill_question_bank
+
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    stop = threading.Event()
+    question_bank.start_filler(fill_question_bank)
+    llm_metrics.start_exporters(worker=worker, index=index)
+    pool = start_threads(threads, worker, stop)
+    print(f"Worker {worker}: {threads} thread(s) on {job_queue.JOB_QUEUE_DB}", flush=True)
+    try:
+        while any(thread.is_alive() for thread in pool):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued LLM jobs for the web process")
+    parser.add_argument("--processes", type=int, default=1, help="worker processes (default: %(default)s)")
+    parser.add_argument("--threads", type=int, default=8, help="jobs run at once per process (default: %(default)s)")
+    args = parser.parse_args(argv)
+    job_queue.connect()  # create the schema before the processes race to
+    if args.processes <= 1:
+        run_pool(args.threads)
+        return
+    processes = [multiprocessing.Process(target=run_pool, args=(args.threads, i), name=f"llm-worker-{i}") for i in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()  # each pool gets the Ctrl+C too
+
+
+if __name__ == "__main__":
+    main()
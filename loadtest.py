@@ -0,0 +1,425 @@
+# loadtest.py
+"""Load test: many concurrent interviews hosted by one Streamlit process.
+
+Starts `streamlit run eval.py` (with its databases in a temporary directory
+and the LLM pointed at an in-process stub_llm server, unless --url / --no-stub
+are given) and drives it with scripted browser sessions that speak
+Streamlit's websocket protocol: each virtual candidate registers, logs in,
+fills setup_form, answers all five questions and opens Results, exactly as
+the browser would send those widget values.
+
+    python loadtest.py --candidates 25 --think-time 5 --latency 0.8 --jitter 0.3
+    python loadtest.py --url http://127.0.0.1:8501 --server-pid 12345 --db evaluations.db
+
+Reported (and written to bench_results/loadtest-<timestamp>.json):
+- rerun latency percentiles per step, from sending the widget state to the
+  end of the last script run it caused (st.rerun included)
+- server memory: baseline, peak and growth per connected session (Linux /proc)
+- evaluation store contention: a probe takes the SQLite write lock every
+  --probe-interval seconds and records how long it had to wait; evaluations
+  saved are checked against completed interviews
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from tornado.websocket import websocket_connect
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+import stub_llm
+from benchmark import BENCH_RESULTS_DIR, SAMPLE_ANSWERS, percentiles
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval.py")
+PASSWORD = "loadtest-password"
+STEPS = ["load", "register", "login", "navigate", "start", "submit", "finish", "results"]
+
+
+class AppError(Exception):
+    pass
+
+
+class BrowserSession:
+    """A scripted browser tab: sends widget states over the websocket and waits for each script run"""
+
+    def __init__(self, url: str, timeout: float):
+        self.url = url.rstrip("/").replace("http", "ws", 1) + "/_stcore/stream"
+        self.timeout = timeout
+        self.ws = None
+        self.widgets = []  # (element type, widget proto) rendered by the last run, in page order
+        self.text = []     # markdown / alert bodies rendered by the last run
+        self.errors = []
+        self.states: Dict[str, WidgetState] = {}  # values the browser sends back on every rerun
+        self.reruns = defaultdict(list)
+        self._run_done: Optional[asyncio.Future] = None
+        self._reader = None
+
+    async def connect(self):
+        self.ws = await websocket_connect(self.url, max_message_size=64 * 1024 * 1024)
+        self._reader = asyncio.ensure_future(self._read())
+
+    async def close(self):
+        if self.ws is not None:
+            self.ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def _read(self):
+        while True:
+            payload = await self.ws.read_message()
+            if payload is None:
+                if self._run_done is not None and not self._run_done.done():
+                    self._run_done.set_exception(ConnectionError("websocket closed by the server"))
+                return
+            msg = ForwardMsg()
+            msg.ParseFromString(payload)
+            kind = msg.WhichOneof("type")
+            if kind == "new_session":  # sent at the start of every script run
+                self.widgets, self.text, self.errors = [], [], []
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                self._element(msg.delta.new_element)
+            elif kind == "script_finished" and msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                if self._run_done is not None and not self._run_done.done():
+                    self._run_done.set_result(msg.script_finished)
+
+    def _element(self, element):
+        element_type = element.WhichOneof("type")
+        if element_type == "exception":
+            self.errors.append(f"{element.exception.type}: {element.exception.message}")
+        elif element_type in ("markdown", "alert"):
+            self.text.append(getattr(element, element_type).body)
+        elif element_type:
+            widget = getattr(element, element_type)
+            if "id" in widget.DESCRIPTOR.fields_by_name and widget.id:
+                self.widgets.append((element_type, widget))
+
+    def find(self, label: str = None, key: str = None):
+        for element_type, widget in self.widgets:
+            if key is not None and widget.id.endswith("-" + key):
+                return element_type, widget
+            if label is not None and widget.label.startswith(label):
+                return element_type, widget
+        raise AppError(f"widget {key or label!r} not on the page")
+
+    def set_value(self, value, label: str = None, key: str = None):
+        element_type, widget = self.find(label, key)
+        state = WidgetState(id=widget.id)
+        if element_type in ("text_input", "text_area"):
+            state.string_value = value
+        elif element_type in ("selectbox", "radio"):
+            state.int_value = list(widget.options).index(value)
+        elif element_type == "checkbox":
+            state.bool_value = value
+        else:
+            raise AppError(f"can't set a {element_type}")
+        self.states[widget.id] = state
+
+    def page_contains(self, text: str) -> bool:
+        return any(text in body for body in self.text)
+
+    async def rerun(self, step: str, click: str = None):
+        """Send the current widget values (plus a click on the `click` button) and wait for the page to settle"""
+        msg = BackMsg()
+        msg.rerun_script.widget_states.widgets.extend(self.states.values())
+        if click is not None:
+            _, button = self.find(click)
+            msg.rerun_script.widget_states.widgets.add(id=button.id, trigger_value=True)
+        self._run_done = asyncio.get_event_loop().create_future()
+        started = time.perf_counter()
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+        await asyncio.wait_for(self._run_done, self.timeout)
+        self.reruns[step].append(time.perf_counter() - started)
+        if self.errors:
+            raise AppError(self.errors[0])
+
+
+async def run_candidate(idx: int, run_id: str, url: str, args, skills: str) -> Tuple[Dict, BrowserSession]:
+    """One virtual candidate, from registration to the Results page; the session is left connected"""
+    rng = random.Random(idx)
+    username = f"loadtest-{run_id}-{idx}"
+    session = BrowserSession(url, args.rerun_timeout)
+    result = {"candidate": idx, "username": username, "completed": False, "error": None}
+    started = time.perf_counter()
+    try:
+        await session.connect()
+        await session.rerun("load")
+
+        session.set_value(username, key="reg_username")
+        session.set_value(f"Load Test {idx}", key="reg_name")
+        session.set_value(PASSWORD, key="reg_password")
+        session.set_value(PASSWORD, key="reg_confirm")
+        await session.rerun("register", click="Register")
+        session.set_value(username, key="login_username")
+        session.set_value(PASSWORD, key="login_password")
+        await session.rerun("login", click="Login")
+
+        session.set_value("New Evaluation", label="📋 Navigation")
+        await session.rerun("navigate")
+        session.set_value(args.role, label="Choose role")
+        session.set_value(skills, label="Main technical skills")
+        await session.rerun("start", click="Start Evaluation")
+
+        for num in range(1, 6):
+            if not session.page_contains(f"Question {num}:"):
+                raise AppError(f"question {num} not shown")
+            if args.think_time:
+                await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think_time)
+            session.set_value(f"{rng.choice(SAMPLE_ANSWERS)} (candidate {idx}, question {num})", key="answer_area")
+            await session.rerun("submit" if num < 5 else "finish", click="Submit Answer")
+        if not session.page_contains("Interview complete"):
+            raise AppError("interview did not complete")
+
+        session.set_value("Results", label="📋 Navigation")
+        await session.rerun("results")
+        if not session.page_contains("Recommendation"):
+            raise AppError("no recommendation on the Results page")
+        result["completed"] = True
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["interview"] = time.perf_counter() - started
+    result["reruns"] = dict(session.reruns)
+    return result, session
+
+
+class StoreProbe(threading.Thread):
+    """Repeatedly takes the evaluation store's write lock and records how long each attempt waited"""
+
+    def __init__(self, db_path: str, interval: float):
+        super().__init__(name="store-probe", daemon=True)
+        self.db_path = db_path
+        self.interval = interval
+        self.waits: List[float] = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        while not self.stopped.wait(self.interval):
+            started = time.perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            self.waits.append(time.perf_counter() - started)
+            conn.execute("ROLLBACK")
+        conn.close()
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process in MB (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir: str, env: Dict[str, str]) -> Tuple[subprocess.Popen, str]:
+    """Launch `streamlit run eval.py` and wait until it answers its health check"""
+    port = free_port()
+    log = open(os.path.join(workdir, "streamlit.log"), 'w')
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", APP_SCRIPT,
+         "--server.headless=true", f"--server.port={port}", "--server.address=127.0.0.1",
+         "--server.fileWatcherType=none", "--browser.gatherUsageStats=false",
+         "--global.minCachedMessageSize=1e12"],  # no cached-message references: every delta is sent in full
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited with {proc.returncode}, see {log.name}")
+        try:
+            with urllib.request.urlopen(url + "/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return proc, url
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"streamlit did not start within 60s, see {log.name}")
+
+
+async def load_test(args, url: str, server_pid: Optional[int]) -> Dict:
+    run_id = uuid.uuid4().hex[:6]
+    # One throwaway page load first, so the app's imports and warm-up don't count as per-session memory
+    warm = BrowserSession(url, args.rerun_timeout)
+    await warm.connect()
+    await warm.rerun("load")
+    await warm.close()
+    await asyncio.sleep(1)
+    memory = {"baseline_mb": rss_mb(server_pid) if server_pid else None, "samples": []}
+
+    async def sample_memory():
+        while True:
+            memory["samples"].append(rss_mb(server_pid))
+            await asyncio.sleep(0.5)
+    sampler = asyncio.ensure_future(sample_memory()) if server_pid else None
+
+    async def candidate(idx: int):
+        if args.ramp_up and args.candidates > 1:
+            await asyncio.sleep(args.ramp_up * idx / (args.candidates - 1))
+        result, session = await run_candidate(idx, run_id, url, args, args.skills)
+        print(f"  candidate {idx}: {result['error'] or 'completed in %.1fs' % result['interview']}")
+        return result, session
+
+    started = time.perf_counter()
+    outcomes = await asyncio.gather(*(candidate(i) for i in range(args.candidates)))
+    wall_time = time.perf_counter() - started
+    if server_pid:
+        sampler.cancel()
+        # All sessions are still connected, so their session state is still held by the server
+        memory["connected_mb"] = rss_mb(server_pid)
+        samples = [s for s in memory.pop("samples") if s is not None]
+        memory["peak_mb"] = max(samples) if samples else None
+        if memory["baseline_mb"] and memory["connected_mb"]:
+            memory["per_session_mb"] = (memory["connected_mb"] - memory["baseline_mb"]) / args.candidates
+    await asyncio.gather(*(session.close() for _, session in outcomes))
+    return {"run_id": run_id, "wall_time": wall_time, "memory": memory, "candidates": [r for r, _ in outcomes]}
+
+
+def summarize(run: Dict, probe: Optional[StoreProbe], db_path: Optional[str]) -> Dict:
+    results = run["candidates"]
+    completed = [r for r in results if r["completed"]]
+    reruns = {}
+    for step in STEPS:
+        values = [v for r in results for v in r["reruns"].get(step, [])]
+        if values:
+            reruns[step] = percentiles(values)
+    reruns["all"] = percentiles([v for r in results for values in r["reruns"].values() for v in values])
+    summary = {
+        "candidates": len(results),
+        "completed": len(completed),
+        "failed": len(results) - len(completed),
+        "wall_time": run["wall_time"],
+        "throughput_interviews_per_min": len(completed) / run["wall_time"] * 60 if run["wall_time"] else 0,
+        "interview": percentiles([r["interview"] for r in completed]),
+        "rerun": reruns,
+        "memory": run["memory"]
+    }
+    if probe is not None:
+        summary["store"] = {
+            "write_lock_wait": percentiles(probe.waits),
+            "waits_over_10ms": sum(1 for w in probe.waits if w > 0.01)
+        }
+    if db_path and os.path.exists(db_path):
+        with sqlite3.connect(db_path) as conn:
+            saved = conn.execute("SELECT COUNT(*) FROM evaluations WHERE username LIKE ?",
+                                 (f"loadtest-{run['run_id']}-%",)).fetchone()[0]
+        summary.setdefault("store", {}).update({"evaluations_saved": saved, "evaluations_expected": len(completed)})
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive concurrent interviews through one Streamlit process")
+    parser.add_argument("--candidates", type=int, default=10, help="concurrent virtual candidates (default: %(default)s)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds over which candidates connect (default: all at once)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean seconds a candidate spends per answer (default: %(default)s)")
+    parser.add_argument("--role", default="Python Developer")
+    parser.add_argument("--skills", default="Python, SQL")
+    parser.add_argument("--rerun-timeout", type=float, default=180, help="seconds to wait for one rerun (default: %(default)s)")
+    parser.add_argument("--url", help="drive an already running app instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, for memory figures")
+    parser.add_argument("--db", help="evaluation database of the --url server, for the contention probe")
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="seconds between write-lock probes (default: %(default)s)")
+    parser.add_argument("--no-stub", action="store_true", help="let the started app use DEEPSEEK_BASE_URL instead of the stub")
+    parser.add_argument("--output", help="results file (default: bench_results/loadtest-<timestamp>.json)")
+    stub_llm.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = stub = None
+    db_path = args.db
+    if args.url:
+        url, server_pid = args.url, args.server_pid
+    else:
+        workdir = tempfile.mkdtemp(prefix="interview-loadtest-")
+        db_path = os.path.join(workdir, "evaluations.db")
+        env = dict(os.environ, EVAL_DB=db_path,
+                   QUESTION_BANK_DB=os.path.join(workdir, "question_bank.json"),
+                   DEDUPE_INDEX_DB=os.path.join(workdir, "question_index.jsonl"),
+                   EVAL_CACHE_DIR=os.path.join(workdir, "eval_cache"))
+        if not args.no_stub:
+            stub = stub_llm.start_in_background(stub_llm.config_from_args(args))
+            env["DEEPSEEK_BASE_URL"] = f"http://127.0.0.1:{stub.server_port}/v1"
+            env.setdefault("DEEPSEEK_API_KEY", "stub")
+        server, url = start_server(workdir, env)
+        server_pid = server.pid
+        print(f"Started the app at {url} (logs in {workdir})")
+
+    probe = None
+    if db_path:
+        if not os.path.exists(db_path):
+            # The app creates its database on first use; make sure the probe has one to open
+            sqlite3.connect(db_path).close()
+        probe = StoreProbe(db_path, args.probe_interval)
+        probe.start()
+    print(f"Running {args.candidates} candidate(s) against {url}")
+    try:
+        run = asyncio.run(load_test(args, url, server_pid))
+    finally:
+        if probe is not None:
+            probe.stopped.set()
+            probe.join()
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        if stub is not None:
+            stub.shutdown()
+
+    summary = summarize(run, probe, db_path)
+    if stub is not None:
+        summary["llm_requests"] = stub.RequestHandlerClass.config.requests
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "summary": summary,
+        "candidates": run["candidates"]
+    }
+    output = args.output or os.path.join(BENCH_RESULTS_DIR, f"loadtest-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'rerun step':12s} {'count':>6s} {'p50':>8s} {'p95':>8s} {'max':>8s}")
+    for step, stats in summary["rerun"].items():
+        if stats.get("count"):
+            print(f"{step:12s} {stats['count']:6d} {stats['p50']:8.3f} {stats['p95']:8.3f} {stats['max']:8.3f}")
+    memory = summary["memory"]
+    if memory.get("per_session_mb") is not None:
+        print(f"server memory: {memory['baseline_mb']:.0f} MB idle, {memory['peak_mb']:.0f} MB peak, "
+              f"~{memory['per_session_mb']:.1f} MB per session")
+    store = summary.get("store", {})
+    if store.get("write_lock_wait", {}).get("count"):
+        wait = store["write_lock_wait"]
+        print(f"store write lock: p50 {wait['p50'] * 1000:.1f} ms, p95 {wait['p95'] * 1000:.1f} ms, "
+              f"max {wait['max'] * 1000:.1f} ms, {store['waits_over_10ms']} waits over 10 ms")
+    if "evaluations_saved" in store:
+        print(f"evaluations saved: {store['evaluations_saved']} of {store['evaluations_expected']} completed interviews")
+    print(f"{summary['completed']}/{summary['candidates']} interviews in {summary['wall_time']:.1f}s "
+          f"({summary['throughput_interviews_per_min']:.1f}/min); results in {output}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# prefetch.py
+"""Background prefetch of interview questions.
+
+Streamlit re-executes eval.py on every rerun, so anything that has to outlive a
+single run (the worker pool and the in-flight jobs) lives here, in a module
+that is imported once per server process.
+
+A result is removed when it is collected or its session is discarded. A
+session that simply goes away (browser closed without logging out) never
+does either, so results nobody collected within PREFETCH_TTL seconds of
+finishing are dropped whenever a new job is scheduled.
+
+Jobs run at background priority until promote()d by a candidate waiting for them.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Dict, Optional, Tuple
+
+import llm_scheduler
+
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "4"))
+PREFETCH_TTL = float(os.environ.get("PREFETCH_TTL", "3600"))  # seconds a finished, uncollected result is kept
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+_lock = threading.RLock()  # a job that is already done runs its done callback inside schedule()
+# (session_id, question_num) -> Future
+_jobs: Dict[Tuple[str, int], Future] = {}
+# (session_id, question_num) -> streaming.TokenStream fed by the job, if it streams
+_previews: Dict[Tuple[str, int], object] = {}
+# (session_id, question_num) -> time.monotonic() when the job finished
+_finished: Dict[Tuple[str, int], float] = {}
+# (session_id, question_num) -> llm_scheduler.Promotable the job's LLM calls queue under
+_priorities: Dict[Tuple[str, int], llm_scheduler.Promotable] = {}
+
+
+def _sweep():
+    """Drop results nobody collected within PREFETCH_TTL (caller holds the lock)"""
+    cutoff = time.monotonic() - PREFETCH_TTL
+    for key in [k for k, finished in _finished.items() if finished < cutoff]:
+        _jobs.pop(key, None)
+        _previews.pop(key, None)
+        _priorities.pop(key, None)
+        del _finished[key]
+
+
+def _done(key: Tuple[str, int], job: Future):
+    with _lock:
+        if _jobs.get(key) is job:
+            _finished[key] = time.monotonic()
+
+
+def schedule(session_id: str, question_num: int, fn: Callable, *args, preview=None, **kwargs) -> Future:
+    """Start generating a question in the background unless a job for it already exists.
+
+    `preview` is an optional streaming.TokenStream that `fn` writes partial output to;
+    it is closed when the job finishes.
+    """
+    key = (session_id, question_num)
+    with _lock:
+        _sweep()
+        job = _jobs.get(key)
+        if job is None:
+            # Prefetched questions queue behind live calls for the LLM
+            level = _priorities[key] = llm_scheduler.Promotable("background")
+            job = _executor.submit(llm_scheduler.run_as, level, fn, *args, **kwargs)
+            _jobs[key] = job
+            if preview is not None:
+                _previews[key] = preview
+                job.add_done_callback(lambda _: preview.close())
+            job.add_done_callback(lambda done: _done(key, done))
+        return job
+
+
+def promote(session_id: str, question_num: int, name: str = "next_question"):
+    """A candidate is waiting for this question now. A job still waiting for a worker is dropped,
+    so collect() returns None and the caller generates the question itself; a running job's
+    remaining LLM calls queue under `name`."""
+    key = (session_id, question_num)
+    with _lock:
+        job = _jobs.get(key)
+        if job is None:
+            return
+        if job.cancel():
+            _jobs.pop(key)
+            _previews.pop(key, None)
+            _priorities.pop(key, None)
+            _finished.pop(key, None)
+        else:
+            _priorities[key].promote(name)
+
+
+def preview(session_id: str, question_num: int):
+    """The partial-output stream of a scheduled job, or None"""
+    with _lock:
+        return _previews.get((session_id, question_num))
+
+
+def collect(session_id: str, question_num: int, timeout: Optional[float] = None):
+    """Wait for and remove a prefetched result. Returns None if nothing was scheduled or the job failed."""
+    with _lock:
+        job = _jobs.pop((session_id, question_num), None)
+        _previews.pop((session_id, question_num), None)
+        _priorities.pop((session_id, question_num), None)
+        _finished.pop((session_id, question_num), None)
+    if job is None:
+        return None
+    try:
+        return job.result(timeout=timeout)
+    except Exception:
+        return None
+
+
+def discard_session(session_id: str):
+    """Drop every pending job belonging to a session (new evaluation, logout)"""
+    with _lock:
+        keys = [k for k in _jobs if k[0] == session_id]
+        for key in keys:
+            _jobs.pop(key).cancel()
+            _previews.pop(key, None)
+            _priorities.pop(key, None)
+            _finished.pop(key, None)
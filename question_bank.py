@@ -0,0 +1,218 @@
+# question_bank.py
+"""Persistent bank of pre-generated interview questions.
+
+Questions are bucketed by (role, skill, question type, complexity, language);
+interview.py banks them in English only and serves other languages through
+translations.py.
+gen_question draws from the bank first and only calls the LLM on a miss; a
+background filler keeps every bucket that candidates have asked for topped up.
+Drawn questions are removed, on disk too, so consecutive candidates (and a
+restarted app) don't see the same one. So are questions a draw finds can never
+be served (another interview already asked a near-duplicate), so they don't
+sit in a bucket the filler considers full.
+
+The bank lives in QUESTION_BANK_DB, loaded once per process. With JOB_QUEUE the
+questions are drawn and banked by several llm_worker.py processes, so it lives
+in the shared evaluations database instead and every draw is a single DELETE:
+a question can only be drawn once, whichever process draws it.
+"""
+import json
+import os
+import random
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+import dedupe_index
+import job_queue
+import storage
+
+QUESTION_BANK_DB = os.environ.get("QUESTION_BANK_DB", "question_bank.json")
+QUESTION_BANK_MIN = int(os.environ.get("QUESTION_BANK_MIN", "3"))      # refill a bucket when it drops below this
+QUESTION_BANK_TARGET = int(os.environ.get("QUESTION_BANK_TARGET", "10"))  # ... up to this many questions
+QUESTION_BANK_FILL = os.environ.get("QUESTION_BANK_FILL", "1") != "0"
+DEFAULT_COMPLEXITY = 1  # entry level - what eval.py asks at; the adaptive build goes up to MAX_COMPLEXITY
+MAX_COMPLEXITY = 5
+
+BankKey = Tuple[str, str, str, int, str]
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wake = threading.Event()
+_buckets: Optional[Dict[BankKey, List[str]]] = None
+_wanted = set()
+_dirty = False
+_filler = None
+
+
+def normalize_skill(skill: str) -> str:
+    """Normalize a skill so 'Spring  Boot' and 'spring boot' share a bucket"""
+    return " ".join(skill.lower().split())
+
+
+def make_key(role: str, skill: str, is_coding: bool, complexity: int = DEFAULT_COMPLEXITY, language: str = "English") -> BankKey:
+    return (role, normalize_skill(skill), "coding" if is_coding else "conceptual", int(complexity), language)
+
+
+def _key_to_str(key: BankKey) -> str:
+    return "|".join(str(part) for part in key)
+
+
+def _key_from_str(text: str) -> BankKey:
+    role, skill, kind, complexity, language = text.split("|")
+    return (role, skill, kind, int(complexity), language)
+
+
+def _load():
+    """Load the bank from disk once per process (caller holds the lock)"""
+    global _buckets
+    if _buckets is None:
+        _buckets = {}
+        if os.path.exists(QUESTION_BANK_DB):
+            with open(QUESTION_BANK_DB, 'r') as f:
+                for key, questions in json.load(f).items():
+                    _buckets[_key_from_str(key)] = questions
+    return _buckets
+
+
+def _shared() -> bool:
+    return job_queue.JOB_QUEUE
+
+
+def _questions(key: BankKey) -> List[str]:
+    if _shared():
+        return storage.bank_questions(_key_to_str(key))
+    with _lock:
+        return list(_load().get(key, []))
+
+
+def _remove(key: BankKey, question: str) -> bool:
+    """Remove a question being drawn; False if another session (or process) drew it meanwhile"""
+    global _dirty
+    if _shared():
+        return storage.bank_remove(_key_to_str(key), question)
+    with _lock:
+        bucket = _load().get(key, [])
+        if question not in bucket:
+            return False
+        bucket.remove(question)
+        _dirty = True
+    try:
+        flush()
+    except OSError:
+        pass  # written with the next change
+    return True
+
+
+def flush():
+    """Write the bank to disk if it changed"""
+    global _dirty
+    if _shared():
+        return  # every change is already in the database
+    with _flush_lock:  # one writer at a time, so an older snapshot never replaces a newer one
+        with _lock:
+            if not _dirty:
+                return
+            data = {_key_to_str(k): list(v) for k, v in _load().items() if v}
+            _dirty = False
+        tmp_path = QUESTION_BANK_DB + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, QUESTION_BANK_DB)
+        except OSError:
+            with _lock:
+                _dirty = True
+            raise
+
+
+def add(key: BankKey, questions: List[str]):
+    """Add generated questions to a bucket"""
+    global _dirty
+    if _shared():
+        storage.bank_add(_key_to_str(key), [q for q in questions if q])
+        return
+    with _lock:
+        bucket = _load().setdefault(key, [])
+        for q in questions:
+            if q and q not in bucket:
+                bucket.append(q)
+                _dirty = True
+
+
+def size(key: BankKey) -> int:
+    if _shared():
+        return storage.bank_size(_key_to_str(key))
+    with _lock:
+        return len(_load().get(key, []))
+
+
+def take(role: str, skills: List[str], is_coding: bool, language: str, complexity: int = DEFAULT_COMPLEXITY,
+         reject: Callable[[str], bool] = None, discard: Callable[[str], bool] = None) -> Optional[str]:
+    """Draw a question for any of the candidate's skills, skipping ones `reject` flags for this
+    candidate and removing ones `discard` flags for everyone.
+
+    Returns None on a miss. Every bucket asked about is registered with the filler. The checks run
+    outside the lock, so a slow duplicate check doesn't hold up other draws; the drawn question is
+    removed from disk right away.
+    """
+    keys = [make_key(role, s, is_coding, complexity, language) for s in skills]
+    random.shuffle(keys)
+    with _lock:
+        _wanted.update(keys)
+    _wake.set()
+    discarded = False
+    try:
+        for key in keys:
+            for q in _questions(key):
+                if discard is not None and discard(q):
+                    discarded = _remove(key, q) or discarded
+                    continue
+                if reject is not None and reject(q):
+                    continue
+                if _remove(key, q):
+                    return q
+        return None
+    finally:
+        if discarded:
+            _wake.set()  # the bucket may now be below QUESTION_BANK_MIN
+
+
+def start_filler(generate: Callable[[str, str, bool, int, str, List[str]], List[str]]):
+    """Start the background filler once per process.
+
+    `generate(role, skill, is_coding, complexity, language, existing)` must return
+    a list of new question texts; it runs on the filler thread, never on a page rerun.
+    """
+    global _filler
+    with _lock:
+        if _filler is not None or not QUESTION_BANK_FILL:
+            return
+        _filler = threading.Thread(target=_fill_loop, args=(generate,), name="question-bank-filler", daemon=True)
+    _filler.start()
+
+
+def _fill_loop(generate):
+    while True:
+        _wake.wait(timeout=30)
+        _wake.clear()
+        with _lock:
+            wanted = list(_wanted)
+        for key in [k for k in wanted if size(k) < QUESTION_BANK_MIN]:
+            role, skill, kind, complexity, language = key
+            while size(key) < QUESTION_BANK_TARGET:
+                existing = _questions(key)
+                try:
+                    fresh = [q for q in generate(role, skill, kind == "coding", complexity, language, existing) if q not in existing]
+                except Exception:
+                    break  # provider trouble - try again on the next wake-up
+                if not fresh:
+                    break
+                add(key, fresh)
+        try:
+            flush()
+        except OSError:
+            pass
+        try:
+            dedupe_index.maybe_compact()  # the filler is the one background thread every serving process has
+        except OSError:
+            pass
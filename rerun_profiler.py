@@ -0,0 +1,248 @@
+# rerun_profiler.py
+"""Opt-in sampling profiler for Streamlit script runs.
+
+With PROFILE_RERUNS=1, eval.py calls profile_this_run() at the top of every
+rerun. A single background thread samples the script thread's stack every
+PROFILE_INTERVAL seconds until the run's module frame leaves the stack
+(normal end, st.stop, st.rerun or an exception), so the script itself runs
+unmodified. Each run is then written to PROFILE_DIR as a speedscope file
+(open it at https://www.speedscope.app), tagged with the page (`choice`) and
+the Streamlit session, and its top PROFILE_TOP functions by inclusive and
+self time are appended to PROFILE_DIR/summary.jsonl. Only the newest
+PROFILE_KEEP speedscope files are kept.
+
+    PROFILE_RERUNS=1 streamlit run eval.py
+    python rerun_profiler.py report [--dir profiles] [--page Home] [--top 15]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+PROFILE_RERUNS = os.environ.get("PROFILE_RERUNS", "0") != "0"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "200"))                # speedscope files kept
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", "15"))                   # functions listed per run in summary.jsonl
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.005"))  # seconds between stack samples
+
+SUMMARY_FILE = "summary.jsonl"
+
+_lock = threading.Condition()
+_active: Dict[int, "_Run"] = {}  # script thread id -> run being sampled
+_finished: List[tuple] = []  # (run, end time) of runs replaced by a rerun on the same thread
+_sampler = None
+
+
+class _Run:
+    def __init__(self, frame, session_id: str):
+        self.frame = frame  # the script's module frame; the run is over once it leaves the stack
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.started_at = datetime.now()
+        self.last_sample = self.started
+        self.frames: Dict[tuple, int] = {}  # (name, file, line) -> index in the speedscope frame table
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+
+    def sample(self, leaf, now: float) -> bool:
+        """Record the stack from the module frame down to `leaf`; False once the run is over"""
+        stack = []
+        frame = leaf
+        while frame is not None and frame is not self.frame:
+            stack.append(frame)
+            frame = frame.f_back
+        if frame is None:
+            return False
+        stack.append(frame)
+        indexes = []
+        for f in reversed(stack):
+            code = f.f_code
+            key = (code.co_name, code.co_filename, code.co_firstlineno)
+            if key not in self.frames:
+                self.frames[key] = len(self.frames)
+            indexes.append(self.frames[key])
+        self.samples.append(indexes)
+        self.weights.append(now - self.last_sample)
+        self.last_sample = now
+        return True
+
+
+def _short_path(path: str) -> str:
+    if "site-packages" + os.sep in path:
+        return path.split("site-packages" + os.sep, 1)[1]
+    try:
+        rel = os.path.relpath(path)
+    except ValueError:
+        return path
+    return path if rel.startswith("..") else rel
+
+
+def _function_name(key: tuple) -> str:
+    name, path, line = key
+    return f"{name} ({_short_path(path)}:{line})"
+
+
+def _top_functions(run: _Run, limit: int) -> Dict[str, List[Dict]]:
+    """Hottest functions of a run by inclusive time and by self time"""
+    keys = {index: key for key, index in run.frames.items()}
+    total, own = Counter(), Counter()
+    for stack, weight in zip(run.samples, run.weights):
+        for index in set(stack):
+            total[index] += weight
+        own[stack[-1]] += weight
+
+    def entries(ranked):
+        return [{"function": _function_name(keys[i]), "total_s": round(total[i], 4), "self_s": round(own[i], 4)}
+                for i in ranked]
+    return {
+        "top_total": entries(sorted(total, key=lambda i: (-total[i], -own[i]))[:limit]),
+        "top_self": entries([i for i, _ in own.most_common(limit)])
+    }
+
+
+def _slug(text: str) -> str:
+    return "".join(c if c.isalnum() else "-" for c in text).strip("-").lower() or "none"
+
+
+def _write(run: _Run, ended: float):
+    """Dump one finished run (sampler thread)"""
+    page = str(run.frame.f_globals.get("choice") or "unknown")
+    run.frame = None  # don't keep the script's globals alive
+    seconds = ended - run.started
+    name = f"{run.started_at:%Y%m%d-%H%M%S-%f}-{_slug(page)}-{_slug(run.session_id[:8])}"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    frames = sorted(run.frames.items(), key=lambda item: item[1])
+    speedscope = {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": f"{page} rerun ({seconds * 1000:.0f} ms)",
+        "exporter": "rerun_profiler",
+        "activeProfileIndex": 0,
+        "shared": {"frames": [{"name": key[0], "file": key[1], "line": key[2]} for key, _ in frames]},
+        "profiles": [{
+            "type": "sampled", "name": page, "unit": "seconds",
+            "startValue": 0, "endValue": sum(run.weights),
+            "samples": run.samples, "weights": run.weights
+        }]
+    }
+    with open(os.path.join(PROFILE_DIR, name + ".speedscope.json"), 'w') as f:
+        json.dump(speedscope, f)
+    summary = {
+        "time": run.started_at.isoformat(timespec="milliseconds"),
+        "page": page,
+        "session": run.session_id,
+        "seconds": round(seconds, 4),
+        "samples": len(run.samples),
+        "file": name + ".speedscope.json",
+        **_top_functions(run, PROFILE_TOP)
+    }
+    with open(os.path.join(PROFILE_DIR, SUMMARY_FILE), 'a') as f:
+        f.write(json.dumps(summary) + "\n")
+    old = sorted(glob.glob(os.path.join(PROFILE_DIR, "*.speedscope.json")))
+    for path in old[:max(0, len(old) - PROFILE_KEEP)]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _sample_forever():
+    while True:
+        with _lock:
+            while not _active and not _finished:
+                _lock.wait()
+        time.sleep(PROFILE_INTERVAL)
+        now = time.perf_counter()
+        stacks = sys._current_frames()
+        with _lock:
+            finished = _finished[:]
+            del _finished[:]
+            for thread_id, run in list(_active.items()):
+                leaf = stacks.get(thread_id)
+                if leaf is None or not run.sample(leaf, now):
+                    finished.append((_active.pop(thread_id), now))
+        del stacks
+        for run, ended in finished:
+            try:
+                _write(run, ended)
+            except Exception:
+                pass  # profiling must never take the app down
+
+
+def profile_this_run():
+    """Sample the calling script run until it ends (no-op unless PROFILE_RERUNS is set)"""
+    global _sampler
+    if not PROFILE_RERUNS:
+        return
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        session_id = ctx.session_id if ctx else ""
+    except ImportError:
+        session_id = ""
+    run = _Run(sys._getframe(1), session_id)
+    with _lock:
+        previous = _active.pop(threading.get_ident(), None)
+        if previous is not None:
+            # st.rerun() started this run on the same thread before the sampler saw the last one end
+            _finished.append((previous, run.started))
+        _active[threading.get_ident()] = run
+        if _sampler is None:
+            _sampler = threading.Thread(target=_sample_forever, name="rerun-profiler", daemon=True)
+            _sampler.start()
+        _lock.notify_all()
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * p)))] if ordered else None
+
+
+def report(profile_dir: str = PROFILE_DIR, page: str = None, top: int = PROFILE_TOP):
+    """Print run times per page and the functions with the most inclusive time across runs"""
+    runs = []
+    with open(os.path.join(profile_dir, SUMMARY_FILE), 'r') as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            if page is None or run["page"] == page:
+                runs.append(run)
+    if not runs:
+        print("No profiled runs")
+        return
+    by_page = defaultdict(list)
+    for run in runs:
+        by_page[run["page"]].append(run["seconds"])
+    print(f"{'page':24s} {'runs':>6s} {'p50 ms':>8s} {'p95 ms':>8s} {'max ms':>8s}")
+    for name, seconds in sorted(by_page.items()):
+        print(f"{name:24s} {len(seconds):6d} {_percentile(seconds, 0.5) * 1000:8.1f} "
+              f"{_percentile(seconds, 0.95) * 1000:8.1f} {max(seconds) * 1000:8.1f}")
+    all_time = sum(run["seconds"] for run in runs)
+    for field, title in (("top_total", "inclusive"), ("top_self", "self")):
+        total, own = Counter(), Counter()
+        for run in runs:
+            for fn in run.get(field, []):
+                total[fn["function"]] += fn["total_s"]
+                own[fn["function"]] += fn["self_s"]
+        ranked = total if field == "top_total" else own
+        print(f"\nHottest functions by {title} time over {len(runs)} run(s) ({all_time:.2f}s profiled):")
+        print(f"{'total s':>9s} {'self s':>9s}  function")
+        for name, _ in ranked.most_common(top):
+            print(f"{total[name]:9.3f} {own[name]:9.3f}  {name}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize profiled Streamlit reruns")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report_parser = sub.add_parser("report", help="run times per page and hottest functions")
+    report_parser.add_argument("--dir", default=PROFILE_DIR)
+    report_parser.add_argument("--page", help="only runs of this page")
+    report_parser.add_argument("--top", type=int, default=PROFILE_TOP)
+    args = parser.parse_args()
+    report(args.dir, args.page, args.top)
@@ -0,0 +1,234 @@
+# rescore.py
+"""Re-score past interviews with the current evaluator prompt.
+
+    python rescore.py [--source evaluations.db|evaluation_history.json] [--report rescore_report.jsonl]
+                      [--concurrency 8] [--batch-size 5] [--user NAME] [--role ROLE] [--limit N]
+                      [--no-cache] [--fresh]
+
+Answers are streamed out of the evaluation store (or a legacy JSON history
+file) and re-evaluated on a bounded thread pool; only a window of
+2 x concurrency jobs is in flight at any time, so memory stays flat no
+matter how large the history is. A job is one interview's answers, scored
+with a single batched evaluator call (--batch-size 1 scores them one by one).
+Coding answers that can be run against hidden tests are always scored one by
+one, exactly like live answers. Every re-scored answer is appended to the
+report as one JSON line (old score, new score, delta), which doubles as the
+checkpoint: re-running the same command skips answers already in the report.
+A summary of the whole report is printed and written next to it as
+<report>.summary.json.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Tuple
+
+import llm_scheduler
+import storage
+from interview import EVAL_BATCH_SIZE, evaluate_answer, evaluate_answers_batch
+
+RESCORE_REPORT = "rescore_report.jsonl"
+PROGRESS_EVERY = 100
+
+
+def iter_answers(source: str, username: str = None, role: str = None) -> Iterator[List[Tuple[str, Dict]]]:
+    """Stream one list of (answer key, item) pairs per evaluation from the SQLite store or a legacy JSON history file"""
+    if source.endswith(".json"):
+        records = ((u, r) for u, r in storage.iter_legacy_history(source)
+                   if (not username or u == username) and (not role or r.get("role") == role))
+    else:
+        records = storage.iter_evaluations(username, role, path=source)
+    for user, record in records:
+        # Interviews focus on their first skill; older answers don't record it, so use the interview's
+        skill = next((qa["skill"] for qa in record.get("qa_history", []) if qa.get("skill")), None)
+        yield [(f"{record['id']}:{position}", {
+            "username": user,
+            "eval_id": record["id"],
+            "date": record.get("date"),
+            "role": record.get("role") or "",
+            "skill": skill,
+            "position": position,
+            "qa": qa
+        }) for position, qa in enumerate(record.get("qa_history", []), 1)]
+
+
+def load_checkpoint(report_path: str) -> set:
+    """Keys of answers already re-scored in an earlier run"""
+    done = set()
+    if os.path.exists(report_path):
+        with open(report_path, 'r') as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["key"])
+                except (ValueError, KeyError):
+                    continue  # torn last line from an interrupted run
+    return done
+
+
+def rescore_answers(answers: List[Tuple[str, Dict]], use_cache: bool, batch_size: int) -> List[Dict]:
+    """Re-evaluate one interview's answers (runs on a worker thread); returns one report row per answer"""
+    role = answers[0][1]["role"]
+    requests = [{
+        "skill_focus": item["qa"].get("skill") or item["skill"] or role,
+        "question": item["qa"]["q"],
+        "answer": item["qa"]["a"],
+        "language": item["qa"].get("language") or "English",
+        "is_coding": storage.question_type(item["qa"], item["position"]) == "coding"
+    } for _, item in answers]
+    results = [None] * len(answers)
+    if batch_size > 1:
+        by_language = defaultdict(list)
+        for idx, request in enumerate(requests):
+            by_language[request["language"]].append(idx)
+        for language, indexes in by_language.items():
+            scored = evaluate_answers_batch(role, [requests[i] for i in indexes], language, use_cache=use_cache, batch_size=batch_size)
+            for idx, result in zip(indexes, scored):
+                results[idx] = result
+    else:
+        for idx, request in enumerate(requests):
+            results[idx] = evaluate_answer(role, request["skill_focus"], request["question"], request["answer"],
+                                           request["language"], request["is_coding"], use_cache=use_cache)
+    return [_report_row(key, item, request["is_coding"], result)
+            for (key, item), request, result in zip(answers, requests, results)]
+
+
+def _report_row(key: str, item: Dict, is_coding: bool, result: Dict) -> Dict:
+    old_score = item["qa"].get("score") or 0
+    return {
+        "key": key,
+        "username": item["username"],
+        "eval_id": item["eval_id"],
+        "date": item["date"],
+        "role": item["role"],
+        "position": item["position"],
+        "question_type": "coding" if is_coding else "conceptual",
+        "old_score": old_score,
+        "new_score": result["score"],
+        "delta": result["score"] - old_score,
+        "parse_status": result.get("parse_status", "ok"),
+        "reason": result.get("reason", "")
+    }
+
+
+def rescore(source: str, report_path: str, concurrency: int = 8, username: str = None, role: str = None,
+            limit: int = None, use_cache: bool = True, batch_size: int = EVAL_BATCH_SIZE) -> Dict:
+    """Re-score every answer not yet in the report; returns run counters"""
+    done = load_checkpoint(report_path)
+    counts = {"skipped": len(done), "rescored": 0, "failed": 0}
+    started = time.time()
+    pending = {}
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="rescore") as executor, \
+            open(report_path, 'a') as report:
+
+        def drain():
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for job in finished:
+                keys = pending.pop(job)
+                try:
+                    rows = job.result()
+                except Exception as e:
+                    counts["failed"] += len(keys)  # not checkpointed - retried on the next run
+                    print(f"  {keys[0].split(':')[0]}: {e}", file=sys.stderr)
+                    continue
+                for row in rows:
+                    report.write(json.dumps(row, ensure_ascii=False) + "\n")
+                report.flush()
+                before = counts["rescored"]
+                counts["rescored"] += len(rows)
+                if counts["rescored"] // PROGRESS_EVERY > before // PROGRESS_EVERY:
+                    rate = counts["rescored"] / (time.time() - started)
+                    print(f"  {counts['rescored']} answers re-scored ({rate:.1f}/s)")
+
+        submitted = 0
+        for answers in iter_answers(source, username, role):
+            answers = [(key, item) for key, item in answers if key not in done]
+            if limit is not None:
+                answers = answers[:max(0, limit - submitted)]
+            if not answers:
+                if limit is not None and submitted >= limit:
+                    break
+                continue
+            while len(pending) >= concurrency * 2:
+                drain()
+            pending[executor.submit(llm_scheduler.run_as, "rescore", rescore_answers, answers, use_cache, batch_size)] = [key for key, _ in answers]
+            submitted += len(answers)
+        while pending:
+            drain()
+    return counts
+
+
+def summarize(report_path: str) -> Dict:
+    """Aggregate the whole report (all runs) in one streaming pass"""
+    total = changed = increased = decreased = 0
+    sum_delta = sum_abs_delta = 0
+    deltas = Counter()
+    statuses = Counter()
+    by_role = defaultdict(lambda: {"answers": 0, "sum_delta": 0})
+    biggest = []
+    with open(report_path, 'r') as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            delta = row["delta"]
+            total += 1
+            changed += delta != 0
+            increased += delta > 0
+            decreased += delta < 0
+            sum_delta += delta
+            sum_abs_delta += abs(delta)
+            deltas[delta] += 1
+            statuses[row.get("parse_status", "ok")] += 1
+            by_role[row["role"]]["answers"] += 1
+            by_role[row["role"]]["sum_delta"] += delta
+            biggest = sorted(biggest + [(abs(delta), row["key"], row["old_score"], row["new_score"])], reverse=True)[:10]
+    return {
+        "answers": total,
+        "changed": changed,
+        "increased": increased,
+        "decreased": decreased,
+        "mean_delta": sum_delta / total if total else 0,
+        "mean_abs_delta": sum_abs_delta / total if total else 0,
+        "delta_histogram": {str(d): n for d, n in sorted(deltas.items())},
+        "parse_status": dict(statuses),
+        "by_role": {r: {"answers": v["answers"], "mean_delta": v["sum_delta"] / v["answers"]} for r, v in sorted(by_role.items())},
+        "largest_changes": [{"key": k, "old_score": o, "new_score": n} for _, k, o, n in biggest]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score past interview answers with the current evaluator prompt")
+    parser.add_argument("--source", default=storage.EVAL_DB, help="SQLite database or legacy evaluation_history.json (default: %(default)s)")
+    parser.add_argument("--report", default=RESCORE_REPORT, help="JSON-lines report, also the resume checkpoint (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent evaluator calls (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=EVAL_BATCH_SIZE, help="answers scored per evaluator call; 1 disables batching (default: %(default)s)")
+    parser.add_argument("--user", help="only this username")
+    parser.add_argument("--role", help="only evaluations for this role")
+    parser.add_argument("--limit", type=int, help="stop after this many answers in this run")
+    parser.add_argument("--no-cache", action="store_true", help="always call the LLM, even for answers scored before with this prompt")
+    parser.add_argument("--fresh", action="store_true", help="discard the existing report instead of resuming")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        parser.error(f"{args.source} not found")
+    if args.fresh and os.path.exists(args.report):
+        os.remove(args.report)
+
+    counts = rescore(args.source, args.report, args.concurrency, args.user, args.role, args.limit, not args.no_cache, args.batch_size)
+    print(f"Re-scored {counts['rescored']} answer(s), {counts['skipped']} already in the report, {counts['failed']} failed")
+
+    summary = summarize(args.report)
+    with open(args.report + ".summary.json", 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"{summary['answers']} answers in report: {summary['changed']} changed "
+          f"({summary['increased']} up, {summary['decreased']} down), mean delta {summary['mean_delta']:+.2f}, "
+          f"mean |delta| {summary['mean_abs_delta']:.2f}")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
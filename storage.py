@@ -0,0 +1,615 @@
+# storage.py
+"""SQLite storage for users and evaluations.
+
+Replaces the whole-file rewrites of users.json / evaluation_history.json with
+an embedded database in WAL mode: users are looked up by primary key,
+evaluations are appended one row at a time and read through an
+(username, date) index, so a request only touches the current user's rows and
+concurrent sessions no longer overwrite each other's writes.
+
+Dashboard numbers (count, mean, best and last percentage, per-question score
+distribution) are kept in small aggregate tables, per user and per role, and
+updated in the same transaction that appends an evaluation.
+
+The first time the database is opened, any existing JSON files are imported
+(see migrate_from_json); `python storage.py migrate` runs the same import
+explicitly and `python storage.py rebuild-stats` recomputes the aggregates
+from the raw evaluations.
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+import urllib.parse
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+EVAL_DB = os.environ.get("EVAL_DB", "evaluations.db")
+LEGACY_USERS_DB = "users.json"
+LEGACY_EVAL_HISTORY_DB = "evaluation_history.json"
+
+# Per-question score bands, matching the colour bands used in the UI
+SCORE_BUCKETS = [(16, "16-20"), (12, "12-15"), (8, "8-11"), (0, "0-7")]
+
+USER_FIELDS = ["name", "email", "experience", "password", "created_at"]
+EVAL_FIELDS = ["id", "date", "role", "score", "max_score", "percentage", "time_taken", "qa_history", "recommendation"]
+SUMMARY_FIELDS = ["id", "date", "role", "score", "max_score", "percentage", "time_taken"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username   TEXT PRIMARY KEY,
+    name       TEXT,
+    email      TEXT,
+    experience TEXT,
+    password   TEXT,
+    created_at TEXT
+);
+CREATE TABLE IF NOT EXISTS evaluations (
+    id             TEXT PRIMARY KEY,
+    username       TEXT NOT NULL,
+    date           TEXT,
+    role           TEXT,
+    score          INTEGER,
+    max_score      INTEGER,
+    percentage     REAL,
+    time_taken     REAL,
+    qa_history     TEXT,
+    recommendation TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_evaluations_user_date ON evaluations (username, date);
+CREATE INDEX IF NOT EXISTS idx_evaluations_user_role_date ON evaluations (username, role, date);
+CREATE TABLE IF NOT EXISTS user_stats (
+    username        TEXT NOT NULL,
+    role            TEXT NOT NULL,  -- '' = all roles
+    evaluations     INTEGER NOT NULL DEFAULT 0,
+    sum_percentage  REAL NOT NULL DEFAULT 0,
+    best_percentage REAL,
+    last_percentage REAL,
+    last_date       TEXT,
+    PRIMARY KEY (username, role)
+);
+CREATE TABLE IF NOT EXISTS score_distribution (
+    username      TEXT NOT NULL,
+    role          TEXT NOT NULL,  -- '' = all roles
+    question_type TEXT NOT NULL,  -- coding / conceptual
+    bucket        TEXT NOT NULL,  -- see SCORE_BUCKETS
+    answers       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (username, role, question_type, bucket)
+);
+CREATE TABLE IF NOT EXISTS test_suites (
+    question_key TEXT PRIMARY KEY,  -- code_runner.suite_key(question)
+    suite        TEXT NOT NULL      -- JSON
+);
+CREATE TABLE IF NOT EXISTS translations (
+    source_key TEXT NOT NULL,  -- translations.text_key(source)
+    language   TEXT NOT NULL,
+    source     TEXT NOT NULL,  -- canonical (English) text
+    text       TEXT NOT NULL,
+    text_key   TEXT NOT NULL,  -- translations.text_key(text), to map a translation back to its source
+    PRIMARY KEY (source_key, language)
+);
+CREATE INDEX IF NOT EXISTS idx_translations_text ON translations (text_key);
+CREATE TABLE IF NOT EXISTS wanted_languages (
+    language TEXT PRIMARY KEY  -- languages candidates have been interviewed in, for the bank filler
+);
+CREATE TABLE IF NOT EXISTS question_bank (
+    bucket   TEXT NOT NULL,  -- question_bank bucket key; used instead of QUESTION_BANK_DB with JOB_QUEUE
+    question TEXT NOT NULL,
+    PRIMARY KEY (bucket, question)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+def connect(path: str = None) -> sqlite3.Connection:
+    """Return this thread's connection, creating the schema (and migrating JSON data) on first use"""
+    path = path or EVAL_DB
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conns[path] = conn
+        with _init_lock:
+            if path not in _initialized:
+                conn.executescript(SCHEMA)
+                if os.path.exists(LEGACY_USERS_DB) or os.path.exists(LEGACY_EVAL_HISTORY_DB):
+                    migrate_from_json(conn=conn)
+                if not conn.execute("SELECT 1 FROM meta WHERE key = 'aggregates_built'").fetchone():
+                    # Databases created before the aggregate tables existed
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        rebuild_aggregates(conn)
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                _initialized.add(path)
+    return conn
+
+
+def connect_readonly(path: str) -> sqlite3.Connection:
+    """Return this thread's read-only connection to another database (e.g. a rescore source):
+    no schema set-up, migration or aggregate rebuild, and nothing can be written to it"""
+    conns = getattr(_local, "ro_conns", None)
+    if conns is None:
+        conns = _local.ro_conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        uri = f"file:{urllib.parse.quote(os.path.abspath(path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout=30000")
+        conns[path] = conn
+    return conn
+
+
+# -------------------------
+# Users
+# -------------------------
+def _user_from_row(row) -> Dict:
+    return {field: row[field] for field in USER_FIELDS}
+
+
+def get_user(username: str) -> Optional[Dict]:
+    row = connect().execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+    return _user_from_row(row) if row else None
+
+
+def create_user(username: str, user: Dict) -> bool:
+    """Insert a new user. Returns False if the username is already taken."""
+    cur = connect().execute(
+        "INSERT OR IGNORE INTO users (username, name, email, experience, password, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (username, *[user.get(field) for field in USER_FIELDS])
+    )
+    return cur.rowcount == 1
+
+
+def all_users() -> Dict[str, Dict]:
+    return {row["username"]: _user_from_row(row) for row in connect().execute("SELECT * FROM users")}
+
+
+def replace_users(users: Dict[str, Dict]):
+    """Upsert every given user"""
+    conn = connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for username, user in users.items():
+            conn.execute(
+                "INSERT OR REPLACE INTO users (username, name, email, experience, password, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (username, *[user.get(field) for field in USER_FIELDS])
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+# -------------------------
+# Evaluations
+# -------------------------
+def _eval_from_row(row) -> Dict:
+    record = {field: row[field] for field in EVAL_FIELDS}
+    record["qa_history"] = json.loads(row["qa_history"] or "[]")
+    return record
+
+
+def _insert_evaluation(conn, username: str, record: Dict) -> str:
+    eval_id = record.get("id") or uuid.uuid4().hex
+    conn.execute(
+        "INSERT OR REPLACE INTO evaluations (id, username, date, role, score, max_score, percentage, time_taken, qa_history, recommendation) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (eval_id, username, record.get("date"), record.get("role"), record.get("score"), record.get("max_score"),
+         record.get("percentage"), record.get("time_taken"), json.dumps(record.get("qa_history", [])),
+         record.get("recommendation"))
+    )
+    return eval_id
+
+
+def add_evaluation(username: str, record: Dict) -> str:
+    """Append one evaluation row and fold it into the user's aggregates. Returns its id."""
+    conn = connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        eval_id = _insert_evaluation(conn, username, record)
+        _update_aggregates(conn, username, record)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return eval_id
+
+
+def set_recommendation(username: str, eval_id: str, recommendation: str):
+    connect().execute(
+        "UPDATE evaluations SET recommendation = ? WHERE id = ? AND username = ?",
+        (recommendation, eval_id, username)
+    )
+
+
+def user_evaluations(username: str) -> List[Dict]:
+    """All evaluations of one user, oldest first"""
+    rows = connect().execute(
+        "SELECT * FROM evaluations WHERE username = ? ORDER BY date, rowid", (username,)
+    )
+    return [_eval_from_row(row) for row in rows]
+
+
+def _history_filter(username: str, role: str = None, date_from: str = None, date_to: str = None):
+    """WHERE clause for a user's history; dates are inclusive YYYY-MM-DD strings"""
+    clauses, params = ["username = ?"], [username]
+    if role:
+        clauses.append("role = ?")
+        params.append(role)
+    if date_from:
+        clauses.append("date >= ?")
+        params.append(date_from)
+    if date_to:
+        clauses.append("date < ?")
+        params.append((date.fromisoformat(date_to) + timedelta(days=1)).isoformat())
+    return " AND ".join(clauses), params
+
+
+def count_evaluations(username: str, role: str = None, date_from: str = None, date_to: str = None) -> int:
+    where, params = _history_filter(username, role, date_from, date_to)
+    return connect().execute(f"SELECT COUNT(*) FROM evaluations WHERE {where}", params).fetchone()[0]
+
+
+def evaluation_summaries(username: str, role: str = None, date_from: str = None, date_to: str = None,
+                         limit: int = 10, offset: int = 0) -> List[Dict]:
+    """One page of a user's evaluations, newest first, without the Q&A detail"""
+    where, params = _history_filter(username, role, date_from, date_to)
+    rows = connect().execute(
+        f"SELECT {', '.join(SUMMARY_FIELDS)} FROM evaluations WHERE {where} "
+        "ORDER BY date DESC, rowid DESC LIMIT ? OFFSET ?",
+        params + [limit, offset]
+    )
+    return [{field: row[field] for field in SUMMARY_FIELDS} for row in rows]
+
+
+def get_evaluation(username: str, eval_id: str) -> Optional[Dict]:
+    """Full record of one evaluation, including qa_history"""
+    row = connect().execute(
+        "SELECT * FROM evaluations WHERE id = ? AND username = ?", (eval_id, username)
+    ).fetchone()
+    return _eval_from_row(row) if row else None
+
+
+def user_roles(username: str) -> List[str]:
+    """Roles the user has been evaluated for"""
+    rows = connect().execute(
+        "SELECT role FROM user_stats WHERE username = ? AND role != '' ORDER BY role", (username,)
+    )
+    return [row["role"] for row in rows]
+
+
+def iter_evaluations(username: str = None, role: str = None, batch_size: int = 200, path: str = None) -> Iterator[Tuple[str, Dict]]:
+    """Stream (username, record) pairs in insertion order, one batch of rows in memory at a time.
+    `path` reads another database than EVAL_DB, read-only."""
+    clauses, params = ["rowid > ?"], []
+    if username:
+        clauses.append("username = ?")
+        params.append(username)
+    if role:
+        clauses.append("role = ?")
+        params.append(role)
+    last_rowid = 0
+    while True:
+        # Keyset pagination - no read transaction is held open between batches
+        rows = (connect() if path is None else connect_readonly(path)).execute(
+            f"SELECT rowid, * FROM evaluations WHERE {' AND '.join(clauses)} ORDER BY rowid LIMIT ?",
+            [last_rowid] + params + [batch_size]
+        ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield row["username"], _eval_from_row(row)
+        last_rowid = rows[-1]["rowid"]
+
+
+def all_evaluations() -> Dict[str, List[Dict]]:
+    history = {}
+    for row in connect().execute("SELECT * FROM evaluations ORDER BY username, date, rowid"):
+        history.setdefault(row["username"], []).append(_eval_from_row(row))
+    return history
+
+
+def replace_evaluations(history: Dict[str, List[Dict]]):
+    """Replace the stored history with the given one"""
+    conn = connect()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM evaluations")
+        for username, records in history.items():
+            for record in records:
+                _insert_evaluation(conn, username, record)
+        rebuild_aggregates(conn)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+# -------------------------
+# Aggregates
+# -------------------------
+def score_bucket(score) -> str:
+    for low, label in SCORE_BUCKETS:
+        if (score or 0) >= low:
+            return label
+    return SCORE_BUCKETS[-1][1]
+
+
+def question_type(qa: Dict, position: int) -> str:
+    """coding / conceptual - older records don't store it, so fall back to the fixed question order"""
+    is_coding = qa.get("is_coding")
+    if is_coding is None:
+        is_coding = position in [3, 5]
+    return "coding" if is_coding else "conceptual"
+
+
+def _update_aggregates(conn, username: str, record: Dict):
+    """Fold one evaluation into the per-user and per-role aggregates - O(questions), independent of history size"""
+    percentage = record.get("percentage") or 0
+    for role in ("", record.get("role") or ""):
+        conn.execute(
+            "INSERT INTO user_stats (username, role, evaluations, sum_percentage, best_percentage, last_percentage, last_date) "
+            "VALUES (?, ?, 1, ?, ?, ?, ?) "
+            "ON CONFLICT (username, role) DO UPDATE SET "
+            "evaluations = evaluations + 1, "
+            "sum_percentage = sum_percentage + excluded.sum_percentage, "
+            "best_percentage = MAX(COALESCE(best_percentage, excluded.best_percentage), excluded.best_percentage), "
+            "last_percentage = CASE WHEN COALESCE(last_date, '') <= COALESCE(excluded.last_date, '') THEN excluded.last_percentage ELSE last_percentage END, "
+            "last_date = MAX(COALESCE(last_date, ''), COALESCE(excluded.last_date, ''))",
+            (username, role, percentage, percentage, percentage, record.get("date"))
+        )
+        for position, qa in enumerate(record.get("qa_history", []), 1):
+            conn.execute(
+                "INSERT INTO score_distribution (username, role, question_type, bucket, answers) VALUES (?, ?, ?, ?, 1) "
+                "ON CONFLICT (username, role, question_type, bucket) DO UPDATE SET answers = answers + 1",
+                (username, role, question_type(qa, position), score_bucket(qa.get("score")))
+            )
+        if not record.get("role"):
+            break  # no separate per-role row for records without a role
+
+
+def rebuild_aggregates(conn=None):
+    """Recompute every aggregate from the raw evaluations (caller manages the transaction when passing conn)"""
+    own_transaction = conn is None
+    conn = conn or connect()
+    if own_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM user_stats")
+        conn.execute("DELETE FROM score_distribution")
+        for row in conn.execute("SELECT * FROM evaluations ORDER BY date, rowid").fetchall():
+            _update_aggregates(conn, row["username"], _eval_from_row(row))
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('aggregates_built', '1')")
+        if own_transaction:
+            conn.execute("COMMIT")
+    except Exception:
+        if own_transaction:
+            conn.execute("ROLLBACK")
+        raise
+
+
+def get_user_stats(username: str, role: str = "") -> Dict:
+    """Materialized dashboard numbers for a user (optionally for one role)"""
+    conn = connect()
+    row = conn.execute("SELECT * FROM user_stats WHERE username = ? AND role = ?", (username, role)).fetchone()
+    stats = {"evaluations": 0, "average_percentage": None, "best_percentage": None, "last_percentage": None,
+             "last_date": None, "distribution": {}}
+    if row is None:
+        return stats
+    stats.update({
+        "evaluations": row["evaluations"],
+        "average_percentage": row["sum_percentage"] / row["evaluations"] if row["evaluations"] else None,
+        "best_percentage": row["best_percentage"],
+        "last_percentage": row["last_percentage"],
+        "last_date": row["last_date"] or None
+    })
+    for dist in conn.execute(
+        "SELECT question_type, bucket, answers FROM score_distribution WHERE username = ? AND role = ?", (username, role)
+    ):
+        stats["distribution"].setdefault(dist["question_type"], {})[dist["bucket"]] = dist["answers"]
+    return stats
+
+
+# -------------------------
+# Hidden test suites for coding questions (see code_runner.py)
+# -------------------------
+def get_test_suite(question_key: str) -> Optional[Dict]:
+    row = connect().execute("SELECT suite FROM test_suites WHERE question_key = ?", (question_key,)).fetchone()
+    return json.loads(row["suite"]) if row else None
+
+
+def put_test_suite(question_key: str, suite: Dict):
+    connect().execute(
+        "INSERT OR REPLACE INTO test_suites (question_key, suite) VALUES (?, ?)", (question_key, json.dumps(suite))
+    )
+
+
+# -------------------------
+# Question translations (see translations.py)
+# -------------------------
+def get_translations(source_keys: List[str], language: str) -> Dict[str, str]:
+    """{source_key: translated text} for the keys that have a translation into `language`"""
+    if not source_keys:
+        return {}
+    rows = connect().execute(
+        f"SELECT source_key, text FROM translations WHERE language = ? AND source_key IN ({','.join('?' * len(source_keys))})",
+        [language] + list(source_keys)
+    )
+    return {row["source_key"]: row["text"] for row in rows}
+
+
+def put_translations(language: str, rows: List[Tuple[str, str, str, str]]):
+    """Store (source_key, source, text, text_key) rows; an existing translation is kept"""
+    connect().executemany(
+        "INSERT OR IGNORE INTO translations (source_key, language, source, text, text_key) VALUES (?, ?, ?, ?, ?)",
+        [(source_key, language, source, text, text_key) for source_key, source, text, text_key in rows]
+    )
+
+
+def translation_source(text_key: str) -> Optional[str]:
+    row = connect().execute("SELECT source FROM translations WHERE text_key = ? LIMIT 1", (text_key,)).fetchone()
+    return row["source"] if row else None
+
+
+def add_wanted_language(language: str):
+    connect().execute("INSERT OR IGNORE INTO wanted_languages (language) VALUES (?)", (language,))
+
+
+def wanted_languages() -> List[str]:
+    return [row["language"] for row in connect().execute("SELECT language FROM wanted_languages ORDER BY language")]
+
+
+# -------------------------
+# Question bank shared by several processes (see question_bank.py)
+# -------------------------
+def bank_questions(bucket: str) -> List[str]:
+    """A bucket's questions, oldest first"""
+    return [row["question"] for row in connect().execute("SELECT question FROM question_bank WHERE bucket = ? ORDER BY rowid", (bucket,))]
+
+
+def bank_size(bucket: str) -> int:
+    return connect().execute("SELECT COUNT(*) FROM question_bank WHERE bucket = ?", (bucket,)).fetchone()[0]
+
+
+def bank_add(bucket: str, questions: List[str]):
+    connect().executemany("INSERT OR IGNORE INTO question_bank (bucket, question) VALUES (?, ?)", [(bucket, q) for q in questions])
+
+
+def bank_remove(bucket: str, question: str) -> bool:
+    """Remove a drawn question. Returns False if another process drew it first."""
+    cur = connect().execute("DELETE FROM question_bank WHERE bucket = ? AND question = ?", (bucket, question))
+    return cur.rowcount == 1
+
+
+# -------------------------
+# Migration
+# -------------------------
+def legacy_evaluation_id(username: str, idx: int, record: Dict) -> str:
+    """Stable id for a legacy JSON record, which has none of its own"""
+    return record.get("id") or uuid.uuid5(uuid.NAMESPACE_URL, f"{username}|{idx}|{record.get('date')}").hex
+
+
+def iter_legacy_history(path: str = LEGACY_EVAL_HISTORY_DB, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, Dict]]:
+    """Stream (username, record) pairs out of an evaluation_history.json file without loading all of it.
+
+    Records get their legacy_evaluation_id, so the ids match the ones the migration assigns.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buf, pos = "", 0
+
+        def more() -> bool:
+            nonlocal buf, pos
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return False
+            buf, pos = buf[pos:] + chunk, 0
+            return True
+
+        def peek(skip: str = "") -> str:
+            """Next character after whitespace and `skip` characters ('' at end of file)"""
+            nonlocal pos
+            while True:
+                while pos < len(buf) and (buf[pos].isspace() or buf[pos] in skip):
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not more():
+                    return ""
+
+        def value():
+            nonlocal pos
+            while True:
+                try:
+                    obj, pos = decoder.raw_decode(buf, pos)
+                    return obj
+                except ValueError:
+                    if not more():
+                        raise
+
+        if peek() != "{":
+            return
+        pos += 1
+        while peek(",") not in ("}", ""):
+            username = value()
+            if peek(":") != "[":
+                raise ValueError(f"{path}: expected a list of evaluations for {username!r}")
+            pos += 1
+            idx = 0
+            while peek(",") != "]":
+                record = value()
+                yield username, dict(record, id=legacy_evaluation_id(username, idx, record))
+                idx += 1
+            pos += 1
+
+
+def migrate_from_json(users_path: str = LEGACY_USERS_DB, history_path: str = LEGACY_EVAL_HISTORY_DB, conn=None, force: bool = False) -> Dict:
+    """One-shot import of the legacy JSON files. Returns counts of imported rows.
+
+    Skipped if it already ran against this database, unless force=True.
+    """
+    conn = conn or connect()
+    done = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+    if done and not force:
+        return {"users": 0, "evaluations": 0}
+    users, history = {}, {}
+    if os.path.exists(users_path):
+        with open(users_path, 'r') as f:
+            users = json.load(f)
+    if os.path.exists(history_path):
+        with open(history_path, 'r') as f:
+            history = json.load(f)
+    counts = {"users": 0, "evaluations": 0}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for username, user in users.items():
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO users (username, name, email, experience, password, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (username, *[user.get(field) for field in USER_FIELDS])
+            )
+            counts["users"] += cur.rowcount
+        for username, records in history.items():
+            for idx, record in enumerate(records):
+                # Legacy records have no id - derive a stable one so re-running the import doesn't duplicate rows
+                _insert_evaluation(conn, username, dict(record, id=legacy_evaluation_id(username, idx, record)))
+                counts["evaluations"] += 1
+        rebuild_aggregates(conn)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (json.dumps(counts),))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return counts
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "migrate":
+        counts = migrate_from_json(*sys.argv[2:], force=True)
+        print(f"Imported {counts['users']} user(s) and {counts['evaluations']} evaluation(s) into {EVAL_DB}")
+    elif command == "rebuild-stats":
+        rebuild_aggregates()
+        print(f"Rebuilt dashboard aggregates in {EVAL_DB}")
+    else:
+        print("Usage: python storage.py migrate [users.json] [evaluation_history.json]")
+        print("       python storage.py rebuild-stats")
+        sys.exit(1)
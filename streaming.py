@@ -0,0 +1,144 @@
+# streaming.py
+"""Incremental rendering of LLM output.
+
+Chains are consumed with `chain.stream` and the text so far is handed to an
+`on_partial` callback after every chunk, so the candidate sees the first
+tokens instead of a spinner. Output produced on a worker thread (prefetched
+questions, the background recommendation) is written into a TokenStream that
+the script thread follows and renders into an st.empty() placeholder.
+partial_json_fields pulls fields out of JSON that is still being written
+(the first question of a batch); evaluator responses have their own
+incremental parser in eval_parser.
+"""
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+STREAM_OUTPUT = os.environ.get("STREAM_OUTPUT", "1") != "0"
+STREAM_RENDER_INTERVAL = float(os.environ.get("STREAM_RENDER_INTERVAL", "0.05"))  # seconds between placeholder updates
+
+CURSOR = " ▌"
+
+
+class TokenStream:
+    """Text produced on one thread and followed on another"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._text = ""
+        self._version = 0
+        self._closed = False
+
+    @property
+    def text(self) -> str:
+        with self._cond:
+            return self._text
+
+    @property
+    def closed(self) -> bool:
+        with self._cond:
+            return self._closed
+
+    def update(self, text: str):
+        """Replace the text so far (usable directly as an on_partial callback)"""
+        with self._cond:
+            self._text = text
+            self._version += 1
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def follow(self, timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield the text every time it changes until the producer closes the stream (or `timeout` passes)"""
+        deadline = time.time() + timeout if timeout is not None else None
+        seen = 0
+        while True:
+            with self._cond:
+                while self._version == seen and not self._closed:
+                    remaining = deadline - time.time() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        return
+                    self._cond.wait(remaining)
+                changed = self._version != seen
+                seen = self._version
+                text, closed = self._text, self._closed
+            if text and changed:
+                yield text
+            if closed:
+                return
+
+
+def stream_text(chain, inputs: Dict, on_partial: Callable[[str], None], config: Dict = None) -> str:
+    """Run a chain with `stream`, reporting the accumulated text after every chunk"""
+    text = ""
+    for chunk in chain.stream(inputs, config=config):
+        if chunk:
+            text += chunk
+            on_partial(text)
+    return text
+
+
+def placeholder_writer(placeholder, render: Callable[[str], str] = None) -> Callable[[str], None]:
+    """on_partial callback that draws the text into a placeholder, at most once per STREAM_RENDER_INTERVAL.
+
+    Must be called from the script thread.
+    """
+    last_draw = [0.0]
+
+    def write(text: str):
+        now = time.time()
+        if now - last_draw[0] < STREAM_RENDER_INTERVAL:
+            return
+        last_draw[0] = now
+        body = render(text) if render else text
+        if body:
+            placeholder.markdown(body + CURSOR)
+    return write
+
+
+def render_stream(placeholder, stream: TokenStream, render: Callable[[str], str] = None, timeout: Optional[float] = None) -> str:
+    """Follow a TokenStream into a placeholder until it is closed; returns the last text seen"""
+    write = placeholder_writer(placeholder, render)
+    text = ""
+    for text in stream.follow(timeout=timeout):
+        write(text)
+    return text
+
+
+def _partial_string(text: str, start: int) -> str:
+    """Decode a JSON string literal starting at `start` (just after the opening quote), complete or not"""
+    body = re.match(r'(?:[^"\\]|\\.)*', text[start:], re.S).group(0)
+    if body.endswith("\\") and not body.endswith("\\\\"):
+        body = body[:-1]  # dangling escape at the end of the chunk
+    try:
+        return json.loads('"' + body + '"')
+    except ValueError:
+        return body.replace('\\"', '"').replace("\\n", "\n")
+
+
+def partial_json_fields(text: str, fields: List[str]) -> Dict:
+    """Extract top-level fields from a possibly incomplete JSON object.
+
+    Numbers are only returned once a delimiter follows them (so "1" of "15" is never
+    reported); strings are returned as far as they have arrived.
+    """
+    found = {}
+    for field in fields:
+        m = re.search(r'"%s"\s*:\s*' % re.escape(field), text)
+        if not m:
+            continue
+        rest = text[m.end():]
+        if rest.startswith('"'):
+            found[field] = _partial_string(text, m.end() + 1)
+            continue
+        number = re.match(r'(-?\d+(?:\.\d+)?)\s*[,}\n]', rest)
+        if number:
+            value = number.group(1)
+            found[field] = float(value) if "." in value else int(value)
+    return found
@@ -0,0 +1,279 @@
+# stub_llm.py
+"""Local OpenAI-compatible stub of the LLM provider.
+
+Serves /v1/chat/completions (streaming and non-streaming) and /v1/models
+with canned but well-formed answers for every prompt the app sends:
+question batches, single questions, single and batched evaluations, hidden
+test suites for coding questions, question translations and the final
+recommendation. Latency, jitter, streaming speed, malformed evaluator
+output and HTTP errors are configurable, so the app and benchmark.py can be
+exercised without the real endpoint:
+
+    python stub_llm.py --port 8765 --latency 0.8 --jitter 0.3 --malformed-rate 0.1
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8765/v1 DEEPSEEK_API_KEY=stub streamlit run eval.py
+"""
+import argparse
+import json
+import random
+import sys
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+DEFAULT_PORT = 8765
+
+_TOPICS = [
+    "caching", "indexing", "concurrency", "immutability", "dependency injection", "garbage collection",
+    "transactions", "pagination", "rate limiting", "idempotency", "serialization", "memoization",
+    "connection pooling", "event sourcing", "sharding", "lazy loading", "backpressure", "retries",
+    "circuit breakers", "observability", "schema migrations", "feature flags", "load balancing",
+    "message queues", "type hints", "generators", "closures", "decorators", "context managers", "recursion"
+]
+_ANGLES = [
+    "trade-offs of", "failure modes of", "testing strategy for", "performance impact of", "security aspects of",
+    "design of", "monitoring of", "common mistakes with", "scaling limits of", "alternatives to"
+]
+_TASKS = [
+    "deduplicates a stream of records", "merges overlapping intervals", "validates a nested configuration",
+    "computes a moving average", "parses a log line", "rate-limits calls per user", "finds the top k items",
+    "detects a cycle in a graph", "retries a flaky call with backoff", "groups records by key"
+]
+
+
+class StubConfig:
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, token_delay: float = 0.01, chunk_chars: int = 6,
+                 malformed_rate: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency = latency                # seconds before the first byte
+        self.jitter = jitter                  # +/- uniform jitter on the latency
+        self.token_delay = token_delay        # seconds between streamed chunks
+        self.chunk_chars = chunk_chars        # characters per streamed chunk
+        self.malformed_rate = malformed_rate  # fraction of evaluator responses that are malformed
+        self.error_rate = error_rate          # fraction of requests answered with HTTP 500/429
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def random(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+    def choice(self, items):
+        with self.lock:
+            return self.rng.choice(items)
+
+    def randint(self, a: int, b: int) -> int:
+        with self.lock:
+            return self.rng.randint(a, b)
+
+
+def _question(config: StubConfig, skill: str, is_coding: bool) -> str:
+    if is_coding:
+        return (f"Write a {skill} function that {config.choice(_TASKS)}, "
+                f"paying attention to {config.choice(_TOPICS)} (case #{config.randint(1, 99999)}).")
+    return (f"Explain the {config.choice(_ANGLES)} {config.choice(_TOPICS)} in {skill}, "
+            f"with reference to {config.choice(_TOPICS)} (case #{config.randint(1, 99999)}).")
+
+
+def _evaluation(config: StubConfig) -> Dict:
+    score = config.randint(4, 20)
+    return {
+        "score": score,
+        "reason": "The answer covers the core idea" + (" and handles edge cases." if score > 12 else " but misses important details."),
+        "suggestions": config.choice(["Add a concrete example.", "Discuss complexity.", "Mention failure cases."])
+    }
+
+
+# Every coding question gets the same small suite - enough to exercise code_runner.py
+_TEST_SUITE = {
+    "runnable": True,
+    "function": "dedupe_sorted",
+    "reference": "def dedupe_sorted(items):\n    return sorted(set(items))\n",
+    "cases": [
+        {"args": [[3, 1, 2, 3]], "expected": [1, 2, 3], "edge": False},
+        {"args": [[5, 4, 4, 1]], "expected": [1, 4, 5], "edge": False},
+        {"args": [[10, -2, 7]], "expected": [-2, 7, 10], "edge": False},
+        {"args": [[2, 2, 2, 1, 1]], "expected": [1, 2], "edge": False},
+        {"args": [[]], "expected": [], "edge": True},
+        {"args": [[7]], "expected": [7], "edge": True},
+        {"args": [[-1, -1, 0]], "expected": [-1, 0], "edge": True}
+    ],
+    "benchmark": "[[random.randint(0, 10**6) for _ in range(200000)]]"
+}
+
+
+def _malform(config: StubConfig, text: str) -> str:
+    """One of the malformations eval_parser is expected to repair"""
+    kind = config.choice(["fence", "trailing_comma", "single_quotes", "prose", "truncated"])
+    if kind == "fence":
+        return "```json\n" + text + "\n```"
+    if kind == "trailing_comma":
+        return re.sub(r"}\s*$", ",}", text)
+    if kind == "single_quotes":
+        return text.replace('"', "'")
+    if kind == "prose":
+        return "Here is my evaluation (rubric: 8 points correctness):\n" + text + "\nLet me know if you need more."
+    return text[:max(12, len(text) * 2 // 3)]
+
+
+def completion_text(config: StubConfig, prompt: str) -> str:
+    """Pick a response shaped like what the app expects for this prompt"""
+    if "one object per item" in prompt:
+        count = len(re.findall(r"^Item \d+ \(", prompt, re.M))
+        text = json.dumps([dict(_evaluation(config), id=i) for i in range(1, count + 1)])
+        return _malform(config, text) if config.random() < config.malformed_rate else text
+    if prompt.startswith("Translate each of these"):
+        language = re.search(r"questions into (.+?)\. ", prompt).group(1)
+        questions = json.loads(prompt[prompt.index("["):prompt.rindex("]") + 1])
+        return json.dumps([f"[{language}] {q}" for q in questions], ensure_ascii=False)
+    if "hidden unit tests" in prompt:
+        return json.dumps(_TEST_SUITE)
+    if "evaluator" in prompt:
+        text = json.dumps(_evaluation(config))
+        return _malform(config, text) if config.random() < config.malformed_rate else text
+    if "hiring manager" in prompt:
+        verdict = config.choice(["RECOMMENDED", "NOT RECOMMENDED"])
+        return (f"**Recommendation: {verdict}**\n\n**Key strengths**\n- Clear explanations of core concepts\n"
+                "- Working code for the main cases\n\n**Areas for improvement**\n- Edge-case handling\n"
+                "- Discussing trade-offs\n\n**Rationale**\nThe candidate showed solid fundamentals with some gaps "
+                "in depth, consistent with the scores above.")
+    skills_match = re.search(r"listed skills: (.+?)\. ", prompt)
+    skills = [s.strip() for s in skills_match.group(1).split(",")] if skills_match else ["Python"]
+    is_coding = "coding problem" in prompt
+    count_match = re.search(r"Generate (\d+) DISTINCT", prompt)
+    if count_match:
+        items = []
+        for _ in range(int(count_match.group(1))):
+            skill = config.choice(skills)
+            items.append({"skill": skill, "question": _question(config, skill, is_coding)})
+        return "```json\n" + json.dumps(items, indent=2) + "\n```"
+    return _question(config, config.choice(skills), is_coding)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config: StubConfig = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "deepseek-chat", "object": "model", "owned_by": "stub"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        config = self.config
+        with config.lock:
+            config.requests += 1
+        time.sleep(max(0.0, config.latency + (config.random() * 2 - 1) * config.jitter))
+        if config.random() < config.error_rate:
+            status = config.choice([429, 500])
+            self._send_json(status, {"error": {"message": "stub error", "type": "rate_limit" if status == 429 else "server_error"}})
+            return
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        text = completion_text(config, prompt)
+        max_tokens = body.get("max_tokens")
+        if max_tokens:
+            text = text[:max_tokens * 4]  # roughly 4 characters per token
+        model = body.get("model", "deepseek-chat")
+        completion_id = "chatcmpl-" + uuid.uuid4().hex[:12]
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4,
+                 "total_tokens": (len(prompt) + len(text)) // 4}
+        if body.get("stream"):
+            self._stream(completion_id, model, text)
+            return
+        self._send_json(200, {
+            "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    def _stream(self, completion_id: str, model: str, text: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def event(delta: Dict, finish_reason=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            self.wfile.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        size = max(1, self.config.chunk_chars)
+        for i in range(0, len(text), size):
+            event({"content": text[i:i + size]})
+            if self.config.token_delay:
+                time.sleep(self.config.token_delay)
+        event({}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+class StubServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return  # the client gave up (timeout, hedged request that lost) - expected
+        super().handle_error(request, client_address)
+
+
+def make_server(config: StubConfig, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Build (but don't start) a stub server; port 0 picks a free port"""
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config})
+    server = StubServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def start_in_background(config: StubConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Serve on a daemon thread; returns the server (base URL: http://host:server.server_port/v1)"""
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, name="stub-llm", daemon=True).start()
+    return server
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the first byte (default: %(default)s)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="uniform +/- jitter on the latency (default: %(default)s)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed chunks (default: %(default)s)")
+    parser.add_argument("--chunk-chars", type=int, default=6, help="characters per streamed chunk (default: %(default)s)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of malformed evaluator responses (default: %(default)s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failing with 429/500 (default: %(default)s)")
+    parser.add_argument("--seed", type=int, help="random seed for reproducible responses")
+
+
+def config_from_args(args) -> StubConfig:
+    return StubConfig(args.latency, args.jitter, args.token_delay, args.chunk_chars, args.malformed_rate, args.error_rate, args.seed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server = make_server(config_from_args(args), args.host, args.port)
+    print(f"Stub LLM listening on http://{args.host}:{server.server_port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
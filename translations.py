@@ -0,0 +1,92 @@
+# translations.py
+"""Cache of question translations, keyed by (question hash, language).
+
+Questions are generated, banked and deduplicated in CANONICAL_LANGUAGE only.
+A candidate interviewed in another language is shown a translation, made the
+first time any candidate needs that question in that language and reused for
+every later one. Translations are stored in the evaluations database behind
+an in-memory LRU; canonical() maps a translation back to its source, so asked
+questions can still be compared with new ones in English.
+
+This module only stores and looks up; interview.translate_questions asks the
+LLM for missing translations, several questions per call, and the question
+bank filler translates fresh questions into every language in demand
+(wanted_languages) before a candidate asks for them. The languages in demand
+are kept in the database too, since lookups and the filler may run in
+different llm_worker.py processes.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import storage
+
+CANONICAL_LANGUAGE = "English"
+CACHE_SIZE = 4096  # translations kept in memory
+
+_lock = threading.Lock()
+_memory: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_wanted = set()  # languages this process has already recorded in the database
+
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).encode()).hexdigest()
+
+
+def _remember(key: Tuple[str, str], text: str):
+    """Insert into the in-memory LRU (caller holds the lock)"""
+    _memory[key] = text
+    _memory.move_to_end(key)
+    while len(_memory) > CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+def lookup(sources: List[str], language: str) -> Dict[str, str]:
+    """{source: translation} for the sources already translated into `language`"""
+    if language not in _wanted:
+        storage.add_wanted_language(language)
+        _wanted.add(language)
+    with _lock:
+        found = {}
+        for source in sources:
+            key = (text_key(source), language)
+            if key in _memory:
+                _memory.move_to_end(key)
+                found[source] = _memory[key]
+    missing = {text_key(source): source for source in sources if source not in found}
+    if missing:
+        stored = storage.get_translations(list(missing), language)
+        with _lock:
+            for source_key, text in stored.items():
+                _remember((source_key, language), text)
+                found[missing[source_key]] = text
+    return found
+
+
+def store(language: str, pairs: List[Tuple[str, str]]) -> Dict[str, str]:
+    """Save (source, translation) pairs and return {source: translation}. The first translation
+    stored for a source is kept, so every candidate sees the same one."""
+    rows = [(text_key(source), source, text, text_key(text)) for source, text in pairs if source and text]
+    storage.put_translations(language, rows)
+    # Read back, so a concurrent translation of the same question that was stored first wins everywhere
+    sources = {row[0]: row[1] for row in rows}
+    stored = storage.get_translations(list(sources), language)
+    with _lock:
+        for source_key, text in stored.items():
+            _remember((source_key, language), text)
+    return {sources[source_key]: text for source_key, text in stored.items()}
+
+
+def canonical(text: str) -> str:
+    """The source of a translated question, or the text itself if it isn't a stored translation"""
+    return storage.translation_source(text_key(text)) or text
+
+
+def wanted_languages() -> List[str]:
+    """Languages any process has been asked to translate into"""
+    return storage.wanted_languages()
+
+
+def is_canonical(language: Optional[str]) -> bool:
+    return not language or language == CANONICAL_LANGUAGE